@@ -0,0 +1,227 @@
+"""
+Bar Cache
+Content-addressed store of processed bars, keyed by a hash of the source
+trades and the aggregation settings, with LRU eviction under a disk budget
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+import pandas as pd
+
+from storage import get_storage
+from volume_calculator import CALCULATOR_VERSION
+
+
+# Default disk budget; BAR_CACHE_MAX_BYTES in the environment overrides it
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+
+
+def frame_fingerprint(df):
+    """SHA-256 of a DataFrame's index, columns and values"""
+    digest = hashlib.sha256()
+    digest.update(json.dumps([str(df.index.dtype)] + [[str(name), str(dtype)]
+                                                     for name, dtype in df.dtypes.items()]).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def file_fingerprint(filepaths):
+    """
+    SHA-256 of the path, size and modification time of each file
+
+    Rewriting a file (e.g., a partition merged with new records) changes
+    the fingerprint without reading the data.
+    """
+    if isinstance(filepaths, str):
+        filepaths = [filepaths]
+
+    digest = hashlib.sha256()
+    for filepath in filepaths:
+        stat = os.stat(filepath)
+        digest.update(f"{os.path.abspath(filepath)}:{stat.st_size}:{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()
+
+
+def source_fingerprint(source):
+    """Fingerprint of trades given as a DataFrame or as file paths"""
+    if isinstance(source, pd.DataFrame):
+        return frame_fingerprint(source)
+    return file_fingerprint(source)
+
+
+class BarCache:
+    """
+    Processed bars on disk, one file per key
+
+    A key hashes the source fingerprint, frequency, bar type, bar size and
+    CALCULATOR_VERSION, so changed trades or a new calculator give a new
+    key and old entries are never served. An index (_index.json) records
+    each entry's size and last use; whenever the cache grows past max_bytes
+    the least recently used entries are deleted, starting with entries
+    from older calculator versions.
+    """
+
+    INDEX = '_index.json'
+
+    def __init__(self, root, max_bytes=None, storage_format='parquet'):
+        """
+        Args:
+            root: Cache directory
+            max_bytes: Disk budget (default: BAR_CACHE_MAX_BYTES or 2 GiB)
+            storage_format: Format of the cached bar files ('parquet', 'arrow' or 'csv')
+        """
+        if max_bytes is None:
+            max_bytes = int(os.getenv('BAR_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES))
+
+        self.root = root
+        self.max_bytes = max_bytes
+        self.storage = get_storage(storage_format)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(fingerprint, frequency='1min', bar_type='time', bar_size=None):
+        """
+        Cache key of bars built from a source
+
+        Args:
+            fingerprint: source_fingerprint of the trades
+        """
+        settings = {
+            'source': fingerprint,
+            'frequency': frequency,
+            'bar_type': bar_type,
+            'bar_size': bar_size,
+            'version': CALCULATOR_VERSION,
+        }
+        return hashlib.sha256(json.dumps(settings, sort_keys=True).encode()).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.root, f"{key}{self.storage.extension}")
+
+    def get(self, key):
+        """Cached bars for a key, or None"""
+        with self._lock:
+            index = self._load_index()
+            entry = index.get(key)
+            if entry is None:
+                return None
+            if not os.path.exists(self.path(key)):
+                del index[key]
+                self._save_index(index)
+                return None
+            entry['last_used'] = time.time()
+            self._save_index(index)
+
+        return self.storage.read(self.path(key))
+
+    def put(self, key, bars, **info):
+        """
+        Store bars under a key and evict down to the disk budget
+
+        Args:
+            key: Key from BarCache.key
+            bars: DataFrame of bars
+            **info: Extra fields recorded in the index (e.g., frequency)
+        """
+        os.makedirs(self.root, exist_ok=True)
+        path = self.path(key)
+
+        # Write then rename, so readers never see a partial file
+        tmp_path = f"{path}.tmp{os.getpid()}.{threading.get_ident()}"
+        self.storage.write(bars, tmp_path)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            index = self._load_index()
+            now = time.time()
+            index[key] = {
+                **info,
+                'version': CALCULATOR_VERSION,
+                'bytes': os.path.getsize(path),
+                'created': now,
+                'last_used': now,
+            }
+            self._evict(index, keep=key)
+            self._save_index(index)
+
+    def get_or_build(self, fingerprint, build, frequency='1min', bar_type='time', bar_size=None):
+        """
+        Cached bars, or build(), store and return them
+
+        Args:
+            fingerprint: source_fingerprint of the trades
+            build: Function with no arguments returning the bars
+            frequency, bar_type, bar_size: Aggregation settings of the bars
+
+        Returns:
+            DataFrame of bars
+        """
+        key = self.key(fingerprint, frequency, bar_type, bar_size)
+        bars = self.get(key)
+        if bars is not None:
+            print(f"Loaded {len(bars)} cached {bar_type} bars ({key[:12]})")
+            return bars
+
+        bars = build()
+        self.put(key, bars, frequency=frequency, bar_type=bar_type, bar_size=bar_size)
+        return bars
+
+    def entries(self):
+        """Index entries by key"""
+        with self._lock:
+            return self._load_index()
+
+    def total_bytes(self):
+        return sum(entry['bytes'] for entry in self.entries().values())
+
+    def evict(self, max_bytes=None):
+        """Delete least recently used entries until the cache fits max_bytes"""
+        with self._lock:
+            index = self._load_index()
+            self._evict(index, max_bytes=max_bytes)
+            self._save_index(index)
+
+    def clear(self):
+        self.evict(max_bytes=0)
+
+    def _evict(self, index, keep=None, max_bytes=None):
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+
+        # Entries of other calculator versions can never be hit again
+        order = sorted(index, key=lambda k: (index[k].get('version') == CALCULATOR_VERSION,
+                                             index[k]['last_used']))
+        total = sum(entry['bytes'] for entry in index.values())
+        for key in order:
+            stale = index[key].get('version') != CALCULATOR_VERSION
+            if (total <= max_bytes and not stale) or key == keep:
+                continue
+            total -= index.pop(key)['bytes']
+            if os.path.exists(self.path(key)):
+                os.remove(self.path(key))
+
+    def _load_index(self):
+        index_path = os.path.join(self.root, self.INDEX)
+        if not os.path.exists(index_path):
+            return {}
+        with open(index_path) as f:
+            return json.load(f)
+
+    def _save_index(self, index):
+        os.makedirs(self.root, exist_ok=True)
+        index_path = os.path.join(self.root, self.INDEX)
+
+        # Write then rename, so a crash never leaves a truncated index; the
+        # temp name is unique so writers in other processes never share it
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix=self.INDEX + '.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(index, f, indent=2)
+            os.replace(tmp_path, index_path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
@@ -0,0 +1,300 @@
+"""
+Bar Pyramid
+Aggregates trades once into fine base bars and rolls them up into coarser
+timeframes, so changing the timeframe never goes back to the raw ticks
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from storage import get_storage
+from volume_calculator import StreamingBarAggregator, VolumeCalculator
+
+
+BASE_FREQUENCY = '1s'
+PYRAMID_TIMEFRAMES = ('1min', '5min', '15min', '1h')
+
+# How each column combines when bars are rolled up (other columns keep the last value)
+ROLL_UP_RULES = {
+    'open': 'first',
+    'high': 'max',
+    'low': 'min',
+    'close': 'last',
+    'volume': 'sum',
+    'buy_volume': 'sum',
+    'sell_volume': 'sum',
+    'total_volume': 'sum',
+    'delta': 'sum',
+    'cumulative_delta': 'last',
+}
+
+
+def rolls_up_from(frequency, base=BASE_FREQUENCY):
+    """True if bars at frequency are made of whole bars at base"""
+    try:
+        offset = pd.tseries.frequencies.to_offset(frequency)
+    except ValueError:
+        return False
+    return (isinstance(offset, pd.offsets.Tick)
+            and offset.nanos % pd.tseries.frequencies.to_offset(base).nanos == 0)
+
+
+def roll_up(bars, frequency, origin=None):
+    """
+    Combine time bars into coarser time bars
+
+    Bars are binned like aggregate_arrays (bins counted from midnight of
+    the first trading day) and each column is reduced with np.*.reduceat
+    following ROLL_UP_RULES. When frequency is a multiple of the bars'
+    frequency every coarse bin is made of whole fine bins, so the result
+    equals aggregating the trades directly at that frequency.
+
+    Args:
+        bars: Time bars in time order (e.g., 1s bars or OHLCV candles)
+        frequency: Fixed pandas frequency string (e.g., '1min', '5min', '1h')
+        origin: Start of bin 0 in nanoseconds (default: midnight of the
+                first trading day)
+
+    Returns:
+        DataFrame with the same columns, indexed by bar start time
+    """
+    freq_ns = pd.tseries.frequencies.to_offset(frequency).nanos
+    if len(bars) == 0:
+        return bars.copy()
+
+    index = pd.DatetimeIndex(bars.index)
+    values_ns = index.as_unit('ns').asi8
+    if origin is None:
+        origin = VolumeCalculator._day_origin(values_ns[0], index.tz)
+    bins = (values_ns - origin) // freq_ns
+
+    starts = np.flatnonzero(np.r_[True, bins[1:] != bins[:-1]])
+    ends = np.r_[starts[1:], len(bins)]
+
+    columns = {}
+    for column in bars.columns:
+        values = bars[column].to_numpy()
+        rule = ROLL_UP_RULES.get(column, 'last')
+        if rule == 'sum':
+            columns[column] = np.add.reduceat(values, starts)
+        elif rule == 'max':
+            columns[column] = np.maximum.reduceat(values, starts)
+        elif rule == 'min':
+            columns[column] = np.minimum.reduceat(values, starts)
+        elif rule == 'first':
+            columns[column] = values[starts]
+        else:
+            columns[column] = values[ends - 1]
+
+    rolled_index = VolumeCalculator._to_index(origin + bins[starts] * freq_ns, index.tz)
+    rolled_index = rolled_index.as_unit(index.unit)
+    rolled_index.name = index.name
+    return pd.DataFrame(columns, index=rolled_index)
+
+
+class StreamingPyramid:
+    """
+    Rolls up a stream of base bars into every pyramid timeframe at once
+
+    A coarse bar is finished once a base bar beyond its bin arrives, so
+    only the base bars of the open bin of each timeframe are held (at most
+    one bin of the coarsest timeframe). Bins are counted from midnight of
+    the first base bar's trading day, so the emitted bars equal roll_up of
+    all base bars.
+    """
+
+    def __init__(self, base=BASE_FREQUENCY, timeframes=PYRAMID_TIMEFRAMES):
+        """
+        Args:
+            base: Frequency of the base bars
+            timeframes: Timeframes to roll up, each a multiple of base
+        """
+        for frequency in timeframes:
+            if not rolls_up_from(frequency, base):
+                raise ValueError(f"{frequency} bars cannot be built from {base} base bars")
+
+        self.base = base
+        self.timeframes = tuple(timeframes)
+        self.freq_ns = {frequency: pd.tseries.frequencies.to_offset(frequency).nanos
+                        for frequency in self.timeframes}
+        self.origin = None
+        self.pending = None
+        # Last bin emitted per timeframe
+        self._done = {frequency: None for frequency in self.timeframes}
+
+    def update(self, base_bars):
+        """
+        Add finished base bars, later than any previous ones
+
+        Returns:
+            Dict of timeframe to the bars finished by these base bars (may be empty)
+        """
+        if len(base_bars) == 0:
+            return {}
+
+        pending = base_bars if self.pending is None else pd.concat([self.pending, base_bars])
+        values_ns = pd.DatetimeIndex(pending.index).as_unit('ns').asi8
+        if self.origin is None:
+            self.origin = VolumeCalculator._day_origin(values_ns[0], pd.DatetimeIndex(pending.index).tz)
+
+        finished = {}
+        keep_from = values_ns[-1]
+        for frequency, freq_ns in self.freq_ns.items():
+            bins = (values_ns - self.origin) // freq_ns
+            # The bin of the last base bar may still grow
+            complete = bins < bins[-1]
+            if self._done[frequency] is not None:
+                complete &= bins > self._done[frequency]
+            if complete.any():
+                finished[frequency] = roll_up(pending[complete], frequency, origin=self.origin)
+                self._done[frequency] = bins[complete][-1]
+            keep_from = min(keep_from, self.origin + bins[-1] * freq_ns)
+
+        self.pending = pending[values_ns >= keep_from]
+        return finished
+
+    def flush(self):
+        """Roll up the open bins (end of the stream); returns a dict like update()"""
+        if self.pending is None or len(self.pending) == 0:
+            return {}
+
+        values_ns = pd.DatetimeIndex(self.pending.index).as_unit('ns').asi8
+        finished = {}
+        for frequency, freq_ns in self.freq_ns.items():
+            bins = (values_ns - self.origin) // freq_ns
+            remaining = np.ones(len(bins), dtype=bool) if self._done[frequency] is None else bins > self._done[frequency]
+            if remaining.any():
+                finished[frequency] = roll_up(self.pending[remaining], frequency, origin=self.origin)
+                self._done[frequency] = bins[remaining][-1]
+
+        self.pending = self.pending.iloc[:0]
+        return finished
+
+
+def stream_pyramid(trade_chunks, base=BASE_FREQUENCY, timeframes=PYRAMID_TIMEFRAMES):
+    """
+    Streaming pipeline: chunks of trades -> finished bars at every timeframe
+
+    Trades are aggregated into base bars chunk by chunk and each batch of
+    base bars is rolled up right away, so neither the trades nor the base
+    bars of the whole range are held in memory.
+
+    Args:
+        trade_chunks: Iterable of trade DataFrames in time order
+                      (e.g., PartitionedStore.iter_read)
+        base: Base bar frequency
+        timeframes: Timeframes to roll up
+
+    Yields:
+        (frequency, bars) pairs; the bars of each frequency arrive in time
+        order and the base frequency is included
+    """
+    pyramid = StreamingPyramid(base, timeframes)
+
+    for base_bars in VolumeCalculator.stream_trades_to_bars(trade_chunks, frequency=base):
+        yield base, base_bars
+        yield from pyramid.update(base_bars).items()
+
+    yield from pyramid.flush().items()
+
+
+class BarPyramid:
+    """
+    Base bars plus cached roll-ups at coarser timeframes
+
+    The trades are aggregated once into base bars; every other timeframe
+    is rolled up from the base bars the first time it is asked for and
+    kept in memory. save() and load() keep both stages on disk.
+    """
+
+    def __init__(self, base_bars, base=BASE_FREQUENCY, timeframes=PYRAMID_TIMEFRAMES):
+        """
+        Args:
+            base_bars: Time bars at the base frequency
+            base: Frequency of base_bars
+            timeframes: Timeframes built by build() and written by save()
+        """
+        self.base = base
+        self.timeframes = tuple(timeframes)
+        self._bars = {base: base_bars}
+
+    @classmethod
+    def from_trades(cls, trades_df, base=BASE_FREQUENCY, timeframes=PYRAMID_TIMEFRAMES):
+        """Aggregate a trades DataFrame into base bars"""
+        return cls(VolumeCalculator.process_trades_to_bars(trades_df, frequency=base), base, timeframes)
+
+    @classmethod
+    def from_chunks(cls, trade_chunks, base=BASE_FREQUENCY, timeframes=PYRAMID_TIMEFRAMES):
+        """Aggregate chunks of trades in time order (e.g., PartitionedStore.iter_read) into base bars"""
+        frames = list(VolumeCalculator.stream_trades_to_bars(trade_chunks, frequency=base))
+        base_bars = pd.concat(frames) if frames else StreamingBarAggregator(base).flush()
+        return cls(base_bars, base, timeframes)
+
+    @property
+    def base_bars(self):
+        return self._bars[self.base]
+
+    def covers(self, frequency):
+        """True if bars at frequency can be rolled up from the base bars"""
+        return rolls_up_from(frequency, self.base)
+
+    def bars(self, frequency):
+        """
+        Bars at a timeframe, rolled up from the base bars on first use
+
+        Args:
+            frequency: A multiple of the base frequency (e.g., '1min', '1h')
+
+        Returns:
+            DataFrame with the same columns as the base bars
+        """
+        if frequency not in self._bars:
+            if not self.covers(frequency):
+                raise ValueError(f"{frequency} bars cannot be built from {self.base} base bars")
+            self._bars[frequency] = roll_up(self.base_bars, frequency)
+        return self._bars[frequency]
+
+    def build(self):
+        """Roll up all pyramid timeframes"""
+        for frequency in self.timeframes:
+            self.bars(frequency)
+        return self
+
+    def save(self, directory, storage_format='parquet', include_base=True):
+        """
+        Write the base bars and every pyramid timeframe as {frequency}{extension}
+
+        Args:
+            directory: Output directory (created if needed)
+            storage_format: 'csv', 'parquet' or 'arrow'
+            include_base: Also write the base bars
+        """
+        storage = get_storage(storage_format)
+        os.makedirs(directory, exist_ok=True)
+
+        frequencies = ((self.base,) if include_base else ()) + self.timeframes
+        for frequency in frequencies:
+            storage.write(self.bars(frequency), os.path.join(directory, f"{frequency}{storage.extension}"))
+
+    @classmethod
+    def load(cls, directory, storage_format='parquet', base=BASE_FREQUENCY, timeframes=PYRAMID_TIMEFRAMES):
+        """
+        Read a pyramid written by save(); timeframes without a file are
+        rolled up again from the base bars when asked for
+        """
+        storage = get_storage(storage_format)
+        pyramid = cls(storage.read(os.path.join(directory, f"{base}{storage.extension}")), base, timeframes)
+
+        for frequency in timeframes:
+            filepath = os.path.join(directory, f"{frequency}{storage.extension}")
+            if os.path.exists(filepath):
+                pyramid._bars[frequency] = storage.read(filepath)
+        return pyramid
+
+    @staticmethod
+    def exists(directory, storage_format='parquet', base=BASE_FREQUENCY):
+        """True if directory holds saved base bars"""
+        extension = get_storage(storage_format).extension
+        return os.path.exists(os.path.join(directory, f"{base}{extension}"))
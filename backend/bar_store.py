@@ -0,0 +1,174 @@
+"""
+Bar Store
+Processed bars as one .npy file per column, memory-mapped by readers so
+every process shares one page-cached copy
+"""
+
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+
+# Fixed column layout: name -> dtype (timestamps are int64 UTC nanoseconds)
+BAR_STORE_COLUMNS = {
+    'timestamps': np.int64,
+    'close': np.float64,
+    'buy_volume': np.float64,
+    'sell_volume': np.float64,
+    'delta': np.float64,
+    'cumulative_delta': np.float64,
+}
+
+META_FILE = 'meta.json'
+
+
+def write_bar_store(bars, directory):
+    """
+    Write bars to a store directory
+
+    Each column of BAR_STORE_COLUMNS is written as a 1-D little-endian
+    .npy file, so any reader (NumPy, or a plain offset into the file) can
+    map it without parsing. The store is written next to the target and
+    renamed into place, so readers never see a partial store.
+
+    Args:
+        bars: DataFrame with close, buy_volume, sell_volume, delta and
+              cumulative_delta, indexed by time
+        directory: Store directory (replaced if it exists)
+
+    Returns:
+        BarStore opened on the new store
+    """
+    writer = BarStoreWriter(directory)
+    writer.append(bars)
+    return writer.close()
+
+
+class BarStoreWriter:
+    """
+    Writes a bar store from batches of bars in time order
+
+    Each batch is appended to one raw file per column; close() puts the
+    .npy header in front of each and renames the store into place, so the
+    bars never have to be in memory at once.
+    """
+
+    def __init__(self, directory):
+        """
+        Args:
+            directory: Store directory (replaced on close() if it exists)
+        """
+        self.directory = directory
+        self.rows = 0
+        self.tz = None
+        self.index_name = None
+
+        self.tmp_dir = f"{directory.rstrip(os.sep)}.tmp{os.getpid()}"
+        if os.path.exists(self.tmp_dir):
+            shutil.rmtree(self.tmp_dir)
+        os.makedirs(self.tmp_dir)
+        self._files = {name: open(os.path.join(self.tmp_dir, f"{name}.bin"), 'wb')
+                       for name in BAR_STORE_COLUMNS}
+
+    def append(self, bars):
+        """Append a batch of bars (same columns as write_bar_store)"""
+        index = pd.DatetimeIndex(bars.index)
+        if self.rows == 0:
+            self.tz = str(index.tz) if index.tz is not None else None
+            self.index_name = index.name
+
+        columns = {'timestamps': index.as_unit('ns').asi8}
+        for name in list(BAR_STORE_COLUMNS)[1:]:
+            columns[name] = bars[name].to_numpy()
+
+        for name, dtype in BAR_STORE_COLUMNS.items():
+            values = np.ascontiguousarray(columns[name], dtype=np.dtype(dtype).newbyteorder('<'))
+            self._files[name].write(values.tobytes())
+        self.rows += len(bars)
+
+    def close(self):
+        """
+        Finish the store and rename it into place
+
+        Returns:
+            BarStore opened on the new store
+        """
+        for name, dtype in BAR_STORE_COLUMNS.items():
+            self._files[name].close()
+            raw_path = os.path.join(self.tmp_dir, f"{name}.bin")
+            header = {
+                'descr': np.dtype(dtype).newbyteorder('<').str,
+                'fortran_order': False,
+                'shape': (self.rows,),
+            }
+            with open(os.path.join(self.tmp_dir, f"{name}.npy"), 'wb') as out, open(raw_path, 'rb') as raw:
+                np.lib.format.write_array_header_1_0(out, header)
+                shutil.copyfileobj(raw, out)
+            os.remove(raw_path)
+
+        with open(os.path.join(self.tmp_dir, META_FILE), 'w') as f:
+            json.dump({
+                'rows': self.rows,
+                'tz': self.tz,
+                'index_name': self.index_name,
+                'columns': {name: np.dtype(dtype).str for name, dtype in BAR_STORE_COLUMNS.items()},
+            }, f, indent=2)
+
+        if os.path.exists(self.directory):
+            shutil.rmtree(self.directory)
+        os.replace(self.tmp_dir, self.directory)
+        return BarStore(self.directory)
+
+
+class BarStore:
+    """
+    Read-only, memory-mapped view of a store written by write_bar_store
+
+    column() returns np.memmap-backed arrays: opening the store costs no
+    reads, pages are loaded on first touch and shared through the OS page
+    cache by every process that maps the same files.
+    """
+
+    def __init__(self, directory):
+        """
+        Args:
+            directory: Store directory
+        """
+        self.directory = directory
+        with open(os.path.join(directory, META_FILE)) as f:
+            self.meta = json.load(f)
+        self.tz = self.meta['tz']
+        self._columns = {}
+
+    def __len__(self):
+        return self.meta['rows']
+
+    def __repr__(self):
+        return f"BarStore({self.directory!r}, {len(self)} bars)"
+
+    def column(self, name):
+        """Memory-mapped, read-only column"""
+        if name not in BAR_STORE_COLUMNS:
+            raise KeyError(f"Unknown bar store column: {name}. Use one of {list(BAR_STORE_COLUMNS)}")
+        if name not in self._columns:
+            self._columns[name] = np.load(os.path.join(self.directory, f"{name}.npy"), mmap_mode='r')
+        return self._columns[name]
+
+    def index(self):
+        """DatetimeIndex of the bars"""
+        index = pd.DatetimeIndex(self.column('timestamps').view('M8[ns]'), name=self.meta['index_name'])
+        return index.tz_localize('UTC').tz_convert(self.tz) if self.tz else index
+
+    def to_frame(self, columns=None):
+        """
+        DataFrame of the bars
+
+        Args:
+            columns: Columns to include (default: all but timestamps)
+        """
+        if columns is None:
+            columns = list(BAR_STORE_COLUMNS)[1:]
+        return pd.DataFrame({name: self.column(name) for name in columns}, index=self.index())
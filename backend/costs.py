@@ -0,0 +1,143 @@
+"""
+Cost Model
+Commissions, slippage, contract multipliers and tick-size rounding applied
+to a finished trade ledger as array operations
+"""
+
+import numpy as np
+
+from ledger import TRADE_FIELDS, Ledger
+
+
+# Contract specs of the futures the pipeline trades (CME)
+CONTRACT_SPECS = {
+    'GC': {'multiplier': 100, 'tick_size': 0.10},
+    'MGC': {'multiplier': 10, 'tick_size': 0.10},
+    'ES': {'multiplier': 50, 'tick_size': 0.25},
+    'MES': {'multiplier': 5, 'tick_size': 0.25},
+    'NQ': {'multiplier': 20, 'tick_size': 0.25},
+    'CL': {'multiplier': 1000, 'tick_size': 0.01},
+    '6E': {'multiplier': 125000, 'tick_size': 0.00005},
+}
+
+# Trade ledger after costs: prices are fills, pnl and return are net
+COST_TRADE_FIELDS = {
+    **TRADE_FIELDS,
+    'contracts': np.float64,
+    'gross_pnl': np.float64,
+    'commission': np.float64,
+    'slippage': np.float64,
+}
+
+
+class CostModel:
+    """
+    Trading costs of futures trades
+
+    Works on the ledgers a backtest already produced, so the engines stay
+    cost-free and a million-bar run pays only a few array operations over
+    its trades. Each trade keeps the size the engine chose (converted to
+    contracts); costs reduce its PnL but do not feed back into the sizing
+    of later trades.
+    """
+
+    def __init__(self, commission=0.0, slippage_ticks=0.0, tick_size=None,
+                 multiplier=1.0, whole_contracts=False):
+        """
+        Args:
+            commission: Commission per contract per side
+            slippage_ticks: Ticks lost against the trade on entry and on exit
+            tick_size: Minimum price increment; fills are rounded to it
+                       (no rounding and no slippage if None)
+            multiplier: Contract multiplier (value of a 1.0 price move per contract)
+            whole_contracts: Round sizes down to whole contracts
+        """
+        if commission < 0 or slippage_ticks < 0:
+            raise ValueError("commission and slippage_ticks must not be negative")
+        if tick_size is not None and tick_size <= 0:
+            raise ValueError("tick_size must be positive")
+        if multiplier <= 0:
+            raise ValueError("multiplier must be positive")
+
+        self.commission = commission
+        self.slippage_ticks = slippage_ticks
+        self.tick_size = tick_size
+        self.multiplier = multiplier
+        self.whole_contracts = whole_contracts
+
+    @classmethod
+    def for_symbol(cls, symbol, **costs):
+        """
+        Cost model with the multiplier and tick size of a known contract
+
+        Args:
+            symbol: Databento symbol, e.g. 'GC.c.0', 'ES.FUT' or 'GCZ3'
+            **costs: commission, slippage_ticks, whole_contracts (or overrides)
+        """
+        root = symbol.split('.')[0]
+        for name in CONTRACT_SPECS:
+            # Outright contracts add a month code and a one or two digit year
+            if root == name or (root.startswith(name) and len(root) - len(name) in (2, 3)):
+                return cls(**{**CONTRACT_SPECS[name], **costs})
+        raise ValueError(f"No contract specs for {symbol}. Known roots: {list(CONTRACT_SPECS)}")
+
+    def round_price(self, prices):
+        """Prices rounded to the nearest tick"""
+        prices = np.asarray(prices, dtype=np.float64)
+        if self.tick_size is None:
+            return prices
+        return np.round(prices / self.tick_size) * self.tick_size
+
+    def apply(self, trades, positions):
+        """
+        Trades after costs
+
+        Trade i closes position i, whose type gives the side (LONG or SHORT)
+        and whose size (units of the price) gives the quantity.
+
+        Args:
+            trades: Trade ledger of a backtest
+            positions: Position ledger of the same backtest
+
+        Returns:
+            Ledger with COST_TRADE_FIELDS: fill prices, net pnl and return,
+            contracts and the gross PnL, commission and slippage of each trade
+        """
+        count = len(trades)
+        if len(positions) < count:
+            raise ValueError("Every trade needs the position it closes")
+
+        sides = np.where(positions.column('type')[:count] == 'SHORT', -1.0, 1.0)
+        contracts = positions.column('size')[:count] / self.multiplier
+        if self.whole_contracts:
+            contracts = np.floor(contracts + 1e-9)
+
+        slip = 0.0 if self.tick_size is None else self.slippage_ticks * self.tick_size
+        entry = self.round_price(trades.column('entry_price'))
+        exit_ = self.round_price(trades.column('exit_price'))
+        entry_fill = entry + sides * slip
+        exit_fill = exit_ - sides * slip
+
+        units = contracts * self.multiplier
+        gross_pnl = sides * (exit_ - entry) * units
+        slippage = 2 * slip * units
+        commission = 2 * self.commission * contracts
+        pnl = gross_pnl - slippage - commission
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns = np.where(units > 0, pnl / (entry_fill * units) * 100, 0.0)
+
+        ledger = Ledger(COST_TRADE_FIELDS, capacity=count)
+        ledger.append_columns({
+            'entry_price': entry_fill,
+            'exit_price': exit_fill,
+            'pnl': pnl,
+            'return': returns,
+            'exit_time': trades.column('exit_time'),
+            'exit_reason': trades.column('exit_reason'),
+            'contracts': contracts,
+            'gross_pnl': gross_pnl,
+            'commission': commission,
+            'slippage': slippage,
+        })
+        return ledger
@@ -1,34 +1,54 @@
 """
 Databento Data Fetcher
-Fetches trade and OHLCV data from Databento and saves as CSV
+Fetches trade and OHLCV data from Databento and saves as Parquet, Arrow IPC or CSV
 """
 
 import databento as db
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
 import os
+import shutil
+import time
+
+from storage import PartitionedStore, data_extensions, get_storage, storage_for_file
+
+
+# Chunk sizes for parallel downloads
+CHUNK_FREQUENCIES = {'day': 'D', 'month': 'MS'}
 
 
 class DatabentoFetcher:
     """Fetches market data from Databento API"""
 
-    def __init__(self, api_key=None):
+    def __init__(self, api_key=None, storage_format='parquet', client=None, data_dir=None, raw_dbn=False):
         """
         Initialize Databento client
 
         Args:
             api_key: Databento API key. If None, will use DATABENTO_API_KEY env var
+            storage_format: Format for saved data ('parquet', 'arrow' or 'csv')
+            client: Client to use instead of db.Historical (anything with
+                    timeseries.get_range); no API key is needed then
+            data_dir: Data directory (default: backend/Data)
+            raw_dbn: Also keep each downloaded chunk as an uncompressed .dbn file
+                     under Data/raw, for memory-mapped reading with dbn_reader
         """
         self.api_key = api_key or os.environ.get('DATABENTO_API_KEY')
-        if not self.api_key:
+        if client is None and not self.api_key:
             raise ValueError("API key required. Set DATABENTO_API_KEY environment variable or pass api_key parameter")
 
-        self.client = db.Historical(self.api_key)
-        self.data_dir = os.path.join(os.path.dirname(__file__), 'Data')
+        self.client = client if client is not None else db.Historical(self.api_key)
+        self.data_dir = data_dir or os.path.join(os.path.dirname(__file__), 'Data')
+        self.storage = get_storage(storage_format)
+        self.raw_dbn = raw_dbn
 
         # Create Data directory if it doesn't exist
         os.makedirs(self.data_dir, exist_ok=True)
 
+        # Fetched data is kept in daily partitions: Data/{schema}/{symbol}/{day}
+        self.lake = PartitionedStore(self.data_dir, storage_format)
+
     def fetch_trades(self, symbols, start_date, end_date, dataset='GLBX.MDP3', stype='continuous'):
         """
         Fetch tick-by-tick trade data
@@ -61,17 +81,16 @@ class DatabentoFetcher:
             # Convert to DataFrame
             df = data.to_df()
 
+            # Save one partition per day (empty days included)
+            partitions = self.lake.write(df, symbols[0], 'trades', start_date, end_date)
+
             if df.empty:
                 print("Warning: No trades data received")
                 return df
 
             print(f"Fetched {len(df)} trade records")
-
-            # Save to CSV
-            filename = f"trades_{symbols[0]}_{start_date}_{end_date}.csv"
-            filepath = os.path.join(self.data_dir, filename)
-            df.to_csv(filepath, index=True)
-            print(f"Saved trades data to: {filepath}")
+            print(f"Saved trades data to {partitions} daily partitions in: "
+                  f"{self.lake.partition_dir(symbols[0], 'trades')}")
 
             return df
 
@@ -112,17 +131,17 @@ class DatabentoFetcher:
             # Convert to DataFrame
             df = data.to_df()
 
+            # Save one partition per day (empty days included)
+            schema = f'ohlcv-{timeframe}'
+            partitions = self.lake.write(df, symbols[0], schema, start_date, end_date)
+
             if df.empty:
                 print("Warning: No OHLCV data received")
                 return df
 
             print(f"Fetched {len(df)} {timeframe} bars")
-
-            # Save to CSV
-            filename = f"ohlcv_{timeframe}_{symbols[0]}_{start_date}_{end_date}.csv"
-            filepath = os.path.join(self.data_dir, filename)
-            df.to_csv(filepath, index=True)
-            print(f"Saved OHLCV data to: {filepath}")
+            print(f"Saved OHLCV data to {partitions} daily partitions in: "
+                  f"{self.lake.partition_dir(symbols[0], schema)}")
 
             return df
 
@@ -130,6 +149,157 @@ class DatabentoFetcher:
             print(f"Error fetching OHLCV data: {e}")
             raise
 
+    def fetch_missing(self, symbols, start_date, end_date, schema='trades',
+                      dataset='GLBX.MDP3', stype='continuous', chunk='month', max_workers=4):
+        """
+        Fetch only the parts of a window not already held, then load the window
+
+        The manifest of fetched ranges is compared with [start_date, end_date)
+        and only the missing ranges are downloaded (see download). Shifting a
+        window by a day therefore downloads one day, not the whole window again.
+
+        Args:
+            symbols: List of symbols (e.g., ['GC.c.0'])
+            start_date: Start date (string 'YYYY-MM-DD' or datetime)
+            end_date: End date, exclusive (string 'YYYY-MM-DD' or datetime)
+            schema: Databento schema (e.g., 'trades', 'ohlcv-1m')
+            dataset: Databento dataset (default: GLBX.MDP3 for CME futures)
+            stype: Symbol type ('continuous', 'raw_symbol', 'parent', etc.)
+            chunk: Request size for the missing ranges ('day', 'month' or None)
+            max_workers: Number of concurrent requests
+
+        Returns:
+            DataFrame with the records of the whole window
+        """
+        self.download(symbols, start_date, end_date, schema=schema, dataset=dataset,
+                      stype=stype, chunk=chunk, max_workers=max_workers)
+
+        return self.load_range(symbols[0], schema, start_date, end_date)
+
+    def download(self, symbols, start_date, end_date, schema='trades', dataset='GLBX.MDP3',
+                 stype='continuous', chunk='month', max_workers=4, retries=3, backoff=2.0):
+        """
+        Download the missing parts of a range as parallel day or month chunks
+
+        Each chunk is a separate request run on a bounded thread pool, retried
+        with exponential backoff, and written to the daily partitions and the
+        manifest as soon as it arrives. Finished chunks are never requested
+        again, so rerunning after a crash or a failed chunk resumes where the
+        previous run stopped.
+
+        Args:
+            symbols: List of symbols (e.g., ['GC.c.0'])
+            start_date: Start date (string 'YYYY-MM-DD' or datetime)
+            end_date: End date, exclusive (string 'YYYY-MM-DD' or datetime)
+            schema: Databento schema (e.g., 'trades', 'ohlcv-1m')
+            dataset: Databento dataset (default: GLBX.MDP3 for CME futures)
+            stype: Symbol type ('continuous', 'raw_symbol', 'parent', etc.)
+            chunk: 'day', 'month', or None for one request per missing range
+            max_workers: Number of concurrent requests
+            retries: Attempts per chunk before giving up on it
+            backoff: Seconds to wait after the first failed attempt, doubled after each retry
+
+        Returns:
+            Dictionary with 'chunks' (number requested) and 'records' (number received)
+
+        Raises:
+            RuntimeError: If any chunk still failed after all retries (the other
+                          chunks are kept; call again to resume)
+        """
+        symbol = symbols[0]
+        self.lake.ensure_manifest(symbol, schema)
+        missing = self.lake.missing_ranges(symbol, schema, start_date, end_date)
+        chunks = _split_ranges(missing, chunk)
+
+        if not chunks:
+            print(f"All of {start_date} to {end_date} already held for {symbol} {schema}")
+            return {'chunks': 0, 'records': 0}
+
+        print(f"Downloading {schema} for {symbol}: {len(chunks)} chunks, {max_workers} workers")
+
+        records = 0
+        failed = []
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {
+                pool.submit(self._download_chunk, symbols, schema, chunk_start, chunk_end,
+                            dataset, stype, retries, backoff): (chunk_start, chunk_end)
+                for chunk_start, chunk_end in chunks
+            }
+            for done, future in enumerate(as_completed(futures), 1):
+                chunk_start, chunk_end = futures[future]
+                label = f"[{done}/{len(chunks)}] {_request_date(chunk_start)} to {_request_date(chunk_end)}"
+                try:
+                    count = future.result()
+                except Exception as e:
+                    failed.append((chunk_start, chunk_end, e))
+                    print(f"{label}: FAILED ({e})")
+                else:
+                    records += count
+                    print(f"{label}: {count:,} records")
+
+        if failed:
+            raise RuntimeError(
+                f"{len(failed)} of {len(chunks)} chunks failed "
+                f"(first: {_request_date(failed[0][0])}: {failed[0][2]}). "
+                f"Completed chunks are saved; run again to resume."
+            )
+
+        print(f"Downloaded {records:,} {schema} records for {symbol}")
+        return {'chunks': len(chunks), 'records': records}
+
+    def _download_chunk(self, symbols, schema, start, end, dataset, stype, retries, backoff):
+        """Fetch one chunk with retries and merge it into the partitions"""
+        start, end = _request_date(start), _request_date(end)
+
+        for attempt in range(1, retries + 1):
+            try:
+                data = self.client.timeseries.get_range(
+                    dataset=dataset,
+                    symbols=symbols,
+                    schema=schema,
+                    start=start,
+                    end=end,
+                    stype_in=stype,
+                )
+                df = data.to_df()
+                break
+            except Exception as e:
+                if attempt == retries:
+                    raise
+                delay = backoff * 2 ** (attempt - 1)
+                print(f"  {start} to {end}: attempt {attempt} failed ({e}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+        if self.raw_dbn:
+            self._save_raw(data, symbols[0], schema, start, end)
+
+        # Merge into the daily partitions and record the range as held
+        self.lake.write(df, symbols[0], schema, start, end)
+        return len(df)
+
+    def raw_dbn_path(self, symbol, schema, start, end):
+        """Path of the raw .dbn file for one downloaded chunk"""
+        return os.path.join(self.data_dir, 'raw', schema, symbol, f"{start}_{end}.dbn")
+
+    def raw_dbn_files(self, symbol, schema='trades'):
+        """Raw .dbn files saved for a symbol, in time order"""
+        folder = os.path.dirname(self.raw_dbn_path(symbol, schema, '', ''))
+        if not os.path.isdir(folder):
+            return []
+        return [os.path.join(folder, f) for f in sorted(os.listdir(folder)) if f.endswith('.dbn')]
+
+    def _save_raw(self, data, symbol, schema, start, end):
+        """Write a response as uncompressed DBN (records stay in their binary layout)"""
+        filepath = self.raw_dbn_path(symbol, schema, start, end)
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+
+        # .reader decompresses zstd responses; write to a temp file so a
+        # failed download never leaves a truncated .dbn behind
+        tmp_path = filepath + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            shutil.copyfileobj(data.reader, f)
+        os.replace(tmp_path, filepath)
+
     def fetch_all(self, symbols, start_date, end_date, dataset='GLBX.MDP3'):
         """
         Fetch both trades and OHLCV-1m data
@@ -152,8 +322,23 @@ class DatabentoFetcher:
         }
 
     def list_available_data(self):
-        """List all CSV files in the Data directory"""
-        files = [f for f in os.listdir(self.data_dir) if f.endswith('.csv')]
+        """List partitioned data and single data files (CSV, Parquet, Arrow) in the Data directory"""
+        files = [f for f in os.listdir(self.data_dir) if f.endswith(data_extensions())]
+
+        for schema, symbol in self.lake.datasets():
+            days = self.lake.days(symbol, schema)
+            if not days:
+                # Fetched ranges without any records (e.g., weekends) leave
+                # manifest entries but no partition files
+                ranges = self.lake.held_ranges(symbol, schema)
+                print(f"  {schema}/{symbol}: no records, {_request_date(ranges[0][0])} "
+                      f"to {_request_date(ranges[-1][1])} fetched")
+                continue
+            directory = self.lake.partition_dir(symbol, schema)
+            size_mb = sum(
+                os.path.getsize(os.path.join(directory, f)) for f in os.listdir(directory)
+            ) / (1024 * 1024)
+            print(f"  {schema}/{symbol}: {len(days)} days, {days[0]} to {days[-1]} ({size_mb:.2f} MB)")
 
         if not files:
             print("No data files found in Data directory")
@@ -169,12 +354,15 @@ class DatabentoFetcher:
 
         return files
 
-    def load_csv(self, filename):
+    def load_data(self, filename, columns=None):
         """
-        Load a CSV file from the Data directory
+        Load a data file from the Data directory
+
+        The format is picked from the file extension (.csv, .parquet, .arrow).
 
         Args:
-            filename: Name of the CSV file
+            filename: Name of the data file
+            columns: Optional list of columns to load (the index is always loaded)
 
         Returns:
             DataFrame
@@ -185,11 +373,129 @@ class DatabentoFetcher:
             raise FileNotFoundError(f"File not found: {filepath}")
 
         print(f"Loading data from: {filepath}")
-        df = pd.read_csv(filepath, index_col=0, parse_dates=True)
+        df = storage_for_file(filename).read(filepath, columns=columns)
         print(f"Loaded {len(df)} records")
 
         return df
 
+    def load_range(self, symbol, schema, start_date, end_date, columns=None):
+        """
+        Load partitioned data for a date window
+
+        Only the daily partitions overlapping [start_date, end_date) are read.
+
+        Args:
+            symbol: Symbol (e.g., 'GC.c.0')
+            schema: Databento schema (e.g., 'trades', 'ohlcv-1m')
+            start_date: Start date (string 'YYYY-MM-DD' or datetime)
+            end_date: End date, exclusive (string 'YYYY-MM-DD' or datetime)
+            columns: Optional list of columns to load (the index is always loaded)
+
+        Returns:
+            DataFrame
+        """
+        partitions = self.lake.partitions(symbol, schema, start_date, end_date)
+        print(f"Loading {schema} for {symbol} from {len(partitions)} daily partitions")
+        df = self.lake.read(symbol, schema, start_date, end_date, columns=columns)
+        print(f"Loaded {len(df)} records")
+
+        return df
+
+    def import_file(self, filename, symbol, schema, chunksize=1_000_000):
+        """
+        Split a single data file (e.g., an older trades_*.csv) into daily partitions
+
+        Args:
+            filename: Name of the data file in the Data directory
+            symbol: Symbol the file holds
+            schema: Databento schema of the file (e.g., 'trades')
+            chunksize: Number of rows read at a time
+
+        Returns:
+            Number of partitions written
+        """
+        print(f"Importing {filename} into {self.lake.partition_dir(symbol, schema)}")
+        partitions = self.lake.write_chunks(self.iter_csv(filename, chunksize=chunksize), symbol, schema)
+        print(f"Wrote {partitions} daily partitions")
+
+        return partitions
+
+    def load_csv(self, filename, columns=None):
+        """Load a data file from the Data directory (any supported format)"""
+        return self.load_data(filename, columns=columns)
+
+    def convert(self, filename, storage_format=None, chunksize=1_000_000):
+        """
+        Convert a data file to another storage format, chunk by chunk
+
+        Args:
+            filename: Name of the data file to convert
+            storage_format: Target format (default: the fetcher's format)
+            chunksize: Number of rows converted at a time
+
+        Returns:
+            Name of the converted file
+        """
+        storage = get_storage(storage_format) if storage_format else self.storage
+        target = os.path.splitext(filename)[0] + storage.extension
+        if target == filename:
+            raise ValueError(f"{filename} is already stored as {storage.name}")
+
+        print(f"Converting {filename} -> {target}")
+        storage.write_chunks(
+            self.iter_csv(filename, chunksize=chunksize),
+            os.path.join(self.data_dir, target)
+        )
+        return target
+
+    def iter_csv(self, filename, chunksize=1_000_000, columns=None):
+        """
+        Read a data file from the Data directory in chunks (any supported format)
+
+        Args:
+            filename: Name of the data file
+            chunksize: Number of rows per chunk
+            columns: Optional list of columns to load (the index is always loaded)
+
+        Yields:
+            DataFrames of at most chunksize rows, in file order
+        """
+        filepath = os.path.join(self.data_dir, filename)
+
+        if not os.path.exists(filepath):
+            raise FileNotFoundError(f"File not found: {filepath}")
+
+        print(f"Streaming data from: {filepath} ({chunksize:,} rows per chunk)")
+        yield from storage_for_file(filename).iter_read(filepath, chunksize=chunksize, columns=columns)
+
+
+def _split_ranges(ranges, chunk):
+    """
+    Split (start, end) ranges at day or month boundaries
+
+    Args:
+        ranges: List of (start, end) Timestamps
+        chunk: 'day', 'month', or None to keep the ranges as they are
+    """
+    if chunk is None:
+        return list(ranges)
+    if chunk not in CHUNK_FREQUENCIES:
+        raise ValueError(f"Unknown chunk size: {chunk}. Choose from {list(CHUNK_FREQUENCIES)}")
+
+    pieces = []
+    for start, end in ranges:
+        cuts = pd.date_range(start.normalize(), end, freq=CHUNK_FREQUENCIES[chunk])
+        bounds = [start] + [cut for cut in cuts if start < cut < end] + [end]
+        pieces.extend(zip(bounds[:-1], bounds[1:]))
+    return pieces
+
+
+def _request_date(timestamp):
+    """Date string for whole days, ISO timestamp otherwise"""
+    if timestamp == timestamp.normalize():
+        return timestamp.strftime('%Y-%m-%d')
+    return timestamp.isoformat()
+
 
 def example_usage():
     """Example usage of DatabentoFetcher"""
@@ -0,0 +1,146 @@
+"""
+DBN Reader
+Memory-maps raw Databento binary (DBN) trades files as NumPy structured arrays
+"""
+
+import os
+import struct
+
+import numpy as np
+
+
+DBN_MAGIC = b'DBN'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+# rtype of trade records (MBP-0)
+TRADES_RTYPE = 0x00
+
+# DBN prices are fixed-point integers in units of 1e-9
+FIXED_PRICE_SCALE = 1_000_000_000
+
+# Layout of a DBN trade record (TradeMsg), 48 bytes, little endian
+TRADE_DTYPE = np.dtype([
+    ('length', 'u1'),
+    ('rtype', 'u1'),
+    ('publisher_id', '<u2'),
+    ('instrument_id', '<u4'),
+    ('ts_event', '<u8'),
+    ('price', '<i8'),
+    ('size', '<u4'),
+    ('action', 'S1'),
+    ('side', 'S1'),
+    ('flags', 'u1'),
+    ('depth', 'u1'),
+    ('ts_recv', '<u8'),
+    ('ts_in_delta', '<i4'),
+    ('sequence', '<u4'),
+])
+
+
+class DbnTradesReader:
+    """
+    Zero-copy view of an uncompressed DBN trades file
+
+    The file is memory-mapped and its records exposed as a NumPy structured
+    array, so fields such as price, size, side and ts_event are array views
+    backed by the page cache. No DataFrame is built and nothing is decoded
+    until a field is used.
+    """
+
+    def __init__(self, filepath):
+        """
+        Args:
+            filepath: Path of an uncompressed .dbn file with trades records
+        """
+        self.filepath = filepath
+
+        with open(filepath, 'rb') as f:
+            header = f.read(8)
+
+        if header[:4] == ZSTD_MAGIC:
+            raise ValueError(
+                f"{filepath} is zstd-compressed; memory-mapping needs an uncompressed .dbn file"
+            )
+        if len(header) < 8 or header[:3] != DBN_MAGIC:
+            raise ValueError(f"Not a DBN file: {filepath}")
+
+        self.version = header[3]
+        metadata_length = struct.unpack('<I', header[4:8])[0]
+        self.records_offset = 8 + metadata_length
+
+        count = (os.path.getsize(filepath) - self.records_offset) // TRADE_DTYPE.itemsize
+        if count > 0:
+            self.records = np.memmap(filepath, dtype=TRADE_DTYPE, mode='r',
+                                     offset=self.records_offset, shape=(count,))
+        else:
+            self.records = np.empty(0, dtype=TRADE_DTYPE)
+
+        if count and (self.records['rtype'][0] != TRADES_RTYPE
+                      or self.records['length'][0] * 4 != TRADE_DTYPE.itemsize):
+            raise ValueError(f"{filepath} does not hold trades records")
+
+    def __len__(self):
+        return len(self.records)
+
+    @property
+    def ts_event(self):
+        """Matching-engine timestamps, uint64 nanoseconds since epoch"""
+        return self.records['ts_event']
+
+    @property
+    def ts_recv(self):
+        """Capture-server receive timestamps, uint64 nanoseconds since epoch"""
+        return self.records['ts_recv']
+
+    @property
+    def price_raw(self):
+        """Fixed-point prices (units of 1e-9)"""
+        return self.records['price']
+
+    @property
+    def price(self):
+        """Prices as float64 (computed from the fixed-point field)"""
+        return self.records['price'] / FIXED_PRICE_SCALE
+
+    @property
+    def size(self):
+        """Trade sizes"""
+        return self.records['size']
+
+    @property
+    def side(self):
+        """Aggressor side as bytes: b'B' (buyer), b'A' (seller), b'N' (none)"""
+        return self.records['side']
+
+    def side_codes(self):
+        """Aggressor side as int8: 1 for buys, -1 for sells, 0 for unknown"""
+        return side_codes(self.records['side'])
+
+    def iter_slices(self, chunksize=5_000_000):
+        """Yield consecutive record slices (still memory-mapped views)"""
+        for start in range(0, len(self.records), chunksize):
+            yield self.records[start:start + chunksize]
+
+
+def trade_arrays(records, time_field='ts_recv'):
+    """
+    Arrays needed for bar aggregation from DBN trade records
+
+    Args:
+        records: Structured array with TRADE_DTYPE (e.g., DbnTradesReader.records)
+        time_field: 'ts_recv' (the DataFrame index used elsewhere) or 'ts_event'
+
+    Returns:
+        Tuple of (timestamps int64 ns, prices float64, sizes int64, side codes int8)
+    """
+    return (
+        records[time_field].astype(np.int64),
+        records['price'] / FIXED_PRICE_SCALE,
+        records['size'].astype(np.int64),
+        side_codes(records['side']),
+    )
+
+
+def side_codes(side):
+    """int8 side codes from DBN side bytes: 1 for b'B', -1 for b'A', 0 otherwise"""
+    return (side == b'B').astype(np.int8) - (side == b'A').astype(np.int8)
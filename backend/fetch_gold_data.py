@@ -23,7 +23,7 @@ def fetch_gold_historical_data():
     print()
 
     # Initialize fetcher
-    fetcher = DatabentoFetcher()
+    fetcher = DatabentoFetcher(raw_dbn=True)
 
     # Set parameters for Gold
     # Continuous contract format: [ROOT].[ROLL_RULE].[RANK]
@@ -48,26 +48,25 @@ def fetch_gold_historical_data():
     print("-"*80)
     print("STEP 1: Fetching TRADES data (tick-by-tick)")
     print("-"*80)
-    print("Note: This may take a while due to large date range...")
+    print("Downloading in monthly chunks; rerun to resume if interrupted...")
     print()
 
     try:
-        trades_df = fetcher.fetch_trades(
+        summary = fetcher.download(
             symbols=symbols,
             start_date=start_date,
             end_date=end_date,
+            schema='trades',
             dataset=dataset,
-            stype=stype
+            stype=stype,
+            chunk='month',
+            max_workers=4
         )
 
         print()
         print(f"✓ Trades data fetched successfully!")
-        print(f"  Records: {len(trades_df):,}")
-        print(f"  Date range: {trades_df.index.min()} to {trades_df.index.max()}")
-        print(f"  Columns: {list(trades_df.columns)}")
-        print()
-        print("Sample data:")
-        print(trades_df.head(10))
+        print(f"  Chunks: {summary['chunks']}")
+        print(f"  Records: {summary['records']:,}")
         print()
 
     except Exception as e:
@@ -82,23 +81,21 @@ def fetch_gold_historical_data():
     print()
 
     try:
-        ohlcv_df = fetcher.fetch_ohlcv(
+        summary = fetcher.download(
             symbols=symbols,
             start_date=start_date,
             end_date=end_date,
+            schema='ohlcv-1m',
             dataset=dataset,
-            timeframe='1m',
-            stype=stype
+            stype=stype,
+            chunk='month',
+            max_workers=4
         )
 
         print()
         print(f"✓ OHLCV-1m data fetched successfully!")
-        print(f"  Records: {len(ohlcv_df):,}")
-        print(f"  Date range: {ohlcv_df.index.min()} to {ohlcv_df.index.max()}")
-        print(f"  Columns: {list(ohlcv_df.columns)}")
-        print()
-        print("Sample data:")
-        print(ohlcv_df.head(10))
+        print(f"  Chunks: {summary['chunks']}")
+        print(f"  Records: {summary['records']:,}")
         print()
 
     except Exception as e:
@@ -115,7 +112,7 @@ def fetch_gold_historical_data():
     fetcher.list_available_data()
     print()
     print("Next steps:")
-    print("1. Check the CSV files in backend/Data/")
+    print("1. Check the daily partitions in backend/Data/")
     print("2. Run: python volume_calculator.py to process trades")
     print("3. Run: python run_backtest_with_data.py to backtest")
     print()
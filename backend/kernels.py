@@ -0,0 +1,191 @@
+"""
+Backtest Kernels
+Position state machine and delta bar boundaries over NumPy arrays,
+compiled with numba when it is installed and run as plain Python otherwise
+"""
+
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+
+# Exit reasons recorded by the kernel
+EXIT_SIGNAL = 1
+EXIT_STOP_LOSS = 2
+EXIT_TAKE_PROFIT = 3
+EXIT_TRAILING_STOP = 4
+EXIT_MAX_BARS = 5
+EXIT_DELTA_STOP = 6
+
+EXIT_REASONS = {
+    EXIT_SIGNAL: 'signal',
+    EXIT_STOP_LOSS: 'stop_loss',
+    EXIT_TAKE_PROFIT: 'take_profit',
+    EXIT_TRAILING_STOP: 'trailing_stop',
+    EXIT_MAX_BARS: 'max_bars',
+    EXIT_DELTA_STOP: 'delta_stop',
+}
+
+KERNELS = ('auto', 'numba', 'python')
+
+
+def long_only_kernel(close, signal, delta, capital, position_size,
+                     stop_loss, take_profit, trailing_stop, max_bars, delta_stop):
+    """
+    Walk the bars once and trade one long position at a time.
+
+    Entries and signal exits follow VolumeCumulativeDeltaBacktest.backtest:
+    enter when the signal turns 1 while flat, exit when it is -1 while long.
+    Other exits are checked on each bar close while long, in this order,
+    and a value <= 0 disables them:
+        stop_loss: close at or below entry * (1 - stop_loss)
+        take_profit: close at or above entry * (1 + take_profit)
+        trailing_stop: close at or below highest close since entry * (1 - trailing_stop)
+        max_bars: position held for max_bars bars
+        delta_stop: cumulative delta at or below its highest value since entry - delta_stop
+
+    Args:
+        close: float64 closes
+        signal: int64 signals (1, -1, 0)
+        delta: float64 cumulative delta
+        capital: Starting capital
+        position_size: Fraction of capital per trade
+
+    Returns:
+        Tuple of (entry_bar, exit_bar, size, pnl, exit_reason, n_entries,
+        n_trades, equity, capital). Trade arrays are preallocated and hold
+        n_entries entries and n_trades closed trades; equity has one value
+        per bar from the second bar on.
+    """
+    n = len(close)
+    entry_bar = np.empty(n, np.int64)
+    exit_bar = np.empty(n, np.int64)
+    size = np.empty(n, np.float64)
+    pnl = np.empty(n, np.float64)
+    exit_reason = np.empty(n, np.int8)
+    equity = np.empty(max(n - 1, 0), np.float64)
+
+    n_entries = 0
+    n_trades = 0
+    position = 0.0
+    entry_price = 0.0
+    entry_i = 0
+    high_close = 0.0
+    high_delta = 0.0
+
+    for i in range(1, n):
+        price = close[i]
+
+        if position == 0.0:
+            if signal[i] == 1 and signal[i - 1] != 1:
+                position = (capital * position_size) / price
+                entry_price = price
+                entry_i = i
+                high_close = price
+                high_delta = delta[i]
+                entry_bar[n_entries] = i
+                size[n_entries] = position
+                n_entries += 1
+        else:
+            if price > high_close:
+                high_close = price
+            if delta[i] > high_delta:
+                high_delta = delta[i]
+
+            reason = 0
+            if signal[i] == -1:
+                reason = EXIT_SIGNAL
+            elif stop_loss > 0 and price <= entry_price * (1 - stop_loss):
+                reason = EXIT_STOP_LOSS
+            elif take_profit > 0 and price >= entry_price * (1 + take_profit):
+                reason = EXIT_TAKE_PROFIT
+            elif trailing_stop > 0 and price <= high_close * (1 - trailing_stop):
+                reason = EXIT_TRAILING_STOP
+            elif max_bars > 0 and i - entry_i >= max_bars:
+                reason = EXIT_MAX_BARS
+            elif delta_stop > 0 and delta[i] <= high_delta - delta_stop:
+                reason = EXIT_DELTA_STOP
+
+            if reason != 0:
+                trade_pnl = (price - entry_price) * position
+                capital += trade_pnl
+                exit_bar[n_trades] = i
+                pnl[n_trades] = trade_pnl
+                exit_reason[n_trades] = reason
+                n_trades += 1
+                position = 0.0
+                entry_price = 0.0
+
+        if position > 0.0:
+            equity[i - 1] = capital + (price - entry_price) * position
+        else:
+            equity[i - 1] = capital
+
+    return entry_bar, exit_bar, size, pnl, exit_reason, n_entries, n_trades, equity, capital
+
+
+if numba is not None:
+    _compiled_long_only_kernel = numba.njit(cache=True, nogil=True)(long_only_kernel)
+else:
+    _compiled_long_only_kernel = None
+
+
+def delta_bar_kernel(delta, bar_size):
+    """
+    End positions (exclusive) of delta bars.
+
+    A bar closes on the first trade where its own net delta (since the bar
+    opened) reaches bar_size in either direction. Each end depends on the
+    previous one, so the trades are walked once in order.
+
+    Args:
+        delta: Signed size of each trade (buy positive, sell negative)
+        bar_size: Net delta per bar
+
+    Returns:
+        int64 array of bar ends; the last bar may be short
+    """
+    n = len(delta)
+    ends = np.empty(n, dtype=np.int64)
+    count = 0
+    running = 0.0
+    for i in range(n):
+        running += delta[i]
+        if abs(running) >= bar_size:
+            ends[count] = i + 1
+            count += 1
+            running = 0.0
+    if count == 0 or ends[count - 1] != n:
+        if n > 0:
+            ends[count] = n
+            count += 1
+    return ends[:count]
+
+
+if numba is not None:
+    compiled_delta_bar_kernel = numba.njit(cache=True, nogil=True)(delta_bar_kernel)
+else:
+    compiled_delta_bar_kernel = None
+
+
+def get_kernel(kernel='auto'):
+    """
+    Pick the kernel implementation
+
+    Args:
+        kernel: 'numba' (compiled, requires numba), 'python' (interpreted)
+                or 'auto' (numba when installed)
+
+    Returns:
+        The kernel function
+    """
+    if kernel not in KERNELS:
+        raise ValueError(f"Unknown kernel: {kernel}. Use one of {KERNELS}")
+    if kernel == 'python' or (kernel == 'auto' and _compiled_long_only_kernel is None):
+        return long_only_kernel
+    if _compiled_long_only_kernel is None:
+        raise ImportError("numba is not installed. Install it with: pip install numba")
+    return _compiled_long_only_kernel
@@ -0,0 +1,207 @@
+"""
+Ledger
+Append-only columnar tables for positions, trades and equity, backed by
+NumPy arrays that grow in amortized chunks
+"""
+
+import numpy as np
+import pandas as pd
+
+
+# Field type for timestamps: stored as int64 nanoseconds plus one timezone
+DATETIME = 'datetime'
+
+POSITION_FIELDS = {
+    'type': object,
+    'entry_price': np.float64,
+    'entry_time': DATETIME,
+    'size': np.float64,
+}
+
+TRADE_FIELDS = {
+    'entry_price': np.float64,
+    'exit_price': np.float64,
+    'pnl': np.float64,
+    'return': np.float64,
+    'exit_time': DATETIME,
+    'exit_reason': object,
+}
+
+EQUITY_FIELDS = {
+    'time': DATETIME,
+    'equity': np.float64,
+}
+
+
+class Ledger:
+    """
+    Columnar replacement for a list of dicts
+
+    Rows are kept in one preallocated NumPy array per field; when full,
+    capacity doubles, so appends are amortized O(1) and the per-row cost is
+    a few bytes instead of a dict. Existing list-style use keeps working:
+    len(), indexing and slicing return dicts, iteration yields dicts and a
+    ledger compares equal to a list of the same dicts. Bulk results go
+    through append_columns, and column(), to_frame() and to_arrow() give
+    views for analysis, the API and charts.
+    """
+
+    def __init__(self, fields, capacity=1024):
+        """
+        Args:
+            fields: Dict of field name to NumPy dtype, or DATETIME
+            capacity: Initial number of rows to allocate
+        """
+        self.fields = dict(fields)
+        self.tz = {name: None for name, dtype in self.fields.items() if dtype == DATETIME}
+        self._size = 0
+        self._capacity = max(int(capacity), 1)
+        self._columns = {
+            name: np.empty(self._capacity, np.int64 if dtype == DATETIME else dtype)
+            for name, dtype in self.fields.items()
+        }
+
+    def __len__(self):
+        return self._size
+
+    def __bool__(self):
+        return self._size > 0
+
+    def __iter__(self):
+        return iter(self[:])
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return self._rows(*key.indices(self._size))
+        if key < 0:
+            key += self._size
+        if not 0 <= key < self._size:
+            raise IndexError("ledger index out of range")
+        return self._rows(key, key + 1, 1)[0]
+
+    def __eq__(self, other):
+        if isinstance(other, (Ledger, list)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return f"Ledger({len(self)} rows: {', '.join(self.fields)})"
+
+    def append(self, row):
+        """Append one row given as a dict (missing fields are left empty)"""
+        self._reserve(self._size + 1)
+        i = self._size
+        for name, dtype in self.fields.items():
+            value = row.get(name)
+            if dtype == DATETIME:
+                value = self._datetime_value(name, value)
+            elif value is None and dtype is not object:
+                value = np.nan
+            self._columns[name][i] = value
+        self._size += 1
+
+    def extend(self, rows):
+        """Append rows given as dicts"""
+        for row in rows:
+            self.append(row)
+
+    def append_columns(self, columns):
+        """
+        Append many rows at once from a dict of equal-length arrays
+
+        DATETIME fields take a DatetimeIndex (or datetime64 array);
+        missing fields are left empty.
+        """
+        lengths = {len(values) for values in columns.values()}
+        if len(lengths) > 1:
+            raise ValueError("All columns must have the same length")
+        count = lengths.pop() if lengths else 0
+        if count == 0:
+            return
+
+        self._reserve(self._size + count)
+        start, end = self._size, self._size + count
+        for name, dtype in self.fields.items():
+            target = self._columns[name]
+            if name not in columns:
+                target[start:end] = np.iinfo(np.int64).min if dtype == DATETIME else (
+                    None if dtype is object else np.nan)
+            elif dtype == DATETIME:
+                times = pd.DatetimeIndex(columns[name])
+                self._set_tz(name, times.tz)
+                target[start:end] = times.as_unit('ns').asi8
+            else:
+                target[start:end] = columns[name]
+        self._size = end
+
+    def column(self, name):
+        """Read-only view of a field (DATETIME fields as a DatetimeIndex)"""
+        if self.fields[name] == DATETIME:
+            return self._datetimes(name, self._columns[name][:self._size])
+        view = self._columns[name][:self._size]
+        view.flags.writeable = False
+        return view
+
+    def to_frame(self):
+        """DataFrame of the rows (numeric columns wrap the ledger arrays without copying)"""
+        return pd.DataFrame(
+            {name: self.column(name) for name in self.fields},
+            copy=False
+        )
+
+    def to_arrow(self):
+        """pyarrow Table of the rows (numeric columns are zero-copy)"""
+        import pyarrow as pa
+
+        arrays = {}
+        for name, dtype in self.fields.items():
+            values = self._columns[name][:self._size]
+            if dtype == DATETIME:
+                arrays[name] = pa.array(values.view('datetime64[ns]'),
+                                        type=pa.timestamp('ns', tz=self.tz[name]))
+            else:
+                arrays[name] = pa.array(values)
+        return pa.table(arrays)
+
+    def to_records(self):
+        """Rows as a list of dicts"""
+        return self[:]
+
+    def _rows(self, start, stop, step):
+        columns = {}
+        for name, dtype in self.fields.items():
+            values = self._columns[name][start:stop:step]
+            if dtype == DATETIME:
+                columns[name] = list(self._datetimes(name, values))
+            else:
+                columns[name] = values.tolist()
+        names = list(columns)
+        return [dict(zip(names, row)) for row in zip(*columns.values())]
+
+    def _datetimes(self, name, values):
+        times = pd.DatetimeIndex(values.view('datetime64[ns]'))
+        tz = self.tz[name]
+        return times.tz_localize('UTC').tz_convert(tz) if tz is not None else times
+
+    def _datetime_value(self, name, value):
+        if value is None:
+            return np.iinfo(np.int64).min
+        value = pd.Timestamp(value)
+        self._set_tz(name, value.tz)
+        return value.as_unit('ns').value
+
+    def _set_tz(self, name, tz):
+        if self._size == 0:
+            self.tz[name] = tz
+        elif (self.tz[name] is None) != (tz is None):
+            raise ValueError(f"Cannot mix timezone-aware and naive times in {name}")
+
+    def _reserve(self, needed):
+        if needed <= self._capacity:
+            return
+        capacity = max(needed, self._capacity * 2)
+        for name, values in self._columns.items():
+            grown = np.empty(capacity, values.dtype)
+            grown[:self._size] = values[:self._size]
+            self._columns[name] = grown
+        self._capacity = capacity
@@ -0,0 +1,184 @@
+"""
+Live Delta Engine
+Incremental bars, cumulative delta and signals from a stream of trades
+"""
+
+import numpy as np
+import pandas as pd
+
+from main import delta_signals
+from trade_classification import TradeClassifier
+from volume_calculator import VolumeCalculator
+
+
+class LiveDeltaEngine:
+    """
+    Consumes trades one at a time (or in micro-batches) and emits each bar
+    when it closes, with its cumulative delta and signal
+
+    Only the open bar and the running cumulative delta are kept, so every
+    trade costs the same constant work regardless of how much history has
+    been seen. Bars are the same as process_trades_to_bars (bins counted
+    from midnight of the first trading day, empty bins skipped) and
+    signals follow generate_signals.
+    """
+
+    def __init__(self, frequency='1min', threshold=1000, tz=None, on_bar=None):
+        """
+        Args:
+            frequency: Fixed time bar frequency (e.g., '1min', '5min', '1h')
+            threshold: Cumulative delta threshold for signals
+            tz: Timezone of integer timestamps (default: taken from the
+                first Timestamp or DataFrame index, naive for plain integers)
+            on_bar: Optional callback called with each closed bar
+        """
+        offset = pd.tseries.frequencies.to_offset(frequency)
+        if not isinstance(offset, pd.offsets.Tick):
+            raise ValueError(f"Live bars require a fixed bar frequency, got: {frequency}")
+
+        self.frequency = frequency
+        self.freq_ns = offset.nanos
+        self.threshold = threshold
+        self.tz = tz
+        self.on_bar = on_bar
+
+        self.origin = None
+        self.cumulative_delta = 0
+        self.signal = 0
+        self.bars_emitted = 0
+        self.trades_seen = 0
+        # Side inference state for feeds without an aggressor flag
+        self.classifier = TradeClassifier()
+
+        # Open bar
+        self._bin = None
+        self._last_ns = None
+        self._close = None
+        self._buy_volume = 0
+        self._sell_volume = 0
+
+    def on_trade(self, timestamp, price, size, side):
+        """
+        Add one trade
+
+        Args:
+            timestamp: pd.Timestamp or int nanoseconds since epoch
+            price: Trade price
+            size: Trade size
+            side: Databento side ('B', 'A', 'N'), 'buy'/'sell', a side code,
+                  or None to classify the trade with the tick rule
+
+        Returns:
+            The bar closed by this trade, or None
+        """
+        if isinstance(timestamp, (int, np.integer)):
+            ts_ns = int(timestamp)
+        else:
+            timestamp = pd.Timestamp(timestamp)
+            if self.tz is None:
+                self.tz = timestamp.tz
+            ts_ns = timestamp.value
+
+        if side is None:
+            code = int(self.classifier.classify([price])[0])
+        elif isinstance(side, (int, np.integer)):
+            code = side
+        else:
+            code = VolumeCalculator.side_code(side)
+        return self._add(ts_ns, price, size, code)
+
+    def on_trades(self, trades_df):
+        """
+        Add a micro-batch of trades
+
+        Args:
+            trades_df: DataFrame with trade data, in time order
+
+        Returns:
+            List of bars closed by the batch
+        """
+        if trades_df.empty:
+            return []
+
+        index, timestamps, prices, sizes, codes = VolumeCalculator._trade_arrays(trades_df, self.classifier)
+        if self.tz is None:
+            self.tz = index.tz
+
+        closed = []
+        for ts_ns, price, size, code in zip(timestamps.tolist(), prices.tolist(),
+                                            sizes.tolist(), codes.tolist()):
+            bar = self._add(ts_ns, price, size, code)
+            if bar is not None:
+                closed.append(bar)
+        return closed
+
+    def flush(self):
+        """Close the open bar (end of session or replay); returns it or None"""
+        if self._bin is None:
+            return None
+        bar = self._close_bar()
+        self._bin = None
+        return bar
+
+    def replay(self, trade_chunks):
+        """
+        Feed chunks of trades (e.g., ParquetStorage.iter_read of a saved
+        trades file) and yield bars as they close, then the final open bar
+        """
+        for chunk in trade_chunks:
+            yield from self.on_trades(chunk)
+        bar = self.flush()
+        if bar is not None:
+            yield bar
+
+    @staticmethod
+    def bars_to_frame(bars):
+        """DataFrame of emitted bars, indexed by bar start time"""
+        return pd.DataFrame(list(bars)).set_index('time')
+
+    def _add(self, ts_ns, price, size, code):
+        if self._last_ns is not None and ts_ns < self._last_ns:
+            raise ValueError("Trades must arrive in time order")
+        self._last_ns = ts_ns
+        self.trades_seen += 1
+
+        if self.origin is None:
+            self.origin = VolumeCalculator._day_origin(ts_ns, self.tz)
+        bin_no = (ts_ns - self.origin) // self.freq_ns
+
+        closed = None
+        if bin_no != self._bin:
+            if self._bin is not None:
+                closed = self._close_bar()
+            self._bin = bin_no
+            self._buy_volume = 0
+            self._sell_volume = 0
+
+        self._close = price
+        if code == 1:
+            self._buy_volume += size
+        elif code == -1:
+            self._sell_volume += size
+        return closed
+
+    def _close_bar(self):
+        delta = self._buy_volume - self._sell_volume
+        self.cumulative_delta += delta
+        self.signal = int(delta_signals(self.cumulative_delta, self.threshold))
+        self.bars_emitted += 1
+
+        start_ns = self.origin + self._bin * self.freq_ns
+        time = pd.Timestamp(start_ns, tz='UTC').tz_convert(self.tz) if self.tz else pd.Timestamp(start_ns)
+        bar = {
+            'time': time,
+            'close': self._close,
+            'buy_volume': self._buy_volume,
+            'sell_volume': self._sell_volume,
+            'total_volume': self._buy_volume + self._sell_volume,
+            'delta': delta,
+            'cumulative_delta': self.cumulative_delta,
+            'signal': self.signal,
+        }
+        if self.on_bar is not None:
+            self.on_bar(bar)
+        return bar
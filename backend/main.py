@@ -3,6 +3,23 @@ import numpy as np
 from datetime import datetime, timedelta
 import json
 
+from kernels import EXIT_REASONS, get_kernel
+from ledger import EQUITY_FIELDS, POSITION_FIELDS, TRADE_FIELDS, Ledger
+from metrics import DEFAULT_PERIODS_PER_YEAR, periods_per_year, risk_metrics
+
+# Cells (bars x strategies) evaluated at once by backtest_matrix
+MATRIX_BLOCK_CELLS = 2_000_000
+
+# 'long' opens longs on a new 1 and exits on -1; 'long_short' also opens
+# shorts on a new -1 and flips between the two on opposite signals
+DIRECTIONS = ('long', 'long_short')
+
+# Kernel exit reason codes to trade labels
+_EXIT_REASON_LABELS = np.array(
+    [EXIT_REASONS.get(code) for code in range(max(EXIT_REASONS) + 1)], dtype=object
+)
+
+
 class VolumeCumulativeDeltaBacktest:
     """
     A backtesting engine for analyzing the impact of futures volume 
@@ -12,9 +29,9 @@ class VolumeCumulativeDeltaBacktest:
     def __init__(self, initial_capital=10000):
         self.initial_capital = initial_capital
         self.capital = initial_capital
-        self.positions = []
-        self.trades = []
-        self.equity_curve = []
+        self.positions = Ledger(POSITION_FIELDS)
+        self.trades = Ledger(TRADE_FIELDS)
+        self.equity_curve = Ledger(EQUITY_FIELDS)
         
     def calculate_cumulative_delta(self, data):
         """
@@ -31,105 +48,519 @@ class VolumeCumulativeDeltaBacktest:
         Buy when cumulative delta crosses above threshold
         Sell when cumulative delta crosses below -threshold
         """
-        data['signal'] = 0
-        
-        # Buy signal when cumulative delta increases above threshold
-        data.loc[data['cumulative_delta'] > threshold, 'signal'] = 1
-        
-        # Sell signal when cumulative delta drops below -threshold
-        data.loc[data['cumulative_delta'] < -threshold, 'signal'] = -1
-        
+        data['signal'] = delta_signals(data['cumulative_delta'].to_numpy(), threshold)
         return data
+
+    def generate_signal_matrix(self, data, thresholds):
+        """
+        Signals for many thresholds at once.
+        Returns an int8 array with one row per bar and one column per
+        threshold; column j equals generate_signals(data, thresholds[j]).
+        Does not modify data.
+        """
+        return delta_signal_matrix(data['cumulative_delta'].to_numpy(), thresholds)
     
-    def backtest(self, data, position_size=0.1):
+    def backtest(self, data, position_size=0.1, engine='loop', direction='long'):
         """
         Execute backtest with the given data and position size.
         position_size: fraction of capital to risk per trade (0.1 = 10%)
+        engine: 'loop' walks the bars one at a time, 'vectorized' derives
+                the same trades and equity curve with NumPy array operations,
+                'compiled' runs the bar loop as a kernel (see backtest_kernel)
+        direction: 'long', or 'long_short' to also go short when the signal
+                   turns -1 (an open long flips short on -1, an open short
+                   flips long on 1); not supported by the compiled engine
         """
-        position = 0
+        if direction not in DIRECTIONS:
+            raise ValueError(f"Unknown direction: {direction}. Use one of {DIRECTIONS}")
+        if engine == 'compiled':
+            if direction != 'long':
+                raise ValueError("The compiled engine trades long only; use engine='vectorized'")
+            return self.backtest_kernel(data, position_size=position_size)
+        if engine == 'vectorized':
+            return self.backtest_arrays(
+                data['close'].to_numpy(),
+                data['signal'].to_numpy(),
+                data.index,
+                position_size=position_size,
+                direction=direction
+            )
+        if engine != 'loop':
+            raise ValueError(f"Unknown backtest engine: {engine}")
+
+        position = 0  # Signed size: > 0 long, < 0 short
         entry_price = 0
-        
+        close = data['close']
+        signals = data['signal']
+
         for i in range(1, len(data)):
-            current_price = data['close'].iloc[i]
-            signal = data['signal'].iloc[i]
-            prev_signal = data['signal'].iloc[i-1]
-            
-            # Enter long position
-            if signal == 1 and prev_signal != 1 and position == 0:
-                position = (self.capital * position_size) / current_price
-                entry_price = current_price
+            position, entry_price = self.step(
+                position, entry_price, close.iloc[i], signals.iloc[i], signals.iloc[i-1],
+                data.index[i], position_size=position_size, direction=direction
+            )
+
+    def step(self, position, entry_price, price, signal, prev_signal, time,
+             position_size=0.1, direction='long'):
+        """
+        Trade one bar with the rules of the backtest() loop.
+        Records exits, entries and the bar's equity in the ledgers and
+        returns the new (position, entry_price); position is the signed
+        size (> 0 long, < 0 short, 0 flat). Live strategies call it on each
+        closed bar to trade exactly like the loop.
+        """
+        # Exit on the opposite signal
+        if (signal == -1 and position > 0) or (signal == 1 and position < 0):
+            side = 1 if position > 0 else -1
+            pnl = (price - entry_price) * position
+            self.capital += pnl
+            self.trades.append({
+                'entry_price': entry_price,
+                'exit_price': price,
+                'pnl': pnl,
+                'return': side * (price - entry_price) / entry_price * 100,
+                'exit_time': time,
+                'exit_reason': 'signal'
+            })
+            position = 0
+            entry_price = 0
+
+        # Enter long position (or short, in long_short mode) when flat
+        if position == 0:
+            if signal == 1 and prev_signal != 1:
+                side, position_type = 1, 'LONG'
+            elif signal == -1 and prev_signal != -1 and direction == 'long_short':
+                side, position_type = -1, 'SHORT'
+            else:
+                side = 0
+
+            if side:
+                size = (self.capital * position_size) / price
+                position = side * size
+                entry_price = price
                 self.positions.append({
-                    'type': 'LONG',
-                    'entry_price': entry_price,
-                    'entry_time': data.index[i],
-                    'size': position
-                })
-            
-            # Exit long position
-            elif signal == -1 and position > 0:
-                pnl = (current_price - entry_price) * position
-                self.capital += pnl
-                self.trades.append({
+                    'type': position_type,
                     'entry_price': entry_price,
-                    'exit_price': current_price,
-                    'pnl': pnl,
-                    'return': (current_price - entry_price) / entry_price * 100,
-                    'exit_time': data.index[i]
+                    'entry_time': time,
+                    'size': size
                 })
-                position = 0
-                entry_price = 0
-            
-            # Track equity
-            if position > 0:
-                unrealized_pnl = (current_price - entry_price) * position
-                current_equity = self.capital + unrealized_pnl
-            else:
-                current_equity = self.capital
-            
-            self.equity_curve.append({
-                'time': data.index[i],
-                'equity': current_equity
-            })
-    
-    def get_performance_metrics(self):
-        """Calculate and return performance metrics."""
-        if not self.trades:
+
+        # Track equity
+        if position != 0:
+            unrealized_pnl = (price - entry_price) * position
+            current_equity = self.capital + unrealized_pnl
+        else:
+            current_equity = self.capital
+
+        self.equity_curve.append({
+            'time': time,
+            'equity': current_equity
+        })
+        return position, entry_price
+
+    def backtest_kernel(self, data, position_size=0.1, stop_loss=None, take_profit=None,
+                        trailing_stop=None, max_bars=None, delta_stop=None, kernel='auto'):
+        """
+        Bar-by-bar backtest in a compiled kernel, with optional exits.
+
+        Runs the position state machine of backtest() over contiguous
+        close, signal and cumulative_delta arrays. The kernel is compiled
+        with numba when it is installed and runs as plain Python otherwise;
+        both give identical results. Exits are checked on bar closes:
+        stop_loss, take_profit and trailing_stop are fractions of price
+        (0.02 = 2%), max_bars is a number of bars in the trade and
+        delta_stop a drop of cumulative delta from its high since entry.
+        kernel: 'auto', 'numba' or 'python' (see kernels.get_kernel)
+        """
+        run = get_kernel(kernel)
+        close = np.ascontiguousarray(data['close'].to_numpy(), dtype=np.float64)
+        signal = np.ascontiguousarray(data['signal'].to_numpy(), dtype=np.int64)
+        if 'cumulative_delta' in data:
+            delta = np.ascontiguousarray(data['cumulative_delta'].to_numpy(), dtype=np.float64)
+        else:
+            delta = np.zeros(len(close))
+        if len(close) < 2:
+            return
+
+        (entry_bar, exit_bar, sizes, pnl, exit_reason,
+         n_entries, n_trades, equity, capital) = run(
+            close, signal, delta, float(self.capital), float(position_size),
+            float(stop_loss or 0), float(take_profit or 0), float(trailing_stop or 0),
+            int(max_bars or 0), float(delta_stop or 0)
+        )
+
+        index = data.index
+        entry_bar = entry_bar[:n_entries]
+        exit_bar = exit_bar[:n_trades]
+        entry_prices = close[entry_bar]
+        exit_prices = close[exit_bar]
+
+        self.positions.append_columns({
+            'type': np.full(n_entries, 'LONG', dtype=object),
+            'entry_price': entry_prices,
+            'entry_time': index[entry_bar],
+            'size': sizes[:n_entries]
+        })
+        self.trades.append_columns({
+            'entry_price': entry_prices[:n_trades],
+            'exit_price': exit_prices,
+            'pnl': pnl[:n_trades],
+            'return': (exit_prices - entry_prices[:n_trades]) / entry_prices[:n_trades] * 100,
+            'exit_time': index[exit_bar],
+            'exit_reason': _EXIT_REASON_LABELS[exit_reason[:n_trades]]
+        })
+        self.equity_curve.append_columns({'time': index[1:], 'equity': equity})
+
+        self.capital = capital
+
+    def backtest_arrays(self, close, signal, index, position_size=0.1, direction='long'):
+        """
+        Vectorized backtest over plain arrays.
+
+        Produces the same positions, trades and equity curve as the bar
+        loop in backtest(), without touching the bars one at a time:
+        1. Entry candidates are bars where the signal turns 1, exit
+           candidates are bars where the signal is -1
+        2. The position state is the forward-filled type of the most
+           recent candidate (a long is open after an entry candidate and
+           closed after an exit candidate)
+        3. Compounded capital is the cumulative product of trade growth
+
+        With direction='long_short' the bars where the signal turns 1 or
+        -1 are the candidates and the forward-filled side of the latest one
+        (1 long, -1 short) is the position; every change of side closes
+        the previous trade and opens the next, so flips cost no extra pass.
+        """
+        close = np.asarray(close, dtype=float)
+        signal = np.asarray(signal)
+        if len(close) < 2:
+            return
+
+        if direction not in DIRECTIONS:
+            raise ValueError(f"Unknown direction: {direction}. Use one of {DIRECTIONS}")
+
+        # The loop starts at the second bar, so does everything below
+        prices = close[1:]
+        times = index[1:]
+        is_entry = (signal[1:] == 1) & (signal[:-1] != 1)
+
+        if direction == 'long':
+            is_exit = signal[1:] == -1
+            held = _position_state(is_entry, is_exit)
+            prev_held = np.concatenate(([False], held[:-1]))
+            entries = is_entry & ~prev_held
+            exits = is_exit & prev_held
+            side = held.astype(np.int8)
+        else:
+            side = _position_side(is_entry, (signal[1:] == -1) & (signal[:-1] != -1))
+            prev_side = np.concatenate(([0], side[:-1]))
+            changed = side != prev_side
+            entries = changed & (side != 0)
+            exits = changed & (prev_side != 0)
+            held = side != 0
+
+        entry_idx = np.flatnonzero(entries)
+        exit_idx = np.flatnonzero(exits)
+        closed = len(exit_idx)
+
+        entry_prices = prices[entry_idx]
+        exit_prices = prices[exit_idx]
+        sides = side[entry_idx]
+
+        # Capital available before each entry
+        growth = 1 + position_size * sides[:closed] * (exit_prices - entry_prices[:closed]) / entry_prices[:closed]
+        capital_before = self.capital * np.concatenate(([1.0], np.cumprod(growth)))
+        sizes = (capital_before[:len(entry_idx)] * position_size) / entry_prices
+
+        pnl = sides[:closed] * (exit_prices - entry_prices[:closed]) * sizes[:closed]
+        realized = np.concatenate(([self.capital], capital_before[:closed] + pnl))
+
+        # Equity: realized capital after the exits so far plus open PnL
+        trade_no = np.cumsum(entries) - 1
+        open_pnl = np.where(
+            held,
+            sides[trade_no] * (prices - entry_prices[trade_no]) * sizes[trade_no],
+            0.0
+        ) if len(entry_idx) else np.zeros(len(prices))
+        equity = realized[np.cumsum(exits)] + open_pnl
+
+        self.positions.append_columns({
+            'type': np.where(sides > 0, 'LONG', 'SHORT').astype(object),
+            'entry_price': entry_prices,
+            'entry_time': times[entry_idx],
+            'size': sizes
+        })
+        self.trades.append_columns({
+            'entry_price': entry_prices[:closed],
+            'exit_price': exit_prices,
+            'pnl': pnl,
+            'return': sides[:closed] * (exit_prices - entry_prices[:closed]) / entry_prices[:closed] * 100,
+            'exit_time': times[exit_idx],
+            'exit_reason': np.full(closed, 'signal', dtype=object)
+        })
+        self.equity_curve.append_columns({'time': times, 'equity': equity})
+
+        self.capital = float(realized[-1])
+
+    def backtest_matrix(self, close, signals, position_size=0.1, block_size=None, index=None):
+        """
+        Backtest every column of a signal matrix in one vectorized pass.
+
+        Uses the same rules as backtest_arrays, applied to all columns at
+        once (see _position_state), and returns the get_performance_metrics
+        of each column without recording positions, trades or equity.
+        Columns are processed in blocks of block_size so memory stays
+        bounded on long histories.
+
+        Args:
+            close: Close prices, one per bar
+            signals: 2-D array (bars x strategies), e.g. from generate_signal_matrix
+            position_size: Fraction of capital per trade
+            block_size: Columns per block (default: about MATRIX_BLOCK_CELLS cells)
+            index: Bar times, to annualize the risk metrics as a single run
+                   would (DEFAULT_PERIODS_PER_YEAR if None)
+
+        Returns:
+            DataFrame with one row of performance metrics per column
+        """
+        close = np.asarray(close, dtype=float)
+        signals = np.asarray(signals)
+        if signals.ndim != 2 or len(signals) != len(close):
+            raise ValueError("signals must be a 2-D array with one row per bar")
+
+        n_columns = signals.shape[1]
+        block_size = block_size or max(1, MATRIX_BLOCK_CELLS // max(len(close), 1))
+        bars_per_year = DEFAULT_PERIODS_PER_YEAR if index is None else periods_per_year(index[1:])
+        blocks = [
+            self._matrix_metrics(close, signals[:, start:start + block_size], position_size, bars_per_year)
+            for start in range(0, n_columns, block_size)
+        ]
+        if not blocks:
+            return pd.DataFrame()
+        return pd.concat(blocks, ignore_index=True)
+
+    def _matrix_metrics(self, close, signals, position_size, bars_per_year):
+        """Performance metrics of one block of signal columns"""
+        columns = signals.shape[1]
+        if len(close) < 2:
+            zeros = np.zeros(columns)
+            risk = risk_metrics(np.full((1, columns), float(self.capital)),
+                                np.zeros((0, columns), dtype=bool), zeros, bars_per_year)
+            return self._metrics_frame(zeros, zeros, zeros, zeros, zeros, zeros,
+                                       np.full(columns, float(self.capital)), risk)
+
+        prices = close[1:, None]
+        is_entry = (signals[1:] == 1) & (signals[:-1] != 1)
+        is_exit = signals[1:] == -1
+
+        held = _position_state(is_entry, is_exit)
+        prev_held = np.zeros_like(held)
+        prev_held[1:] = held[:-1]
+        entries = is_entry & ~prev_held
+        exits = is_exit & prev_held
+
+        # Entry price of the trade each exit closes
+        rows = np.arange(len(entries))[:, None]
+        last_entry = np.maximum.accumulate(np.where(entries, rows, 0), axis=0)
+        entry_prices = np.take_along_axis(np.broadcast_to(prices, entries.shape), last_entry, axis=0)
+
+        # Compounded capital before each exit, as in backtest_arrays
+        growth = np.where(exits, 1 + position_size * (prices - entry_prices) / entry_prices, 1.0)
+        compounded = np.cumprod(growth, axis=0)
+        capital_before = np.empty_like(compounded)
+        capital_before[0] = self.capital
+        capital_before[1:] = self.capital * compounded[:-1]
+
+        pnl = (prices - entry_prices) * ((capital_before * position_size) / entry_prices)
+        wins = exits & (pnl > 0)
+        losses = exits & (pnl < 0)
+
+        last_exits = np.maximum.accumulate(np.where(exits, rows, -1), axis=0)
+        last_exit = last_exits[-1]
+        closed = last_exit >= 0
+        final_pnl = np.take_along_axis(pnl, np.maximum(last_exit, 0)[None, :], axis=0)[0]
+        final_before = np.take_along_axis(capital_before, np.maximum(last_exit, 0)[None, :], axis=0)[0]
+        final_capital = np.where(closed, final_before + final_pnl, float(self.capital))
+
+        # Equity per bar (realized capital plus open PnL) for the risk metrics
+        sizes = np.take_along_axis(capital_before * position_size / prices, last_entry, axis=0)
+        realized = np.take_along_axis(capital_before + pnl, np.maximum(last_exits, 0), axis=0)
+        realized = np.where(last_exits >= 0, realized, float(self.capital))
+        equity = np.empty((len(close), columns))
+        equity[0] = self.capital
+        equity[1:] = realized + np.where(held, (prices - entry_prices) * sizes, 0.0)
+        notional = (np.where(entries, capital_before * position_size, 0.0)
+                    + np.where(exits, prices * sizes, 0.0)).sum(axis=0)
+        risk = risk_metrics(equity, held, notional, bars_per_year)
+
+        return self._metrics_frame(
+            exits.sum(axis=0),
+            wins.sum(axis=0),
+            losses.sum(axis=0),
+            np.where(wins, pnl, 0.0).sum(axis=0),
+            -np.where(losses, pnl, 0.0).sum(axis=0),
+            closed,
+            final_capital,
+            risk,
+        )
+
+    def _metrics_frame(self, total, winning, losing, total_wins, total_losses, closed, final_capital, risk):
+        """get_performance_metrics columns from per-strategy totals"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            win_rate = np.where(total > 0, winning / total * 100, 0.0)
+            avg_win = np.where(winning > 0, total_wins / winning, 0.0)
+            avg_loss = np.where(losing > 0, total_losses / losing, 0.0)
+            profit_factor = total_wins / np.where(losing > 0, total_losses, 1.0)
+        total_return = (final_capital - self.initial_capital) / self.initial_capital * 100
+
+        return pd.DataFrame({
+            'total_trades': total.astype(int),
+            'winning_trades': winning.astype(int),
+            'losing_trades': losing.astype(int),
+            'final_capital': np.round(final_capital, 2),
+            'total_return': np.where(closed, np.round(total_return, 2), 0.0),
+            'win_rate': np.round(win_rate, 2),
+            'avg_win': np.round(avg_win, 2),
+            'avg_loss': np.round(avg_loss, 2),
+            'profit_factor': np.round(profit_factor, 2),
+            **risk,
+        })
+
+    def get_performance_metrics(self, cost_model=None):
+        """
+        Calculate and return performance metrics.
+        cost_model: optional costs.CostModel; trades and final capital are
+                    then net of commission and slippage (see cost_trades)
+        The risk metrics (drawdown, Sharpe, Sortino, Calmar, exposure,
+        turnover) come from the gross equity curve, see metrics.risk_metrics.
+        """
+        trades = self.trades if cost_model is None else self.cost_trades(cost_model)
+        costs = {}
+        capital = self.capital
+        if cost_model is not None:
+            total_costs = trades.column('commission').sum() + trades.column('slippage').sum()
+            costs = {'total_costs': round(float(total_costs), 2)}
+            capital = self.capital - self.trades.column('pnl').sum() + trades.column('pnl').sum()
+        risk = self.risk_metrics()
+
+        if not trades:
             return {
                 'total_trades': 0,
-                'final_capital': self.capital,
+                'final_capital': capital,
                 'total_return': 0,
                 'win_rate': 0,
                 'avg_win': 0,
                 'avg_loss': 0,
-                'profit_factor': 0
+                'profit_factor': 0,
+                **risk,
+                **costs
             }
         
-        trades_df = pd.DataFrame(self.trades)
-        winning_trades = trades_df[trades_df['pnl'] > 0]
-        losing_trades = trades_df[trades_df['pnl'] < 0]
+        pnl = trades.column('pnl')
+        winning_trades = pnl[pnl > 0]
+        losing_trades = pnl[pnl < 0]
         
-        total_return = ((self.capital - self.initial_capital) / self.initial_capital) * 100
-        win_rate = len(winning_trades) / len(trades_df) * 100 if len(trades_df) > 0 else 0
+        total_return = ((capital - self.initial_capital) / self.initial_capital) * 100
+        win_rate = len(winning_trades) / len(pnl) * 100 if len(pnl) > 0 else 0
         
-        avg_win = winning_trades['pnl'].mean() if len(winning_trades) > 0 else 0
-        avg_loss = abs(losing_trades['pnl'].mean()) if len(losing_trades) > 0 else 0
+        avg_win = winning_trades.mean() if len(winning_trades) > 0 else 0
+        avg_loss = abs(losing_trades.mean()) if len(losing_trades) > 0 else 0
         
-        total_wins = winning_trades['pnl'].sum() if len(winning_trades) > 0 else 0
-        total_losses = abs(losing_trades['pnl'].sum()) if len(losing_trades) > 0 else 1
+        total_wins = winning_trades.sum() if len(winning_trades) > 0 else 0
+        total_losses = abs(losing_trades.sum()) if len(losing_trades) > 0 else 1
         profit_factor = total_wins / total_losses if total_losses > 0 else 0
         
         return {
-            'total_trades': len(trades_df),
+            'total_trades': len(pnl),
             'winning_trades': len(winning_trades),
             'losing_trades': len(losing_trades),
-            'final_capital': round(self.capital, 2),
+            'final_capital': round(capital, 2),
             'total_return': round(total_return, 2),
             'win_rate': round(win_rate, 2),
             'avg_win': round(avg_win, 2),
             'avg_loss': round(avg_loss, 2),
-            'profit_factor': round(profit_factor, 2)
+            'profit_factor': round(profit_factor, 2),
+            **risk,
+            **costs
         }
 
+    def risk_metrics(self):
+        """metrics.risk_metrics of the equity curve, positions and trades"""
+        equity = np.concatenate(([float(self.initial_capital)], self.equity_curve.column('equity')))
+        risk = risk_metrics(equity, self.held_bars(), self.traded_notional(),
+                            periods_per_year(self.equity_curve.column('time')))
+        return {name: value.item() for name, value in risk.items()}
+
+    def held_bars(self):
+        """Bool array, True on the equity curve bars with a position open"""
+        bar_times = self.equity_curve.column('time').asi8
+        entries = np.searchsorted(bar_times, self.positions.column('entry_time').asi8)
+        exits = np.full(len(entries), len(bar_times))
+        closed = min(len(self.trades), len(entries))
+        exits[:closed] = np.searchsorted(bar_times, self.trades.column('exit_time').asi8[:closed])
+
+        # +1 where a position opens, -1 where it closes; open while the sum is positive
+        changes = np.zeros(len(bar_times) + 1, dtype=np.int64)
+        np.add.at(changes, entries, 1)
+        np.add.at(changes, exits, -1)
+        return np.cumsum(changes[:-1]) > 0
+
+    def traded_notional(self):
+        """Notional of all entries and exits"""
+        sizes = self.positions.column('size')
+        closed = min(len(self.trades), len(sizes))
+        return float((sizes * self.positions.column('entry_price')).sum()
+                     + (sizes[:closed] * self.trades.column('exit_price')[:closed]).sum())
+
+    def cost_trades(self, cost_model):
+        """Trade ledger net of costs (see costs.CostModel.apply)"""
+        return cost_model.apply(self.trades, self.positions)
+
+
+def delta_signals(cumulative_delta, threshold):
+    """
+    Signal array for generate_signals: 1 above threshold, -1 below
+    -threshold, 0 otherwise.
+    """
+    return np.where(cumulative_delta > threshold, 1,
+                    np.where(cumulative_delta < -threshold, -1, 0))
+
+
+def delta_signal_matrix(cumulative_delta, thresholds):
+    """
+    Signals for a vector of thresholds by broadcasting: one row per bar,
+    one column per threshold, same rule as delta_signals.
+    """
+    cumulative_delta = np.asarray(cumulative_delta, dtype=float)[:, None]
+    thresholds = np.asarray(thresholds, dtype=float)[None, :]
+    return np.where(cumulative_delta > thresholds, 1,
+                    np.where(cumulative_delta < -thresholds, -1, 0)).astype(np.int8)
+
+
+def _position_state(entry_events, exit_events):
+    """
+    Position state after each bar given entry and exit candidates.
+
+    A long is open after a bar when the most recent candidate at or before
+    it was an entry. Works along the first axis, so a 2-D array of
+    candidates gives one state column per strategy.
+    """
+    events = entry_events.astype(np.int8) - exit_events.astype(np.int8)
+    rows = np.arange(len(events)).reshape((-1,) + (1,) * (events.ndim - 1))
+    last = np.maximum.accumulate(np.where(events != 0, rows, -1), axis=0)
+    last_event = np.take_along_axis(events, np.maximum(last, 0), axis=0)
+    return (last >= 0) & (last_event == 1)
+
+
+def _position_side(long_events, short_events):
+    """
+    Side held after each bar in long_short mode: the side of the most
+    recent event (1 long, -1 short), 0 before the first one.
+    """
+    events = long_events.astype(np.int8) - short_events.astype(np.int8)
+    rows = np.arange(len(events))
+    last = np.maximum.accumulate(np.where(events != 0, rows, -1))
+    return np.where(last >= 0, events[np.maximum(last, 0)], 0).astype(np.int8)
+
 
 def generate_sample_data(days=30):
     """Generate sample forex data with volume for testing."""
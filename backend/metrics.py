@@ -0,0 +1,239 @@
+"""
+Risk Metrics
+Drawdown, risk-adjusted return, exposure and turnover computed straight on
+equity arrays in O(n) NumPy passes
+
+Every function takes a 1-D equity curve or a 2-D array with one row per bar
+and one column per run (e.g. the strategies of a sweep) and reduces along
+the bars, so one call scores thousands of runs. Undefined ratios (no
+variance, no drawdown) are 0.
+"""
+
+import numpy as np
+
+
+# Annualization used when the bar times do not give a usable span
+DEFAULT_PERIODS_PER_YEAR = 252
+
+_SECONDS_PER_YEAR = 365.25 * 24 * 3600
+
+
+def periods_per_year(times):
+    """
+    Bars per year of a time index (bar count over its calendar span)
+
+    Args:
+        times: DatetimeIndex of the equity curve
+
+    Returns:
+        float, DEFAULT_PERIODS_PER_YEAR for fewer than two bars
+    """
+    if times is None or len(times) < 2:
+        return float(DEFAULT_PERIODS_PER_YEAR)
+    span = (times[-1] - times[0]).total_seconds()
+    if span <= 0:
+        return float(DEFAULT_PERIODS_PER_YEAR)
+    return (len(times) - 1) / (span / _SECONDS_PER_YEAR)
+
+
+def returns(equity):
+    """Bar-to-bar simple returns (one row shorter than equity)"""
+    equity = np.asarray(equity, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(equity[:-1] != 0, equity[1:] / equity[:-1] - 1, 0.0)
+
+
+def drawdown(equity):
+    """Drawdown from the running peak on each bar, as a fraction (<= 0)"""
+    equity = np.asarray(equity, dtype=np.float64)
+    peak = np.maximum.accumulate(equity, axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(peak > 0, equity / peak - 1, 0.0)
+
+
+def max_drawdown(equity):
+    """Deepest drawdown as a fraction (<= 0)"""
+    equity = np.asarray(equity, dtype=np.float64)
+    if len(equity) == 0:
+        return np.zeros(equity.shape[1:])
+    return drawdown(equity).min(axis=0)
+
+
+def drawdown_duration(equity):
+    """
+    Longest stretch below a previous peak, in bars
+
+    The bars since the last peak are the bar number minus the forward-filled
+    bar number of the last peak, so the whole curve is one accumulate pass.
+    A drawdown that has not recovered by the last bar counts up to it.
+    """
+    equity = np.asarray(equity, dtype=np.float64)
+    if len(equity) == 0:
+        return np.zeros(equity.shape[1:], dtype=np.int64)
+    rows = np.arange(len(equity)).reshape((-1,) + (1,) * (equity.ndim - 1))
+    at_peak = equity >= np.maximum.accumulate(equity, axis=0)
+    last_peak = np.maximum.accumulate(np.where(at_peak, rows, 0), axis=0)
+    return (rows - last_peak).max(axis=0)
+
+
+def sharpe(equity, periods_per_year=DEFAULT_PERIODS_PER_YEAR):
+    """Annualized Sharpe ratio of the bar returns (zero risk-free rate)"""
+    bar_returns = returns(equity)
+    if len(bar_returns) < 2:
+        return np.zeros(bar_returns.shape[1:])
+    std = bar_returns.std(axis=0, ddof=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = np.where(std > 0, bar_returns.mean(axis=0) / std, 0.0)
+    return ratio * np.sqrt(periods_per_year)
+
+
+def sortino(equity, periods_per_year=DEFAULT_PERIODS_PER_YEAR):
+    """Annualized Sortino ratio: mean return over the downside deviation"""
+    bar_returns = returns(equity)
+    if len(bar_returns) < 2:
+        return np.zeros(bar_returns.shape[1:])
+    downside = np.sqrt(np.mean(np.minimum(bar_returns, 0.0) ** 2, axis=0))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = np.where(downside > 0, bar_returns.mean(axis=0) / downside, 0.0)
+    return ratio * np.sqrt(periods_per_year)
+
+
+def annualized_return(equity, periods_per_year=DEFAULT_PERIODS_PER_YEAR):
+    """Compound annual growth rate as a fraction"""
+    equity = np.asarray(equity, dtype=np.float64)
+    if len(equity) < 2:
+        return np.zeros(equity.shape[1:])
+    years = (len(equity) - 1) / periods_per_year
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        growth = np.where(equity[0] > 0, equity[-1] / equity[0], 1.0)
+        return np.where(growth > 0, growth ** (1 / years) - 1, -1.0)
+
+
+def calmar(equity, periods_per_year=DEFAULT_PERIODS_PER_YEAR):
+    """Annualized return over the absolute maximum drawdown"""
+    depth = -max_drawdown(equity)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(depth > 0, annualized_return(equity, periods_per_year) / depth, 0.0)
+
+
+def exposure(held):
+    """Fraction of bars with a position open"""
+    held = np.asarray(held, dtype=bool)
+    if len(held) == 0:
+        return np.zeros(held.shape[1:])
+    return held.mean(axis=0)
+
+
+def turnover(traded_notional, equity):
+    """Traded notional (entries plus exits) over the average equity"""
+    equity = np.asarray(equity, dtype=np.float64)
+    if len(equity) == 0:
+        return np.zeros(equity.shape[1:])
+    average = equity.mean(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(average > 0, np.asarray(traded_notional) / average, 0.0)
+
+
+def risk_metrics(equity, held, traded_notional, periods_per_year=DEFAULT_PERIODS_PER_YEAR):
+    """
+    The risk columns of get_performance_metrics
+
+    Args:
+        equity: Equity per bar, starting with the initial capital (1-D or bars x runs)
+        held: Bool array, True on bars with a position open (one row per
+              bar after the first)
+        traded_notional: Notional traded per run
+        periods_per_year: Bars per year for annualization
+
+    Returns:
+        Dict of metric name to value (arrays for 2-D equity), rounded like
+        the other metrics; drawdown and exposure in percent
+    """
+    return {
+        'max_drawdown': np.round(max_drawdown(equity) * 100, 2),
+        'max_drawdown_duration': drawdown_duration(equity),
+        'sharpe': np.round(sharpe(equity, periods_per_year), 2),
+        'sortino': np.round(sortino(equity, periods_per_year), 2),
+        'calmar': np.round(calmar(equity, periods_per_year), 2),
+        'exposure': np.round(exposure(held) * 100, 2),
+        'turnover': np.round(turnover(traded_notional, equity), 2),
+    }
+
+
+def rolling_max(values, window):
+    """
+    Maximum over a trailing window of bars (expanding for the first bars)
+
+    Runs in O(n) for any window: bars are split into blocks of window
+    length, and each window maximum combines a suffix maximum of one block
+    with a prefix maximum of the next (van Herk / Gil-Werman).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    window = int(window)
+    if window < 1:
+        raise ValueError("window must be at least 1")
+    n = len(values)
+    if n == 0 or window == 1:
+        return values.copy()
+
+    blocks = -(-n // window)
+    padded = np.full((blocks * window,) + values.shape[1:], -np.inf)
+    padded[:n] = values
+    shaped = padded.reshape((blocks, window) + values.shape[1:])
+
+    prefix = np.maximum.accumulate(shaped, axis=1).reshape(padded.shape)
+    suffix = np.maximum.accumulate(shaped[:, ::-1], axis=1)[:, ::-1].reshape(padded.shape)
+
+    result = np.empty_like(values)
+    result[:window - 1] = prefix[:min(window - 1, n)]
+    if n >= window:
+        result[window - 1:] = np.maximum(suffix[:n - window + 1], prefix[window - 1:n])
+    return result
+
+
+def _rolling_sum(values, window):
+    """Trailing window sums from one cumulative sum (NaN until the window is full)"""
+    cumulative = np.cumsum(values, axis=0)
+    sums = np.full(values.shape, np.nan)
+    if len(values) >= window:
+        sums[window - 1] = cumulative[window - 1]
+        sums[window:] = cumulative[window:] - cumulative[:-window]
+    return sums
+
+
+def rolling_volatility(equity, window, periods_per_year=DEFAULT_PERIODS_PER_YEAR):
+    """Annualized standard deviation of the returns over a trailing window"""
+    bar_returns = returns(equity)
+    mean = _rolling_sum(bar_returns, window) / window
+    mean_sq = _rolling_sum(bar_returns ** 2, window) / window
+    variance = np.maximum(mean_sq - mean ** 2, 0.0) * window / max(window - 1, 1)
+    return np.sqrt(variance * periods_per_year)
+
+
+def rolling_sharpe(equity, window, periods_per_year=DEFAULT_PERIODS_PER_YEAR):
+    """Sharpe ratio over a trailing window of returns (NaN until it is full)"""
+    bar_returns = returns(equity)
+    mean = _rolling_sum(bar_returns, window) / window
+    volatility = rolling_volatility(equity, window, periods_per_year)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(volatility > 0, mean * periods_per_year / volatility,
+                        np.where(np.isnan(mean), np.nan, 0.0))
+
+
+def rolling_sortino(equity, window, periods_per_year=DEFAULT_PERIODS_PER_YEAR):
+    """Sortino ratio over a trailing window of returns (NaN until it is full)"""
+    bar_returns = returns(equity)
+    mean = _rolling_sum(bar_returns, window) / window
+    downside = np.sqrt(_rolling_sum(np.minimum(bar_returns, 0.0) ** 2, window) / window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(downside > 0, mean / downside * np.sqrt(periods_per_year),
+                        np.where(np.isnan(mean), np.nan, 0.0))
+
+
+def rolling_drawdown(equity, window):
+    """Drawdown from the peak of a trailing window of bars, as a fraction"""
+    equity = np.asarray(equity, dtype=np.float64)
+    peak = rolling_max(equity, window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(peak > 0, equity / peak - 1, 0.0)
+
@@ -0,0 +1,203 @@
+"""
+Monte Carlo
+Confidence intervals for backtest results by resampling trade sequences
+and block-bootstrapping bar returns
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import metrics
+
+
+# 'trades' resamples the return of each closed trade, 'bars' the bar-to-bar
+# returns of the equity curve
+MONTE_CARLO_METHODS = ('trades', 'bars')
+
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+
+# Metric names per method (final value, return, drawdown, profit factor).
+# Names shared with get_performance_metrics are only used where a path
+# measures the same thing: trade paths end on the realized capital but see
+# drawdowns only at trade closes, bar paths see every bar's equity but their
+# gains and losses are bar-to-bar changes, not trades
+PATH_METRICS = {
+    'trades': ('final_capital', 'total_return', 'trade_close_drawdown', 'profit_factor'),
+    'bars': ('final_equity', 'equity_return', 'max_drawdown', 'bar_profit_factor'),
+}
+
+# Cells (steps x paths) simulated at once; also the size of a batch of work
+PATH_BLOCK_CELLS = 2_000_000
+
+# Returns attached by each worker process
+_worker_state = {}
+
+
+def trade_returns(backtest):
+    """Return of each closed trade on the capital before it (compounds to final capital)"""
+    pnl = backtest.trades.column('pnl')
+    capital_before = backtest.initial_capital + np.concatenate(([0.0], np.cumsum(pnl)))[:len(pnl)]
+    return pnl / capital_before
+
+
+def bar_returns(backtest):
+    """Bar-to-bar returns of the equity curve, from the initial capital"""
+    equity = np.concatenate(([float(backtest.initial_capital)], backtest.equity_curve.column('equity')))
+    return metrics.returns(equity)
+
+
+def bootstrap_paths(returns, n_paths, block_size=1, rng=None):
+    """
+    Resampled return sequences
+
+    Draws blocks of block_size consecutive returns with replacement from
+    random starts (wrapping around the end) until each path is as long as
+    the original; block_size=1 is a plain bootstrap of single returns.
+    All paths are drawn as one index matrix.
+
+    Args:
+        returns: 1-D array of returns
+        n_paths: Number of paths
+        block_size: Consecutive returns per block
+        rng: numpy Generator
+
+    Returns:
+        2-D array (steps x paths), the layout of the metrics functions
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    rng = rng if rng is not None else np.random.default_rng()
+    n = len(returns)
+    if n == 0:
+        return np.zeros((0, n_paths))
+    block_size = min(max(int(block_size), 1), n)
+
+    n_blocks = -(-n // block_size)
+    starts = rng.integers(0, n, size=(n_blocks, 1, n_paths))
+    offsets = np.arange(block_size)[None, :, None]
+    index = ((starts + offsets) % n).reshape(n_blocks * block_size, n_paths)[:n]
+    return returns[index]
+
+
+def path_metrics(path_returns, initial_capital, method='trades'):
+    """
+    Final value, return, drawdown and profit factor per path
+
+    Args:
+        path_returns: 2-D array of returns (steps x paths)
+        initial_capital: Starting capital of every path
+        method: 'trades' or 'bars', the kind of returns; picks the metric
+                names (see PATH_METRICS)
+
+    Returns:
+        Dict of metric name to one value per path (percent for returns and
+        drawdowns). Trade returns give final_capital, total_return and
+        profit_factor as get_performance_metrics computes them, plus
+        trade_close_drawdown. Bar returns give max_drawdown as
+        get_performance_metrics computes it, plus final_equity (including
+        an open position), equity_return and bar_profit_factor (bar-to-bar
+        equity gains over losses).
+    """
+    if method not in PATH_METRICS:
+        raise ValueError(f"Unknown method: {method}. Use one of {MONTE_CARLO_METHODS}")
+    path_returns = np.asarray(path_returns, dtype=np.float64)
+    equity = np.empty((len(path_returns) + 1,) + path_returns.shape[1:])
+    equity[0] = initial_capital
+    equity[1:] = initial_capital * np.cumprod(1 + path_returns, axis=0)
+
+    changes = np.diff(equity, axis=0)
+    gains = np.where(changes > 0, changes, 0.0).sum(axis=0)
+    losses = -np.where(changes < 0, changes, 0.0).sum(axis=0)
+
+    final, total_return, drawdown, profit_factor = PATH_METRICS[method]
+    return {
+        final: equity[-1],
+        total_return: (equity[-1] - initial_capital) / initial_capital * 100,
+        drawdown: metrics.max_drawdown(equity) * 100,
+        # As in get_performance_metrics: without losses the gains are divided by 1
+        profit_factor: gains / np.where(losses > 0, losses, 1.0),
+    }
+
+
+def monte_carlo(backtest, n_paths=10000, method='trades', block_size=None, seed=None,
+                max_workers=None, percentiles=DEFAULT_PERCENTILES):
+    """
+    Distribution of backtest results under resampling
+
+    Paths are simulated in batches of about PATH_BLOCK_CELLS cells, each
+    with its own seed spawned from seed, and the batches are spread over a
+    process pool. Results depend only on seed, not on max_workers.
+
+    Args:
+        backtest: VolumeCumulativeDeltaBacktest that has been run
+        n_paths: Number of resampled paths
+        method: 'trades' (resample trade returns) or 'bars' (block-bootstrap
+                bar returns of the equity curve)
+        block_size: Returns per block (default 1 for trades, about the
+                    square root of the bar count for bars)
+        seed: Random seed
+        max_workers: Worker processes (default: all cores; 1 runs inline)
+        percentiles: Percentiles to report
+
+    Returns:
+        Dictionary with:
+        - paths: DataFrame with the metrics of each path
+        - percentiles: DataFrame with one row per percentile
+        - observed: Metrics of the actual sequence
+        Metric names depend on method (see PATH_METRICS)
+    """
+    if method not in MONTE_CARLO_METHODS:
+        raise ValueError(f"Unknown method: {method}. Use one of {MONTE_CARLO_METHODS}")
+    if n_paths < 1:
+        raise ValueError("n_paths must be at least 1")
+
+    returns = trade_returns(backtest) if method == 'trades' else bar_returns(backtest)
+    if block_size is None:
+        block_size = 1 if method == 'trades' else max(1, int(np.sqrt(len(returns))))
+    initial_capital = float(backtest.initial_capital)
+
+    paths_per_batch = max(1, PATH_BLOCK_CELLS // max(len(returns), 1))
+    sizes = [min(paths_per_batch, n_paths - start) for start in range(0, n_paths, paths_per_batch)]
+    batches = list(zip(sizes, np.random.SeedSequence(seed).spawn(len(sizes))))
+
+    max_workers = max_workers or os.cpu_count() or 1
+    print(f"Monte Carlo: {n_paths} paths over {len(returns)} {method} "
+          f"(block size {block_size}) with {max_workers} workers...")
+
+    initargs = (returns, block_size, initial_capital, method)
+    if max_workers == 1 or len(batches) == 1:
+        _init_worker(*initargs)
+        results = [_run_batch(batch) for batch in batches]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                 initargs=initargs) as executor:
+            results = list(executor.map(_run_batch, batches))
+
+    paths = pd.DataFrame({
+        name: np.concatenate([result[name] for result in results])
+        for name in results[0]
+    })
+    report = paths.quantile(np.asarray(percentiles) / 100)
+    report.index = pd.Index(list(percentiles), name='percentile')
+
+    observed = path_metrics(returns[:, None], initial_capital, method)
+    return {
+        'paths': paths,
+        'percentiles': report.round(2),
+        'observed': {name: round(float(values[0]), 2) for name, values in observed.items()},
+    }
+
+
+def _init_worker(returns, block_size, initial_capital, method):
+    _worker_state.update(returns=returns, block_size=block_size, initial_capital=initial_capital,
+                         method=method)
+
+
+def _run_batch(batch):
+    """Metrics of one batch of paths"""
+    n_paths, seed = batch
+    rng = np.random.default_rng(seed)
+    paths = bootstrap_paths(_worker_state['returns'], n_paths, _worker_state['block_size'], rng)
+    return path_metrics(paths, _worker_state['initial_capital'], _worker_state['method'])
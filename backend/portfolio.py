@@ -0,0 +1,244 @@
+"""
+Portfolio Backtest
+Runs the cumulative delta strategy on many symbols at once over one
+shared time index, with the portfolio capital split into per-symbol sleeves
+"""
+
+import numpy as np
+import pandas as pd
+
+from main import VolumeCumulativeDeltaBacktest, _position_state, delta_signals
+from metrics import periods_per_year, risk_metrics
+
+
+def align_bars(bars_by_symbol, columns=('close', 'cumulative_delta')):
+    """
+    Align bars of several symbols on the union of their timestamps
+
+    Values are carried forward over bars where a symbol did not trade (its
+    close and cumulative delta did not change); rows before a symbol's
+    first bar are NaN.
+
+    Args:
+        bars_by_symbol: Dict of symbol to time bars
+        columns: Bar columns to align
+
+    Returns:
+        Tuple of (DatetimeIndex, dict of column name to 2-D array with one
+        row per timestamp and one column per symbol, in dict order)
+    """
+    for symbol, bars in bars_by_symbol.items():
+        if not bars.index.is_unique:
+            raise ValueError(f"Bars of {symbol} have duplicate timestamps; align time bars")
+
+    frame = pd.concat(
+        {symbol: bars[list(columns)] for symbol, bars in bars_by_symbol.items()},
+        axis=1,
+        sort=True
+    ).ffill()
+
+    symbols = list(bars_by_symbol)
+    arrays = {
+        column: frame.xs(column, axis=1, level=1)[symbols].to_numpy(dtype=float)
+        for column in columns
+    }
+    return pd.DatetimeIndex(frame.index), arrays
+
+
+class PortfolioBacktest:
+    """
+    Cumulative delta strategy on several symbols with shared capital
+
+    The initial capital is split into one sleeve per symbol (equal, or by
+    weights); each sleeve follows the same rules as backtest_arrays and
+    compounds its own results. All symbols are evaluated together: signals,
+    position states, trade PnL and equity are 2-D arrays (bars x symbols)
+    computed in one vectorized pass over the aligned bars, so a symbol's
+    results equal a single-symbol backtest of its own bars.
+    """
+
+    def __init__(self, initial_capital=10000, weights=None):
+        """
+        Args:
+            initial_capital: Capital of the whole portfolio
+            weights: Optional dict of symbol to capital weight (normalized;
+                     equal weights by default)
+        """
+        self.initial_capital = initial_capital
+        self.weights = weights
+        self.symbols = []
+        self.backtests = {}
+        self.equity_curve = pd.DataFrame()
+        self.held = np.zeros((0, 0), dtype=bool)
+
+    def run(self, bars_by_symbol, threshold=1000, position_size=0.1):
+        """
+        Backtest all symbols
+
+        Args:
+            bars_by_symbol: Dict of symbol to bars with close and cumulative_delta
+            threshold: Cumulative delta threshold, or dict of symbol to threshold
+            position_size: Fraction of each sleeve's capital per trade
+
+        Returns:
+            Dict with:
+            - equity_curve: DataFrame of equity per symbol plus 'total'
+            - trades: DataFrame of all trades with a symbol column
+            - metrics: DataFrame of performance metrics per symbol plus 'portfolio'
+        """
+        self.symbols = symbols = list(bars_by_symbol)
+        index, arrays = align_bars(bars_by_symbol)
+        close, cumulative_delta = arrays['close'], arrays['cumulative_delta']
+
+        thresholds = np.array([
+            threshold[symbol] if isinstance(threshold, dict) else threshold
+            for symbol in symbols
+        ], dtype=float)
+        weights = np.array([
+            self.weights.get(symbol, 0.0) if self.weights else 1.0
+            for symbol in symbols
+        ], dtype=float)
+        sleeves = self.initial_capital * weights / weights.sum()
+
+        signals = self._signals(cumulative_delta, thresholds)
+        state = self._simulate(close, signals, sleeves, position_size)
+        self._record(index, close, sleeves, state, bars_by_symbol)
+
+        return {
+            'equity_curve': self.equity_curve,
+            'trades': self.trades_frame(),
+            'metrics': self.get_performance_metrics(),
+        }
+
+    @staticmethod
+    def _signals(cumulative_delta, thresholds):
+        """delta_signals per column; rows before a symbol's first bar repeat its first signal"""
+        signals = delta_signals(cumulative_delta, thresholds[None, :]).astype(np.int8)
+
+        # No entry can happen on a symbol's first bar, as in a single backtest
+        has_bars = ~np.isnan(cumulative_delta)
+        first = np.argmax(has_bars, axis=0)
+        first_signal = signals[first, np.arange(signals.shape[1])]
+        rows = np.arange(len(signals))[:, None]
+        return np.where(rows < first[None, :], first_signal[None, :], signals)
+
+    @staticmethod
+    def _simulate(close, signals, sleeves, position_size):
+        """Positions, trades and equity of every symbol (same rules as backtest_arrays)"""
+        with np.errstate(invalid='ignore'):
+            # Trading starts at the second bar
+            prices = close[1:]
+            is_entry = (signals[1:] == 1) & (signals[:-1] != 1)
+            is_exit = signals[1:] == -1
+
+            held = _position_state(is_entry, is_exit)
+            prev_held = np.zeros_like(held)
+            prev_held[1:] = held[:-1]
+            entries = is_entry & ~prev_held
+            exits = is_exit & prev_held
+
+            # Entry row of the position open (or just closed) on each row
+            rows = np.arange(len(entries))[:, None]
+            last_entry = np.maximum.accumulate(np.where(entries, rows, 0), axis=0)
+            entry_prices = np.take_along_axis(prices, last_entry, axis=0)
+
+            # Sleeve capital compounds at each exit
+            growth = np.where(exits, 1 + position_size * (prices - entry_prices) / entry_prices, 1.0)
+            compounded = np.cumprod(growth, axis=0)
+            capital_before = np.empty_like(compounded)
+            capital_before[:1] = sleeves
+            capital_before[1:] = sleeves * compounded[:-1]
+
+            sizes = np.take_along_axis(capital_before * position_size / prices, last_entry, axis=0)
+            pnl = np.where(exits, (prices - entry_prices) * sizes, 0.0)
+
+            # Realized capital after the last exit so far, plus open PnL
+            last_exit = np.maximum.accumulate(np.where(exits, rows, -1), axis=0)
+            realized = np.take_along_axis(capital_before + pnl, np.maximum(last_exit, 0), axis=0)
+            realized = np.where(last_exit >= 0, realized, sleeves)
+            equity = realized + np.where(held, (prices - entry_prices) * sizes, 0.0)
+
+        return {
+            'held': held,
+            'entries': entries,
+            'exits': exits,
+            'entry_prices': entry_prices,
+            'sizes': sizes,
+            'pnl': pnl,
+            'equity': equity,
+            'final_capital': realized[-1] if len(realized) else sleeves,
+        }
+
+    def _record(self, index, close, sleeves, state, bars_by_symbol):
+        """Fill one VolumeCumulativeDeltaBacktest per symbol with its results"""
+        times = index[1:]
+        prices = close[1:]
+        self.backtests = {}
+
+        for column, symbol in enumerate(self.symbols):
+            backtest = VolumeCumulativeDeltaBacktest(initial_capital=float(sleeves[column]))
+            entry_rows = np.flatnonzero(state['entries'][:, column])
+            exit_rows = np.flatnonzero(state['exits'][:, column])
+            entry_prices = state['entry_prices'][exit_rows, column]
+            exit_prices = prices[exit_rows, column]
+
+            backtest.positions.append_columns({
+                'type': np.full(len(entry_rows), 'LONG', dtype=object),
+                'entry_price': prices[entry_rows, column],
+                'entry_time': times[entry_rows],
+                'size': state['sizes'][entry_rows, column],
+            })
+            backtest.trades.append_columns({
+                'entry_price': entry_prices,
+                'exit_price': exit_prices,
+                'pnl': state['pnl'][exit_rows, column],
+                'return': (exit_prices - entry_prices) / entry_prices * 100,
+                'exit_time': times[exit_rows],
+                'exit_reason': np.full(len(exit_rows), 'signal', dtype=object),
+            })
+            # The sleeve's own equity curve covers its own bars, from its second one
+            own = times.isin(bars_by_symbol[symbol].index[1:])
+            backtest.equity_curve.append_columns({'time': times[own], 'equity': state['equity'][own, column]})
+            backtest.capital = float(state['final_capital'][column])
+            self.backtests[symbol] = backtest
+
+        equity = pd.DataFrame(state['equity'], index=times, columns=self.symbols)
+        equity['total'] = equity.sum(axis=1)
+        self.equity_curve = equity
+        self.held = state['held']
+
+    def trades_frame(self):
+        """All trades, with a symbol column, in exit time order"""
+        frames = [
+            backtest.trades.to_frame().assign(symbol=symbol)
+            for symbol, backtest in self.backtests.items()
+        ]
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, ignore_index=True).sort_values('exit_time', kind='stable', ignore_index=True)
+
+    def get_performance_metrics(self):
+        """
+        get_performance_metrics of each symbol's sleeve, plus a 'portfolio'
+        row over all trades, the combined capital and the total equity
+        (exposure counts bars where any sleeve holds a position)
+        """
+        rows = {symbol: backtest.get_performance_metrics() for symbol, backtest in self.backtests.items()}
+
+        portfolio = VolumeCumulativeDeltaBacktest(initial_capital=self.initial_capital)
+        trades = self.trades_frame()
+        if len(trades):
+            portfolio.trades.append_columns({name: trades[name] for name in portfolio.trades.fields})
+        portfolio.capital = sum(backtest.capital for backtest in self.backtests.values())
+        rows['portfolio'] = portfolio.get_performance_metrics()
+
+        total = self.equity_curve.get('total', pd.Series(dtype=float))
+        risk = risk_metrics(
+            np.concatenate(([float(self.initial_capital)], total.to_numpy())),
+            self.held.any(axis=1),
+            sum(backtest.traded_notional() for backtest in self.backtests.values()),
+            periods_per_year(total.index)
+        )
+        rows['portfolio'].update({name: value.item() for name, value in risk.items()})
+
+        return pd.DataFrame.from_dict(rows, orient='index')
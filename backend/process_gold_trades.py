@@ -2,10 +2,17 @@
 Process Gold trades data to calculate buy/sell volume and cumulative delta
 """
 
+import itertools
+import json
+import os
+
 import pandas as pd
 from dotenv import load_dotenv
+from bar_cache import file_fingerprint
+from bar_pyramid import BASE_FREQUENCY, PYRAMID_TIMEFRAMES, StreamingPyramid, stream_pyramid
+from bar_store import BarStore, BarStoreWriter
 from databento_fetcher import DatabentoFetcher
-from volume_calculator import VolumeCalculator
+from volume_calculator import CALCULATOR_VERSION
 
 # Load environment variables
 load_dotenv()
@@ -15,64 +22,179 @@ print("PROCESSING GOLD TRADES DATA")
 print("="*80)
 print()
 
-# Load the trades data
+# Stream the trades data one daily partition at a time so memory stays bounded
 fetcher = DatabentoFetcher()
-filename = 'trades_GC.c.0_2020-01-01_2023-12-31.csv'
+symbol = 'GC.c.0'
+start_date = '2020-01-01'
+end_date = '2023-12-31'
 
-print(f"Loading: {filename}")
-trades_df = fetcher.load_csv(filename)
+legacy_trades = 'trades_GC.c.0_2020-01-01_2023-12-31.csv'
+if not fetcher.lake.days(symbol, 'trades') and os.path.exists(os.path.join(fetcher.data_dir, legacy_trades)):
+    # Split the original 4-year file into daily partitions once
+    fetcher.import_file(legacy_trades, symbol, 'trades')
 
-print(f"Loaded {len(trades_df):,} trade records")
-print(f"Date range: {trades_df.index.min()} to {trades_df.index.max()}")
-print()
+print(f"Streaming: {symbol} trades {start_date} to {end_date}")
+chunks = fetcher.lake.iter_read(symbol, 'trades', start_date, end_date)
+first_chunk = next(chunks, None)
+if first_chunk is None:
+    raise SystemExit(f"No trade data found for {symbol} from {start_date} to {end_date}. "
+                     f"Run fetch_gold_data.py first.")
 
 # Display sample
 print("Sample trades:")
-print(trades_df.head(10))
+print(first_chunk.head(10))
 print()
-print(f"Columns: {list(trades_df.columns)}")
+print(f"Columns: {list(first_chunk.columns)}")
 print()
 
 # Check for 'action' or 'side' column
-if 'action' in trades_df.columns:
+if 'action' in first_chunk.columns:
     print("Trade side indicator: 'action' column")
-    print(f"Unique values: {trades_df['action'].unique()}")
-elif 'side' in trades_df.columns:
+    print(f"Unique values: {first_chunk['action'].unique()}")
+elif 'side' in first_chunk.columns:
     print("Trade side indicator: 'side' column")
-    print(f"Unique values: {trades_df['side'].unique()}")
+    print(f"Unique values: {first_chunk['side'].unique()}")
 else:
     print("⚠ Warning: No clear trade side indicator found")
 print()
 
-# Process trades to 1-minute bars
-print("-"*80)
-print("Processing trades to 1-minute bars with buy/sell volume...")
-print("-"*80)
-print()
 
-calc = VolumeCalculator()
-bars = calc.process_trades_to_bars(trades_df, frequency='1min')
+def all_chunks():
+    """
+    First chunk (already read for the sample) followed by the rest
 
-print()
-print("Processed bars summary:")
-print(bars.describe())
+    Returns:
+        Tuple of (chunk generator, counter whose 'trades' entry counts the
+        trades read so far; stays 0 if the generator is never consumed)
+    """
+    counter = {'trades': 0}
+
+    def generate():
+        for chunk in itertools.chain([first_chunk], chunks):
+            counter['trades'] += len(chunk)
+            print(f"  ... {counter['trades']:,} trades read")
+            yield chunk
+
+    return generate(), counter
+
+
+# Aggregate the trades into 1-second base bars and roll each batch up as it streams
+print("-"*80)
+print("Processing trades to 1-second base bars with buy/sell volume...")
+print("-"*80)
 print()
 
-# Save processed bars
 output_filename = 'processed-data.csv'
 output_path = f"{fetcher.data_dir}/{output_filename}"
-bars.to_csv(output_path)
+pyramid_dir = os.path.join(fetcher.data_dir, 'bars', symbol)
+store_dir = os.path.join(pyramid_dir, 'store')
+os.makedirs(pyramid_dir, exist_ok=True)
+
+# The outputs record the partition files and calculator they were built
+# from, so a rerun on unchanged trades skips the aggregation
+source_path = os.path.join(pyramid_dir, '_source.json')
+source = {
+    'fingerprint': file_fingerprint(fetcher.lake.partitions(symbol, 'trades', start_date, end_date)),
+    'version': CALCULATOR_VERSION,
+}
+csv_paths = {frequency: os.path.join(pyramid_dir, f"{frequency}.csv") for frequency in PYRAMID_TIMEFRAMES}
+outputs = ([output_path] + list(csv_paths.values())
+           + [os.path.join(store_dir, frequency) for frequency in PYRAMID_TIMEFRAMES])
+up_to_date = all(os.path.exists(path) for path in outputs + [source_path])
+if up_to_date:
+    with open(source_path) as f:
+        up_to_date = json.load(f) == source
+
+total_trades = 0
+base_bar_count = 0
+if up_to_date:
+    print("Trades unchanged since the last run; keeping the existing bars")
+else:
+    if os.path.exists(source_path):
+        os.remove(source_path)
+
+    trade_chunks, read = all_chunks()
+    store_writers = {frequency: BarStoreWriter(os.path.join(store_dir, frequency))
+                     for frequency in PYRAMID_TIMEFRAMES}
+    csv_started = set()
+
+    # Only the open bins of each timeframe are in memory; finished bars are
+    # appended to the CSV files and stores as they come
+    for frequency, finished in stream_pyramid(trade_chunks, timeframes=PYRAMID_TIMEFRAMES):
+        if frequency == BASE_FREQUENCY:
+            base_bar_count += len(finished)
+            continue
+        first = frequency not in csv_started
+        finished.to_csv(csv_paths[frequency], mode='w' if first else 'a', header=first)
+        if frequency == '1min':
+            finished.to_csv(output_path, mode='w' if first else 'a', header=first)
+        csv_started.add(frequency)
+        store_writers[frequency].append(finished)
+
+    for writer in store_writers.values():
+        writer.close()
+    with open(source_path, 'w') as f:
+        json.dump(source, f, indent=2)
+    total_trades = read['trades']
+
+# Statistics come from the memory-mapped 1-minute store, not a loaded frame
+bars = BarStore(os.path.join(store_dir, '1min'))
+cumulative_delta = bars.column('cumulative_delta')
+
+# Candles for the chart at every timeframe, streamed from the 1-minute OHLCV partitions
+candle_dir = os.path.join(pyramid_dir, 'ohlcv')
+if not fetcher.lake.days(symbol, 'ohlcv-1m'):
+    legacy_ohlcv = 'ohlcv_1m_GC.c.0_2020-01-01_2023-12-31.csv'
+    if os.path.exists(os.path.join(fetcher.data_dir, legacy_ohlcv)):
+        # Split the original 4-year file into daily partitions once
+        fetcher.import_file(legacy_ohlcv, symbol, 'ohlcv-1m')
+
+candle_count = 0
+if fetcher.lake.days(symbol, 'ohlcv-1m'):
+    os.makedirs(candle_dir, exist_ok=True)
+    candle_paths = {frequency: os.path.join(candle_dir, f"{frequency}.csv") for frequency in PYRAMID_TIMEFRAMES}
+    candle_pyramid = StreamingPyramid(base='1min', timeframes=PYRAMID_TIMEFRAMES[1:])
+    candles_started = set()
+
+    def write_candles(finished):
+        for frequency, candles in finished.items():
+            first = frequency not in candles_started
+            candles.to_csv(candle_paths[frequency], mode='w' if first else 'a', header=first)
+            candles_started.add(frequency)
+
+    for candles in fetcher.lake.iter_read(symbol, 'ohlcv-1m', start_date, end_date,
+                                          columns=['open', 'high', 'low', 'close', 'volume']):
+        if candles.empty:
+            continue
+        candle_count += len(candles)
+        write_candles({'1min': candles})
+        write_candles(candle_pyramid.update(candles))
+    write_candles(candle_pyramid.flush())
+else:
+    print(f"⚠ Warning: No ohlcv-1m data for {symbol}; the chart needs candles from fetch_gold_data.py")
+
+print()
+if total_trades:
+    print(f"Loaded {total_trades:,} trade records")
+if len(bars):
+    print(f"Delta range: {cumulative_delta.min():.0f} to {cumulative_delta.max():.0f}")
 print(f"✓ Saved processed bars to: {output_path}")
+print(f"✓ Saved {', '.join(PYRAMID_TIMEFRAMES)} bars to: {pyramid_dir}")
+if candle_count:
+    print(f"✓ Saved {', '.join(PYRAMID_TIMEFRAMES)} candles from {candle_count:,} 1-minute candles to: {candle_dir}")
 print()
 
 # Show sample
 print("Sample processed bars (first 20):")
-print(bars.head(20))
+print(pd.read_csv(output_path, index_col=0, parse_dates=True, nrows=20))
 print()
 
 print("="*80)
 print("PROCESSING COMPLETE!")
 print("="*80)
-print(f"Created {len(bars):,} bars with cumulative delta")
+if base_bar_count:
+    print(f"Created {base_bar_count:,} base bars and {len(bars):,} 1-minute bars with cumulative delta")
+else:
+    print(f"{len(bars):,} 1-minute bars with cumulative delta")
 print(f"Ready for backtesting!")
 print()
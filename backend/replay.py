@@ -0,0 +1,228 @@
+"""
+Tick Replay
+Replays stored trades through an asyncio pipeline to many live strategy
+instances and measures per-tick latency and throughput
+"""
+
+import asyncio
+import time
+
+import numpy as np
+import pandas as pd
+
+from live_delta import LiveDeltaEngine
+from main import DIRECTIONS, VolumeCumulativeDeltaBacktest
+from trade_classification import TradeClassifier
+from volume_calculator import VolumeCalculator
+
+
+class LiveStrategy:
+    """
+    One VolumeCumulativeDeltaBacktest configuration trading live bars
+
+    Ticks go through a LiveDeltaEngine; each closed bar is traded by the
+    backtest's own step(), the body of the backtest() loop, so a full
+    replay gives the same positions, trades and equity as a batch backtest
+    of the same bars, long only or long_short.
+    """
+
+    def __init__(self, threshold, position_size=0.1, frequency='1min', initial_capital=10000,
+                 tz=None, name=None, direction='long'):
+        """
+        Args:
+            threshold: Cumulative delta threshold for signals
+            position_size: Fraction of capital per trade
+            frequency: Bar frequency
+            initial_capital: Starting capital
+            tz: Timezone of the bars (tick timestamps are UTC nanoseconds;
+                default: the timezone of the replayed feed)
+            name: Label in the replay report
+            direction: 'long' or 'long_short' (see VolumeCumulativeDeltaBacktest.backtest)
+        """
+        if direction not in DIRECTIONS:
+            raise ValueError(f"Unknown direction: {direction}. Use one of {DIRECTIONS}")
+
+        self.name = name or f"threshold={threshold}"
+        self.threshold = threshold
+        self.position_size = position_size
+        self.direction = direction
+        self.engine = LiveDeltaEngine(frequency, threshold=threshold, tz=tz)
+        self.backtest = VolumeCumulativeDeltaBacktest(initial_capital=initial_capital)
+
+        self.position = 0
+        self.entry_price = 0
+        self.prev_signal = None
+
+    def set_timezone(self, tz):
+        """Timezone of the feed; used for the bars unless tz was given"""
+        if self.engine.tz is None:
+            self.engine.tz = tz
+
+    def on_tick(self, timestamp_ns, price, size, side_code):
+        bar = self.engine.on_trade(timestamp_ns, price, size, side_code)
+        if bar is not None:
+            self.on_bar(bar)
+
+    def finish(self):
+        """Close the open bar at the end of the replay"""
+        bar = self.engine.flush()
+        if bar is not None:
+            self.on_bar(bar)
+
+    def on_bar(self, bar):
+        signal = bar['signal']
+        prev_signal, self.prev_signal = self.prev_signal, signal
+        if prev_signal is None:
+            # Like the backtest loop, trading starts on the second bar
+            return
+
+        self.position, self.entry_price = self.backtest.step(
+            self.position, self.entry_price, bar['close'], signal, prev_signal, bar['time'],
+            position_size=self.position_size, direction=self.direction
+        )
+
+
+def make_strategies(thresholds, position_size=0.1, frequency='1min', initial_capital=10000,
+                    direction='long'):
+    """One LiveStrategy per threshold"""
+    return [
+        LiveStrategy(threshold, position_size, frequency, initial_capital, direction=direction)
+        for threshold in thresholds
+    ]
+
+
+async def replay_async(trade_chunks, strategies, speed=None, batch_size=1, queue_size=256):
+    """
+    Replay trades to all strategies concurrently
+
+    A producer task reads the chunks and puts batches of ticks on one
+    bounded queue per strategy (a slow strategy applies backpressure
+    instead of buffering the whole file); one consumer task per strategy
+    processes them. Latency is measured from the moment a batch is
+    published to the moment a strategy has processed each of its ticks.
+
+    Args:
+        trade_chunks: Iterable of trade DataFrames in time order, e.g.
+                      DatabentoFetcher.lake.iter_read(...) or storage.iter_read(path)
+        strategies: Objects with on_tick(ts_ns, price, size, side_code) and
+                    finish(); set_timezone(tz), if they have it, is called with
+                    the timezone of the feed before the first tick
+        speed: None for maximum speed, otherwise a multiple of wall-clock
+               time (1.0 = real time, 60.0 = one market minute per second)
+        batch_size: Ticks per queue message
+        queue_size: Maximum queued batches per strategy
+
+    Returns:
+        Replay report (see run_replay)
+    """
+    queues = [asyncio.Queue(maxsize=queue_size) for _ in strategies]
+    latencies = [[] for _ in strategies]
+    ticks = 0
+
+    async def produce():
+        nonlocal ticks
+        first_ns = None
+        wall_start = time.perf_counter()
+        classifier = TradeClassifier()
+        tz_sent = False
+
+        for chunk in trade_chunks:
+            if chunk.empty:
+                continue
+            index, timestamps, prices, sizes, codes = VolumeCalculator._trade_arrays(chunk, classifier)
+            if not tz_sent:
+                tz_sent = True
+                for strategy in strategies:
+                    if hasattr(strategy, 'set_timezone'):
+                        strategy.set_timezone(index.tz)
+            timestamps, prices = timestamps.tolist(), prices.tolist()
+            sizes, codes = sizes.tolist(), codes.tolist()
+
+            for start in range(0, len(timestamps), batch_size):
+                batch = list(zip(timestamps[start:start + batch_size], prices[start:start + batch_size],
+                                 sizes[start:start + batch_size], codes[start:start + batch_size]))
+
+                if speed:
+                    # Wait until the batch is due in scaled wall-clock time
+                    if first_ns is None:
+                        first_ns = batch[0][0]
+                    due = wall_start + (batch[0][0] - first_ns) / 1e9 / speed
+                    delay = due - time.perf_counter()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+
+                sent = time.perf_counter_ns()
+                for queue in queues:
+                    await queue.put((sent, batch))
+                ticks += len(batch)
+
+        for queue in queues:
+            await queue.put(None)
+
+    async def consume(strategy, queue, latency):
+        while True:
+            message = await queue.get()
+            if message is None:
+                strategy.finish()
+                return
+            sent, batch = message
+            for tick in batch:
+                strategy.on_tick(*tick)
+                latency.append(time.perf_counter_ns() - sent)
+            # Let the producer and other strategies run between batches
+            await asyncio.sleep(0)
+
+    started = time.perf_counter()
+    await asyncio.gather(
+        produce(),
+        *(consume(strategy, queue, latency)
+          for strategy, queue, latency in zip(strategies, queues, latencies))
+    )
+    elapsed = time.perf_counter() - started
+
+    return _report(strategies, latencies, ticks, elapsed)
+
+
+def run_replay(trade_chunks, strategies, speed=None, batch_size=1, queue_size=256):
+    """
+    Synchronous wrapper of replay_async
+
+    Returns:
+        Dictionary with:
+        - ticks: Ticks replayed
+        - elapsed: Wall-clock seconds
+        - ticks_per_second: Ticks replayed per second
+        - strategy_ticks_per_second: Tick deliveries per second over all strategies
+        - strategies: DataFrame with bars, trades, total return and latency
+          percentiles (microseconds) per strategy
+    """
+    return asyncio.run(replay_async(trade_chunks, strategies, speed, batch_size, queue_size))
+
+
+def _report(strategies, latencies, ticks, elapsed):
+    rows = []
+    for strategy, latency in zip(strategies, latencies):
+        latency_us = np.asarray(latency, dtype=np.float64) / 1000
+        metrics = strategy.backtest.get_performance_metrics() if hasattr(strategy, 'backtest') else {}
+        rows.append({
+            'strategy': getattr(strategy, 'name', repr(strategy)),
+            'bars': getattr(getattr(strategy, 'engine', None), 'bars_emitted', None),
+            'trades': metrics.get('total_trades'),
+            'total_return': metrics.get('total_return'),
+            'latency_p50_us': float(np.percentile(latency_us, 50)) if len(latency_us) else np.nan,
+            'latency_p99_us': float(np.percentile(latency_us, 99)) if len(latency_us) else np.nan,
+            'latency_max_us': float(latency_us.max()) if len(latency_us) else np.nan,
+        })
+
+    elapsed = max(elapsed, 1e-9)
+    report = {
+        'ticks': ticks,
+        'elapsed': elapsed,
+        'ticks_per_second': ticks / elapsed,
+        'strategy_ticks_per_second': ticks * len(strategies) / elapsed,
+        'strategies': pd.DataFrame(rows),
+    }
+    print(f"Replayed {ticks:,} ticks to {len(strategies)} strategies in {elapsed:.2f}s "
+          f"({report['ticks_per_second']:,.0f} ticks/s, "
+          f"{report['strategy_ticks_per_second']:,.0f} strategy ticks/s)")
+    return report
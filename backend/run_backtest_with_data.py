@@ -8,45 +8,37 @@ from datetime import datetime, timedelta
 from dotenv import load_dotenv
 import pandas as pd
 
+from bar_cache import BarCache, file_fingerprint, source_fingerprint
+from bar_pyramid import BASE_FREQUENCY, roll_up, rolls_up_from
 from databento_fetcher import DatabentoFetcher
 from volume_calculator import VolumeCalculator
 from main import VolumeCumulativeDeltaBacktest
+from portfolio import PortfolioBacktest
+from sweep import run_sweep
 
 # Load environment variables
 load_dotenv()
 
 
-def run_full_backtest(
-    symbols=['ES.FUT'],
-    days_back=7,
-    dataset='GLBX.MDP3',
-    frequency='1min',
-    threshold=500,
-    position_size=0.1,
-    initial_capital=10000,
-    use_cached=True
-):
+def load_bars(symbols=['ES.FUT'], days_back=7, dataset='GLBX.MDP3', frequency='1min', use_cached=True,
+              bar_type='time', bar_size=None):
     """
-    Complete backtest pipeline
+    Fetch trades and build bars with cumulative delta
 
     Args:
         symbols: List of symbols to trade
         days_back: Number of days of historical data
         dataset: Databento dataset
         frequency: Bar frequency for analysis
-        threshold: Cumulative delta threshold for signals
-        position_size: Fraction of capital per trade
-        initial_capital: Starting capital
-        use_cached: If True, use existing CSV data if available
+        use_cached: If True, only fetch the parts of the window not already held
+        bar_type: 'time', 'tick', 'volume' or 'delta'
+        bar_size: Trades, contracts or delta units per bar for non-time bars
 
     Returns:
-        Dictionary with backtest results and data
+        DataFrame of bars, cached under Data/cache by the trade partition
+        files (by the content of the trades when use_cached is False); time
+        bars at whole seconds are rolled up from cached 1s bars
     """
-    print("="*80)
-    print("VOLUME CUMULATIVE DELTA BACKTEST WITH DATABENTO DATA")
-    print("="*80)
-    print()
-
     # Set date range
     end_date = datetime.now()
     start_date = end_date - timedelta(days=days_back)
@@ -60,33 +52,125 @@ def run_full_backtest(
     # Initialize fetcher
     fetcher = DatabentoFetcher()
 
-    # Check for existing data
-    expected_filename = f"trades_{symbols[0]}_{start_date.strftime('%Y-%m-%d')}_{end_date.strftime('%Y-%m-%d')}.csv"
-    data_path = os.path.join(fetcher.data_dir, expected_filename)
+    start_str = start_date.strftime('%Y-%m-%d')
+    end_str = end_date.strftime('%Y-%m-%d')
+
+    cache = BarCache(os.path.join(fetcher.data_dir, 'cache'))
+    calc = VolumeCalculator()
+
+    if use_cached:
+        # Download only the days not already held. Bars are keyed by the
+        # partition files (path, size, modification time), so a cache hit
+        # neither reads nor hashes the trades
+        fetcher.download(symbols, start_str, end_str, schema='trades', dataset=dataset)
+        partitions = fetcher.lake.partitions(symbols[0], 'trades', start_str, end_str)
+        if not partitions:
+            raise ValueError("No trade data received from Databento")
+        fingerprint = file_fingerprint(partitions)
+        loaded = []
+
+        def trades():
+            # Read the window once, on the first cache miss
+            if not loaded:
+                loaded.append(_fetch_trades(fetcher, symbols, start_str, end_str, dataset, use_cached))
+            return loaded[0]
+    else:
+        trades_df = _fetch_trades(fetcher, symbols, start_str, end_str, dataset, use_cached)
+        fingerprint = source_fingerprint(trades_df)
+
+        def trades():
+            return trades_df
 
-    if use_cached and os.path.exists(data_path):
-        print(f"Using cached data: {expected_filename}")
-        trades_df = fetcher.load_csv(expected_filename)
+    if bar_type == 'time' and rolls_up_from(frequency):
+        # Time bars are rolled up from 1s base bars, cached on their own
+        # so a new frequency still does not go back to the trades
+        def base_bars():
+            return cache.get_or_build(
+                fingerprint,
+                lambda: calc.process_trades_to_bars(trades(), frequency=BASE_FREQUENCY),
+                frequency=BASE_FREQUENCY
+            )
+
+        if frequency == BASE_FREQUENCY:
+            return base_bars()
+        return cache.get_or_build(fingerprint, lambda: roll_up(base_bars(), frequency), frequency=frequency)
+
+    # Process trades into bars with buy/sell volume
+    return cache.get_or_build(
+        fingerprint,
+        lambda: calc.process_trades_to_bars(trades(), frequency=frequency, bar_type=bar_type, bar_size=bar_size),
+        frequency=frequency,
+        bar_type=bar_type,
+        bar_size=bar_size
+    )
+
+
+def _fetch_trades(fetcher, symbols, start_str, end_str, dataset, use_cached):
+    """Trades for the window: read from the partitions when use_cached is set (after download), fetched fresh otherwise"""
+    if use_cached:
+        trades_df = fetcher.load_range(symbols[0], 'trades', start_str, end_str)
     else:
         print("Fetching fresh data from Databento...")
         trades_df = fetcher.fetch_trades(
             symbols=symbols,
-            start_date=start_date.strftime('%Y-%m-%d'),
-            end_date=end_date.strftime('%Y-%m-%d'),
+            start_date=start_str,
+            end_date=end_str,
             dataset=dataset
         )
 
-        if trades_df.empty:
-            raise ValueError("No trade data received from Databento")
+    if trades_df.empty:
+        raise ValueError("No trade data received from Databento")
 
     print()
     print("-"*80)
     print("PROCESSING TRADE DATA")
     print("-"*80)
 
-    # Process trades into bars with buy/sell volume
-    calc = VolumeCalculator()
-    bars_df = calc.process_trades_to_bars(trades_df, frequency=frequency)
+    return trades_df
+
+
+def run_full_backtest(
+    symbols=['ES.FUT'],
+    days_back=7,
+    dataset='GLBX.MDP3',
+    frequency='1min',
+    threshold=500,
+    position_size=0.1,
+    initial_capital=10000,
+    use_cached=True,
+    engine='vectorized',
+    bar_type='time',
+    bar_size=None,
+    direction='long',
+    cost_model=None
+):
+    """
+    Complete backtest pipeline
+
+    Args:
+        symbols: List of symbols to trade
+        days_back: Number of days of historical data
+        dataset: Databento dataset
+        frequency: Bar frequency for analysis
+        threshold: Cumulative delta threshold for signals
+        position_size: Fraction of capital per trade
+        initial_capital: Starting capital
+        use_cached: If True, only fetch the parts of the window not already held
+        engine: Backtest engine ('vectorized', 'compiled' or 'loop')
+        bar_type: 'time' bars at frequency, or 'tick', 'volume', 'delta' bars
+        bar_size: Trades, contracts or delta units per bar for non-time bars
+        direction: 'long', or 'long_short' to also trade the sell signals short
+        cost_model: Optional costs.CostModel; metrics are then net of costs
+
+    Returns:
+        Dictionary with backtest results and data
+    """
+    print("="*80)
+    print("VOLUME CUMULATIVE DELTA BACKTEST WITH DATABENTO DATA")
+    print("="*80)
+    print()
+
+    bars_df = load_bars(symbols, days_back, dataset, frequency, use_cached, bar_type, bar_size)
 
     print()
     print("-"*80)
@@ -108,12 +192,12 @@ def run_full_backtest(
 
     # Run backtest
     print("Executing backtest...")
-    backtest.backtest(bars_df, position_size=position_size)
+    backtest.backtest(bars_df, position_size=position_size, engine=engine, direction=direction)
     print("Backtest complete!")
     print()
 
     # Get performance metrics
-    metrics = backtest.get_performance_metrics()
+    metrics = backtest.get_performance_metrics(cost_model)
 
     # Display results
     print("="*80)
@@ -129,6 +213,10 @@ def run_full_backtest(
     print(f"Average Win:        ${metrics['avg_win']:.2f}")
     print(f"Average Loss:       ${metrics['avg_loss']:.2f}")
     print(f"Profit Factor:      {metrics['profit_factor']:.2f}")
+    print(f"Max Drawdown:       {metrics['max_drawdown']:.2f}%")
+    print(f"Sharpe Ratio:       {metrics['sharpe']:.2f}")
+    if 'total_costs' in metrics:
+        print(f"Total Costs:        ${metrics['total_costs']:.2f}")
     print("="*80)
     print()
 
@@ -153,6 +241,98 @@ def run_full_backtest(
     }
 
 
+def run_parameter_sweep(
+    symbols=['ES.FUT'],
+    days_back=7,
+    dataset='GLBX.MDP3',
+    frequency='1min',
+    param_grid=None,
+    param_space=None,
+    n_samples=None,
+    initial_capital=10000,
+    use_cached=True,
+    max_workers=None,
+    sort_by='total_return'
+):
+    """
+    Build bars once and backtest many threshold/position_size combinations
+
+    Args:
+        symbols, days_back, dataset, frequency, use_cached: As in run_full_backtest
+        param_grid: Grid sweep, e.g. {'threshold': [250, 500, 1000], 'position_size': [0.05, 0.1]}
+        param_space: Random sweep space, e.g. {'threshold': (100, 2000)}, with n_samples
+        n_samples: Number of random combinations
+        initial_capital: Starting capital
+        max_workers: Worker processes (default: all cores)
+        sort_by: Metric to rank combinations by
+
+    Returns:
+        DataFrame with parameters and performance metrics per combination
+    """
+    if param_grid is None and param_space is None:
+        param_grid = {'threshold': [250, 500, 1000, 2000], 'position_size': [0.05, 0.1, 0.2]}
+
+    bars_df = load_bars(symbols, days_back, dataset, frequency, use_cached)
+
+    print()
+    print("-"*80)
+    print("PARAMETER SWEEP")
+    print("-"*80)
+    results = run_sweep(
+        bars_df,
+        param_grid=param_grid,
+        param_space=param_space,
+        n_samples=n_samples,
+        initial_capital=initial_capital,
+        max_workers=max_workers,
+        sort_by=sort_by
+    )
+    print(results.head(10).to_string(index=False))
+    print()
+    return results
+
+
+def run_portfolio_backtest(
+    symbols=['GC.c.0', 'ES.c.0', '6E.c.0'],
+    days_back=7,
+    dataset='GLBX.MDP3',
+    frequency='1min',
+    threshold=500,
+    position_size=0.1,
+    initial_capital=30000,
+    weights=None,
+    use_cached=True
+):
+    """
+    Backtest several symbols together with shared capital
+
+    Args:
+        symbols: Symbols to trade together
+        days_back, dataset, frequency, use_cached: As in run_full_backtest
+        threshold: Cumulative delta threshold, or dict of symbol to threshold
+        position_size: Fraction of each symbol's capital sleeve per trade
+        initial_capital: Capital of the whole portfolio
+        weights: Optional dict of symbol to capital weight (equal by default)
+
+    Returns:
+        Dictionary with equity_curve (per symbol and total), trades and metrics
+    """
+    bars_by_symbol = {}
+    for symbol in symbols:
+        bars_by_symbol[symbol] = load_bars([symbol], days_back, dataset, frequency, use_cached)
+        print()
+
+    print("-"*80)
+    print(f"PORTFOLIO BACKTEST ({', '.join(symbols)})")
+    print("-"*80)
+    portfolio = PortfolioBacktest(initial_capital=initial_capital, weights=weights)
+    results = portfolio.run(bars_by_symbol, threshold=threshold, position_size=position_size)
+
+    print(results['metrics'].to_string())
+    print()
+    return results
+
+
 def main():
     """Run backtest with default parameters"""
     try:
@@ -0,0 +1,619 @@
+"""
+Storage backends for market data
+Reads and writes DataFrames as CSV, Parquet or Arrow IPC files
+"""
+
+import json
+import os
+import threading
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+
+# Low-cardinality text columns stored as categoricals (dictionary encoded)
+CATEGORICAL_COLUMNS = ['side', 'action', 'symbol', 'trade_side']
+
+# Schema metadata key holding the index and timestamp column layout
+METADATA_KEY = b'vcd_storage'
+
+
+class CsvStorage:
+    """Plain CSV files (the original storage format)"""
+
+    name = 'csv'
+    extension = '.csv'
+
+    def write(self, df, filepath):
+        """Write a DataFrame, index included"""
+        df.to_csv(filepath, index=True)
+
+    def read(self, filepath, columns=None):
+        """
+        Read a DataFrame
+
+        Args:
+            filepath: Path of the file
+            columns: Optional list of columns to load (the index is always loaded)
+        """
+        if columns is None:
+            return pd.read_csv(filepath, index_col=0, parse_dates=True)
+
+        header = pd.read_csv(filepath, nrows=0).columns
+        return pd.read_csv(
+            filepath,
+            index_col=0,
+            parse_dates=True,
+            usecols=[header[0]] + list(columns)
+        )
+
+    def iter_read(self, filepath, chunksize=1_000_000, columns=None):
+        """Read a DataFrame in chunks of at most chunksize rows"""
+        usecols = None
+        if columns is not None:
+            header = pd.read_csv(filepath, nrows=0).columns
+            usecols = [header[0]] + list(columns)
+
+        with pd.read_csv(filepath, index_col=0, parse_dates=True,
+                         usecols=usecols, chunksize=chunksize) as reader:
+            for chunk in reader:
+                yield chunk
+
+    def write_chunks(self, chunks, filepath):
+        """Write an iterable of DataFrames to a single file"""
+        for i, chunk in enumerate(chunks):
+            chunk.to_csv(filepath, mode='w' if i == 0 else 'a', header=i == 0)
+
+
+class ColumnarStorage:
+    """
+    Shared Arrow conversion for the columnar formats
+
+    Timestamps are stored as int64 nanoseconds since epoch (UTC) and the
+    side/action columns as dictionary-encoded categoricals. The original
+    index and timezones are recorded in the schema metadata and restored
+    on read.
+    """
+
+    name = None
+    extension = None
+    compression = 'zstd'
+
+    def __init__(self):
+        if pa is None:
+            raise ImportError(
+                f"pyarrow is required for {self.name} storage. Install with: pip install pyarrow"
+            )
+
+    def write(self, df, filepath):
+        """Write a DataFrame, index included"""
+        self._write_table(self.to_table(df), filepath)
+
+    def read(self, filepath, columns=None):
+        """
+        Read a DataFrame
+
+        Args:
+            filepath: Path of the file
+            columns: Optional list of columns to load (the index is always loaded)
+        """
+        return self.from_table(self._read_table(filepath, self._projection(filepath, columns)))
+
+    def write_chunks(self, chunks, filepath):
+        """Write an iterable of DataFrames to a single file without holding them all"""
+        writer = None
+        schema = None
+        try:
+            for chunk in chunks:
+                table = self.to_table(chunk)
+                if writer is None:
+                    schema = table.schema
+                    writer = self._open_writer(filepath, schema)
+                writer.write_table(table.cast(schema))
+        finally:
+            if writer is not None:
+                writer.close()
+
+    def to_table(self, df):
+        """Convert a DataFrame to an Arrow table in the storage layout"""
+        frame = df.reset_index()
+        index_column = frame.columns[0]
+
+        timestamps = {}
+        for col in frame.columns:
+            dtype = frame[col].dtype
+            if isinstance(dtype, pd.DatetimeTZDtype) or pd.api.types.is_datetime64_dtype(dtype):
+                tz = getattr(dtype, 'tz', None)
+                timestamps[col] = str(tz) if tz is not None else None
+                frame[col] = pd.DatetimeIndex(frame[col]).as_unit('ns').asi8
+            elif col in CATEGORICAL_COLUMNS and not isinstance(dtype, pd.CategoricalDtype):
+                frame[col] = frame[col].astype('category')
+
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        layout = {
+            'index_column': index_column,
+            'index_name': df.index.name,
+            'timestamps': timestamps,
+        }
+        metadata = dict(table.schema.metadata or {})
+        metadata[METADATA_KEY] = json.dumps(layout).encode()
+        return table.replace_schema_metadata(metadata)
+
+    def from_table(self, table):
+        """Convert an Arrow table in the storage layout back to a DataFrame"""
+        metadata = table.schema.metadata or {}
+        if METADATA_KEY not in metadata:
+            return table.to_pandas()
+
+        layout = json.loads(metadata[METADATA_KEY])
+        df = table.to_pandas()
+
+        for col, tz in layout['timestamps'].items():
+            if col in df.columns:
+                values = pd.to_datetime(df[col].to_numpy(), unit='ns', utc=tz is not None)
+                df[col] = values.tz_convert(tz) if tz is not None else values
+
+        df = df.set_index(layout['index_column'])
+        df.index.name = layout['index_name']
+        return df
+
+    def _projection(self, filepath, columns):
+        """Columns to read: the requested ones plus the stored index"""
+        if columns is None:
+            return None
+
+        layout = json.loads(self._read_schema(filepath).metadata[METADATA_KEY])
+        return [layout['index_column']] + [c for c in columns if c != layout['index_column']]
+
+
+class ParquetStorage(ColumnarStorage):
+    """Compressed Parquet files"""
+
+    name = 'parquet'
+    extension = '.parquet'
+
+    def iter_read(self, filepath, chunksize=1_000_000, columns=None):
+        """Read a DataFrame in chunks of at most chunksize rows"""
+        parquet_file = pq.ParquetFile(filepath, memory_map=True)
+        schema = parquet_file.schema_arrow
+        for batch in parquet_file.iter_batches(batch_size=chunksize,
+                                               columns=self._projection(filepath, columns)):
+            yield self.from_table(pa.Table.from_batches([batch]).replace_schema_metadata(schema.metadata))
+
+    def _write_table(self, table, filepath):
+        pq.write_table(table, filepath, compression=self.compression)
+
+    def _read_table(self, filepath, columns):
+        return pq.read_table(filepath, columns=columns, memory_map=True)
+
+    def _read_schema(self, filepath):
+        return pq.read_schema(filepath)
+
+    def _open_writer(self, filepath, schema):
+        return pq.ParquetWriter(filepath, schema, compression=self.compression)
+
+
+class ArrowStorage(ColumnarStorage):
+    """Compressed Arrow IPC (Feather v2) files"""
+
+    name = 'arrow'
+    extension = '.arrow'
+
+    def iter_read(self, filepath, chunksize=1_000_000, columns=None):
+        """Read a DataFrame in chunks of at most chunksize rows"""
+        projection = self._projection(filepath, columns)
+        with pa.memory_map(filepath) as source:
+            reader = pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                batch = reader.get_batch(i)
+                if projection is not None:
+                    batch = batch.select(projection)
+                for offset in range(0, batch.num_rows, chunksize):
+                    table = pa.Table.from_batches([batch.slice(offset, chunksize)])
+                    yield self.from_table(table.replace_schema_metadata(reader.schema.metadata))
+
+    def _write_table(self, table, filepath):
+        feather.write_feather(table, filepath, compression=self.compression)
+
+    def _read_table(self, filepath, columns):
+        return feather.read_table(filepath, columns=columns, memory_map=True)
+
+    def _read_schema(self, filepath):
+        with pa.memory_map(filepath) as source:
+            return pa.ipc.open_file(source).schema
+
+    def _open_writer(self, filepath, schema):
+        options = pa.ipc.IpcWriteOptions(compression=self.compression)
+        return pa.ipc.new_file(filepath, schema, options=options)
+
+
+STORAGE_FORMATS = {
+    'csv': CsvStorage,
+    'parquet': ParquetStorage,
+    'arrow': ArrowStorage,
+}
+
+
+def get_storage(storage_format):
+    """
+    Storage backend for a format name
+
+    Args:
+        storage_format: 'csv', 'parquet' or 'arrow'
+    """
+    if storage_format not in STORAGE_FORMATS:
+        raise ValueError(
+            f"Unknown storage format: {storage_format}. Choose from {list(STORAGE_FORMATS)}"
+        )
+    return STORAGE_FORMATS[storage_format]()
+
+
+def storage_for_file(filename):
+    """Storage backend matching a file's extension"""
+    extension = os.path.splitext(filename)[1]
+    for storage_class in STORAGE_FORMATS.values():
+        if storage_class.extension == extension:
+            return storage_class()
+
+    raise ValueError(f"Unsupported data file: {filename}")
+
+
+def data_extensions():
+    """File extensions of all supported storage formats"""
+    return tuple(storage_class.extension for storage_class in STORAGE_FORMATS.values())
+
+
+NS_PER_DAY = 24 * 60 * 60 * 1_000_000_000
+
+
+def _utc_timestamp(value):
+    """UTC Timestamp from a date string, datetime or Timestamp"""
+    ts = pd.Timestamp(value)
+    return ts.tz_localize('UTC') if ts.tzinfo is None else ts.tz_convert('UTC')
+
+
+def trading_days(start_date, end_date):
+    """
+    Days overlapping the half-open window [start_date, end_date)
+
+    Days are UTC calendar days, the boundaries Databento uses for dates.
+
+    Returns:
+        List of 'YYYY-MM-DD' strings
+    """
+    start = _utc_timestamp(start_date)
+    end = _utc_timestamp(end_date)
+    if end <= start:
+        return []
+
+    days = pd.date_range(start.normalize(), (end - pd.Timedelta(1, 'ns')).normalize(), freq='D')
+    return [day.strftime('%Y-%m-%d') for day in days]
+
+
+class PartitionedStore:
+    """
+    Date-partitioned store of market data
+
+    Layout: {root}/{schema}/{symbol}/{YYYY-MM-DD}{extension}
+
+    One file holds one UTC day of one symbol and schema. Reads only open the
+    partitions that overlap the requested window. Each symbol/schema
+    directory also keeps a manifest (_manifest.json) of the time ranges
+    already fetched, so days without any records are not fetched again and
+    only the missing ranges of a new window need downloading.
+    """
+
+    MANIFEST = '_manifest.json'
+
+    def __init__(self, root, storage_format='parquet'):
+        """
+        Args:
+            root: Root directory of the store
+            storage_format: Format of the partition files ('parquet', 'arrow' or 'csv')
+        """
+        self.root = root
+        self.storage = get_storage(storage_format)
+
+        # Manifest updates may come from several download threads
+        self._lock = threading.Lock()
+        # Chunks downloaded in parallel can share a day: its read-merge-write
+        # holds that partition's lock
+        self._partition_locks = {}
+
+    def partition_dir(self, symbol, schema):
+        """Directory holding the partitions of one symbol and schema"""
+        return os.path.join(self.root, schema, symbol)
+
+    def partition_path(self, symbol, schema, day):
+        """Path of one day's partition"""
+        return os.path.join(self.partition_dir(symbol, schema), f"{day}{self.storage.extension}")
+
+    def _partition_lock(self, path):
+        """Lock serializing writes to one partition file"""
+        with self._lock:
+            return self._partition_locks.setdefault(path, threading.Lock())
+
+    def days(self, symbol, schema):
+        """Sorted list of days with a partition for a symbol and schema"""
+        directory = self.partition_dir(symbol, schema)
+        if not os.path.isdir(directory):
+            return []
+
+        return sorted(
+            f[:-len(self.storage.extension)]
+            for f in os.listdir(directory)
+            if f.endswith(self.storage.extension)
+        )
+
+    def datasets(self):
+        """List of (schema, symbol) pairs held in the store"""
+        if not os.path.isdir(self.root):
+            return []
+
+        pairs = []
+        for schema in sorted(os.listdir(self.root)):
+            schema_dir = os.path.join(self.root, schema)
+            if not os.path.isdir(schema_dir):
+                continue
+            for symbol in sorted(os.listdir(schema_dir)):
+                if self.held_ranges(symbol, schema):
+                    pairs.append((schema, symbol))
+        return pairs
+
+    def held_ranges(self, symbol, schema):
+        """
+        Time ranges already fetched for a symbol and schema
+
+        Returns:
+            Sorted, non-overlapping list of (start, end) UTC Timestamps, end exclusive
+        """
+        manifest_path = os.path.join(self.partition_dir(symbol, schema), self.MANIFEST)
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                ranges = json.load(f)['ranges']
+            return [(_utc_timestamp(start), _utc_timestamp(end)) for start, end in ranges]
+
+        # No manifest yet: every partition file counts as a fetched day
+        days = [_utc_timestamp(day) for day in self.days(symbol, schema)]
+        return _merge_ranges([(day, day + pd.Timedelta(days=1)) for day in days])
+
+    def ensure_manifest(self, symbol, schema):
+        """Create the manifest from the existing partition files if there is none"""
+        manifest_path = os.path.join(self.partition_dir(symbol, schema), self.MANIFEST)
+        with self._lock:
+            if not os.path.exists(manifest_path):
+                self._save_ranges(symbol, schema, self.held_ranges(symbol, schema))
+
+    def add_range(self, symbol, schema, start_date, end_date):
+        """Record [start_date, end_date) as fetched in the manifest"""
+        with self._lock:
+            ranges = self.held_ranges(symbol, schema)
+            ranges.append((_utc_timestamp(start_date), _utc_timestamp(end_date)))
+            self._save_ranges(symbol, schema, ranges)
+
+    def _save_ranges(self, symbol, schema, ranges):
+        directory = self.partition_dir(symbol, schema)
+        os.makedirs(directory, exist_ok=True)
+        manifest_path = os.path.join(directory, self.MANIFEST)
+
+        # Write then rename, so a crash never leaves a truncated manifest
+        tmp_path = manifest_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({
+                'ranges': [[start.isoformat(), end.isoformat()] for start, end in _merge_ranges(ranges)]
+            }, f, indent=2)
+        os.replace(tmp_path, manifest_path)
+
+    def missing_ranges(self, symbol, schema, start_date, end_date):
+        """
+        Parts of [start_date, end_date) not fetched yet
+
+        Returns:
+            List of (start, end) UTC Timestamps, end exclusive
+        """
+        start = _utc_timestamp(start_date)
+        end = _utc_timestamp(end_date)
+
+        missing = []
+        cursor = start
+        for held_start, held_end in self.held_ranges(symbol, schema):
+            if held_end <= cursor:
+                continue
+            if held_start >= end:
+                break
+            if held_start > cursor:
+                missing.append((cursor, held_start))
+            cursor = max(cursor, held_end)
+            if cursor >= end:
+                break
+
+        if cursor < end:
+            missing.append((cursor, end))
+        return missing
+
+    def covers(self, symbol, schema, start_date, end_date):
+        """True when all of [start_date, end_date) has been fetched"""
+        return not self.missing_ranges(symbol, schema, start_date, end_date)
+
+    def partitions(self, symbol, schema, start_date, end_date):
+        """Paths of the partitions overlapping [start_date, end_date)"""
+        held = set(self.days(symbol, schema))
+        return [
+            self.partition_path(symbol, schema, day)
+            for day in trading_days(start_date, end_date)
+            if day in held
+        ]
+
+    def write(self, df, symbol, schema, start_date=None, end_date=None):
+        """
+        Split records into daily partitions, write them and record the window
+
+        Records of a partition that fall inside the window are replaced by
+        the new ones; records outside it (e.g., the rest of a partly fetched
+        day) are kept.
+
+        Args:
+            df: DataFrame indexed by timestamp
+            symbol: Symbol the records belong to
+            schema: Databento schema (e.g., 'trades', 'ohlcv-1m')
+            start_date: Start of the fetched window (default: first record)
+            end_date: End of the fetched window, exclusive (default: after the last record)
+
+        Returns:
+            Number of partitions written
+        """
+        directory = self.partition_dir(symbol, schema)
+        os.makedirs(directory, exist_ok=True)
+
+        index = pd.DatetimeIndex(df.index)
+        if not index.is_monotonic_increasing:
+            order = index.argsort(kind='stable')
+            df = df.iloc[order]
+            index = index[order]
+
+        if index.tz is None:
+            index = index.tz_localize('UTC')
+        timestamps = index.as_unit('ns').asi8
+        day_ns = timestamps // NS_PER_DAY * NS_PER_DAY
+
+        if start_date is None:
+            if not len(index):
+                return 0
+            start_date = index[0]
+        if end_date is None:
+            end_date = index[-1] + pd.Timedelta(1, 'ns')
+        start = _utc_timestamp(start_date)
+        end = _utc_timestamp(end_date)
+
+        # Without a manifest, held ranges come from the partition files,
+        # so capture them before writing new ones
+        self.ensure_manifest(symbol, schema)
+
+        written = 0
+        for day in trading_days(start, end):
+            day_start = pd.Timestamp(day, tz='UTC')
+            lo = day_ns.searchsorted(day_start.value, side='left')
+            hi = day_ns.searchsorted(day_start.value, side='right')
+            records = df.iloc[lo:hi]
+
+            path = self.partition_path(symbol, schema, day)
+            whole_day = start <= day_start and day_start + pd.Timedelta(days=1) <= end
+            with self._partition_lock(path):
+                if not whole_day and os.path.exists(path):
+                    records = self._merge_partition(path, records, start, end)
+
+                if len(records):
+                    self.storage.write(records, path)
+                    written += 1
+                elif os.path.exists(path):
+                    os.remove(path)
+
+        self.add_range(symbol, schema, start, end)
+        return written
+
+    def _merge_partition(self, path, records, start, end):
+        """Existing records of a partition outside [start, end) plus the new ones"""
+        existing = self.storage.read(path)
+        index = pd.DatetimeIndex(existing.index)
+        if index.tz is None:
+            index = index.tz_localize('UTC')
+        kept = existing[(index < start) | (index >= end)]
+        if not len(records):
+            return kept
+        merged = pd.concat([kept, records])
+        return merged.iloc[pd.DatetimeIndex(merged.index).argsort(kind='stable')]
+
+    def write_chunks(self, chunks, symbol, schema):
+        """
+        Partition time-ordered chunks of records (e.g., a large file read in chunks)
+
+        Rows of the current day are buffered until a later day starts, so only
+        about one day of records is held at a time. The whole span from the
+        first to the last record's day is recorded as fetched.
+
+        Returns:
+            Number of partitions written
+        """
+        written = 0
+        pending = None
+        window_start = None
+
+        for chunk in chunks:
+            if chunk.empty:
+                continue
+            pending = chunk if pending is None else pd.concat([pending, chunk])
+
+            index = pd.DatetimeIndex(pending.index)
+            if index.tz is None:
+                index = index.tz_localize('UTC')
+            if window_start is None:
+                window_start = index[0].normalize()
+            last_day = index[-1].normalize()
+
+            # Everything before the last day is complete
+            complete = index < last_day
+            if complete.any():
+                written += self.write(pending[complete], symbol, schema,
+                                      start_date=window_start, end_date=last_day)
+                window_start = last_day
+                pending = pending[~complete]
+
+        if pending is not None and len(pending):
+            index = pd.DatetimeIndex(pending.index)
+            if index.tz is None:
+                index = index.tz_localize('UTC')
+            written += self.write(pending, symbol, schema, start_date=window_start,
+                                  end_date=index[-1].normalize() + pd.Timedelta(days=1))
+
+        return written
+
+    def read(self, symbol, schema, start_date, end_date, columns=None):
+        """
+        Read records in [start_date, end_date) from the overlapping partitions
+
+        Args:
+            symbol: Symbol to read
+            schema: Databento schema (e.g., 'trades', 'ohlcv-1m')
+            start_date: Start of the window (string 'YYYY-MM-DD' or datetime)
+            end_date: End of the window, exclusive
+            columns: Optional list of columns to load (the index is always loaded)
+
+        Returns:
+            DataFrame (empty if no partition overlaps the window)
+        """
+        frames = list(self.iter_read(symbol, schema, start_date, end_date, columns=columns))
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames) if len(frames) > 1 else frames[0]
+
+    def iter_read(self, symbol, schema, start_date, end_date, columns=None):
+        """Yield one DataFrame per overlapping partition, trimmed to the window"""
+        start = _utc_timestamp(start_date)
+        end = _utc_timestamp(end_date)
+
+        for path in self.partitions(symbol, schema, start_date, end_date):
+            df = self.storage.read(path, columns=columns)
+            index = pd.DatetimeIndex(df.index)
+            if index.tz is None:
+                index = index.tz_localize('UTC')
+            mask = (index >= start) & (index < end)
+            yield df if mask.all() else df[mask]
+
+
+def _merge_ranges(ranges):
+    """Merge overlapping or touching (start, end) ranges"""
+    merged = []
+    for start, end in sorted(ranges):
+        if end <= start:
+            continue
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
@@ -0,0 +1,219 @@
+"""
+Parameter Sweep
+Runs the backtest over a grid or random sample of parameters on all cores
+"""
+
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from bar_store import BarStore
+from main import VolumeCumulativeDeltaBacktest, delta_signals
+
+
+# Parameters of generate_signals and backtest that can be swept
+SWEEP_PARAMETERS = ('threshold', 'position_size')
+DEFAULT_PARAMETERS = {'threshold': 1000, 'position_size': 0.1}
+
+# Bar columns the workers need
+SHARED_COLUMNS = ('close', 'cumulative_delta')
+
+# Arrays attached by each worker process
+_worker_arrays = {}
+_worker_blocks = []
+
+
+def parameter_grid(param_grid):
+    """
+    All combinations of a parameter grid
+
+    Args:
+        param_grid: Dict of parameter name to list of values,
+                    e.g. {'threshold': [250, 500, 1000], 'position_size': [0.05, 0.1]}
+
+    Returns:
+        List of parameter dicts
+    """
+    _check_names(param_grid)
+    names = list(param_grid)
+    return [dict(zip(names, values)) for values in itertools.product(*param_grid.values())]
+
+
+def random_parameters(param_space, n_samples, seed=None):
+    """
+    Random sample of parameter combinations
+
+    Args:
+        param_space: Dict of parameter name to either a list of values
+                     (sampled uniformly) or a (low, high) tuple (sampled
+                     uniformly in the range; integers if both bounds are ints)
+        n_samples: Number of combinations
+        seed: Random seed
+
+    Returns:
+        List of parameter dicts
+    """
+    _check_names(param_space)
+    rng = np.random.default_rng(seed)
+    columns = {}
+
+    for name, space in param_space.items():
+        if isinstance(space, tuple):
+            low, high = space
+            if isinstance(low, int) and isinstance(high, int):
+                columns[name] = rng.integers(low, high, n_samples, endpoint=True).tolist()
+            else:
+                columns[name] = rng.uniform(low, high, n_samples).tolist()
+        else:
+            values = list(space)
+            columns[name] = [values[i] for i in rng.integers(0, len(values), n_samples)]
+
+    return [dict(zip(columns, values)) for values in zip(*columns.values())]
+
+
+def run_sweep(bars, param_grid=None, param_space=None, n_samples=None, seed=None,
+              initial_capital=10000, max_workers=None, sort_by=None):
+    """
+    Backtest every parameter combination over the same bars
+
+    Bars are computed once by the caller. Their close and cumulative_delta
+    arrays are copied into shared memory, and each worker process maps them
+    read-only, so the bars are never pickled per combination. Bars given as
+    a BarStore are not copied at all: every worker memory-maps the store's
+    files.
+
+    Args:
+        bars: DataFrame with close and cumulative_delta (e.g., from
+              process_trades_to_bars), or a BarStore / bar store directory
+        param_grid: Grid for parameter_grid (exhaustive sweep)
+        param_space: Space for random_parameters (random sweep, with n_samples)
+        n_samples: Number of random combinations
+        seed: Random seed for the random sweep
+        initial_capital: Starting capital of every backtest
+        max_workers: Worker processes (default: all cores)
+        sort_by: Metric to sort the results by (descending), e.g. 'total_return'
+
+    Returns:
+        DataFrame with one row per combination: its parameters followed by
+        the get_performance_metrics columns
+    """
+    if param_grid is not None:
+        combinations = parameter_grid(param_grid)
+    elif param_space is not None:
+        if not n_samples:
+            raise ValueError("n_samples is required for a random sweep")
+        combinations = random_parameters(param_space, n_samples, seed)
+    else:
+        raise ValueError("Pass param_grid or param_space")
+
+    if isinstance(bars, str):
+        bars = BarStore(bars)
+
+    max_workers = max_workers or os.cpu_count() or 1
+    print(f"Sweeping {len(combinations)} combinations over {len(bars)} bars "
+          f"with {max_workers} workers...")
+
+    if isinstance(bars, BarStore):
+        # Workers open the store themselves; nothing is copied
+        rows = _map_combinations(combinations, max_workers, (None, None, initial_capital, bars.directory))
+        return _sweep_results(rows, sort_by)
+
+    arrays = {column: bars[column].to_numpy(dtype=float) for column in SHARED_COLUMNS}
+    index = pd.DatetimeIndex(bars.index)
+    arrays['index'] = index.as_unit('ns').asi8
+
+    blocks = []
+    try:
+        specs = {}
+        for name, array in arrays.items():
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            blocks.append(block)
+            np.ndarray(array.shape, array.dtype, buffer=block.buf)[:] = array
+            specs[name] = (block.name, array.shape, array.dtype.str)
+
+        rows = _map_combinations(
+            combinations, max_workers,
+            (specs, str(index.tz) if index.tz else None, initial_capital, None)
+        )
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+    return _sweep_results(rows, sort_by)
+
+
+def _map_combinations(combinations, max_workers, initargs):
+    with ProcessPoolExecutor(
+        max_workers=max_workers,
+        initializer=_init_worker,
+        initargs=initargs,
+    ) as executor:
+        chunksize = max(1, len(combinations) // (max_workers * 4))
+        return list(executor.map(_run_combination, combinations, chunksize=chunksize))
+
+
+def _sweep_results(rows, sort_by):
+    results = pd.DataFrame(rows)
+    if sort_by:
+        results = results.sort_values(sort_by, ascending=False, ignore_index=True)
+
+    print(f"Sweep complete: {len(results)} results")
+    return results
+
+
+def _check_names(params):
+    unknown = set(params) - set(SWEEP_PARAMETERS)
+    if unknown:
+        raise ValueError(f"Unknown sweep parameters: {sorted(unknown)}. Use {SWEEP_PARAMETERS}")
+
+
+def _init_worker(specs, tz, initial_capital, store_dir=None):
+    """Map the shared bar arrays (or the bar store) into this worker"""
+    _worker_arrays['initial_capital'] = initial_capital
+    if store_dir is not None:
+        store = BarStore(store_dir)
+        for name in SHARED_COLUMNS:
+            _worker_arrays[name] = store.column(name)
+        _worker_arrays['index'] = store.index()
+        return
+
+    for name, (block_name, shape, dtype) in specs.items():
+        # Workers share the parent's resource tracker, so attaching does not
+        # change who unlinks the block (run_sweep does, once)
+        block = shared_memory.SharedMemory(name=block_name)
+        _worker_blocks.append(block)
+
+        array = np.ndarray(shape, np.dtype(dtype), buffer=block.buf)
+        array.flags.writeable = False
+        _worker_arrays[name] = array
+
+    index = pd.DatetimeIndex(_worker_arrays['index'], dtype='datetime64[ns]')
+    _worker_arrays['index'] = index.tz_localize('UTC').tz_convert(tz) if tz else index
+
+
+def _run_combination(params):
+    """Backtest one parameter combination against the shared bars"""
+    return _backtest_params(
+        _worker_arrays['close'],
+        _worker_arrays['cumulative_delta'],
+        _worker_arrays['index'],
+        params,
+        _worker_arrays['initial_capital'],
+    )
+
+
+def _backtest_params(close, cumulative_delta, index, params, initial_capital):
+    settings = {**DEFAULT_PARAMETERS, **params}
+    backtest = VolumeCumulativeDeltaBacktest(initial_capital=initial_capital)
+    backtest.backtest_arrays(
+        close,
+        delta_signals(cumulative_delta, settings['threshold']),
+        index,
+        position_size=settings['position_size'],
+    )
+    return {**params, **backtest.get_performance_metrics()}
@@ -0,0 +1,206 @@
+"""
+Parity tests for the backtest engines
+Runs the same signals through the bar loop and the vectorized engine
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import kernels
+from main import VolumeCumulativeDeltaBacktest, generate_sample_data
+
+
+def run_engine(data, engine, position_size=0.1, direction='long'):
+    backtest = VolumeCumulativeDeltaBacktest(initial_capital=10000)
+    backtest.backtest(data, position_size=position_size, engine=engine, direction=direction)
+    return backtest
+
+
+def make_signals(threshold, days=60):
+    backtest = VolumeCumulativeDeltaBacktest()
+    data = generate_sample_data(days=days)
+    data = backtest.calculate_cumulative_delta(data)
+    return backtest.generate_signals(data, threshold=threshold)
+
+
+def assert_same_results(loop, vectorized):
+    # Calmar annualizes short random runs to huge values, so compare relatively
+    assert loop.get_performance_metrics() == pytest.approx(vectorized.get_performance_metrics())
+    assert np.isclose(loop.capital, vectorized.capital)
+
+    assert len(loop.positions) == len(vectorized.positions)
+    for expected, actual in zip(loop.positions, vectorized.positions):
+        assert expected['type'] == actual['type']
+        assert expected['entry_time'] == actual['entry_time']
+        assert np.isclose(expected['entry_price'], actual['entry_price'])
+        assert np.isclose(expected['size'], actual['size'])
+
+    assert len(loop.trades) == len(vectorized.trades)
+    for expected, actual in zip(loop.trades, vectorized.trades):
+        assert expected['exit_time'] == actual['exit_time']
+        for key in ['entry_price', 'exit_price', 'pnl', 'return']:
+            assert np.isclose(expected[key], actual[key])
+
+    assert [e['time'] for e in loop.equity_curve] == [e['time'] for e in vectorized.equity_curve]
+    np.testing.assert_allclose(
+        [e['equity'] for e in loop.equity_curve],
+        [e['equity'] for e in vectorized.equity_curve]
+    )
+
+
+def test_vectorized_matches_loop_on_sample_data():
+    for threshold in [0, 100, 500, 2000]:
+        data = make_signals(threshold)
+        assert_same_results(run_engine(data, 'loop'), run_engine(data, 'vectorized'))
+
+
+def test_vectorized_matches_loop_on_random_signals():
+    rng = np.random.default_rng(7)
+    for _ in range(20):
+        n = int(rng.integers(2, 400))
+        data = pd.DataFrame({
+            'close': 100 + rng.normal(0, 1, n).cumsum(),
+            'signal': rng.choice([-1, 0, 1], n, p=[0.2, 0.5, 0.3]),
+        }, index=pd.date_range('2023-01-02', periods=n, freq='1min'))
+        assert_same_results(run_engine(data, 'loop', 0.25), run_engine(data, 'vectorized', 0.25))
+
+
+def test_open_position_is_not_closed():
+    data = pd.DataFrame({
+        'close': [100.0, 101.0, 102.0, 103.0],
+        'signal': [0, 1, 1, 1],
+    }, index=pd.date_range('2023-01-02', periods=4, freq='1h'))
+
+    vectorized = run_engine(data, 'vectorized')
+
+    assert len(vectorized.positions) == 1
+    assert vectorized.trades == []
+    assert vectorized.capital == 10000
+    assert_same_results(run_engine(data, 'loop'), vectorized)
+
+
+def test_matrix_backtest_matches_single_runs():
+    data = make_signals(threshold=500)
+    thresholds = [0, 100, 250, 500, 1000, 2500, 10**9]
+
+    batch = VolumeCumulativeDeltaBacktest(initial_capital=10000)
+    matrix = batch.generate_signal_matrix(data, thresholds)
+    results = batch.backtest_matrix(data['close'].to_numpy(), matrix, position_size=0.2, block_size=3,
+                                    index=data.index)
+
+    assert matrix.shape == (len(data), len(thresholds))
+    for column, threshold in enumerate(thresholds):
+        single = VolumeCumulativeDeltaBacktest(initial_capital=10000)
+        signals = single.generate_signals(data.copy(), threshold=threshold)
+        assert (matrix[:, column] == signals['signal'].to_numpy()).all()
+
+        single.backtest(signals, position_size=0.2)
+        expected = single.get_performance_metrics()
+        assert {key: results.iloc[column][key] for key in expected} == expected
+
+
+def random_signals(rng, n):
+    return pd.DataFrame({
+        'close': 100 + rng.normal(0, 1, n).cumsum(),
+        'signal': rng.choice([-1, 0, 1], n, p=[0.1, 0.6, 0.3]),
+        'cumulative_delta': rng.normal(0, 50, n).cumsum(),
+    }, index=pd.date_range('2023-01-02', periods=n, freq='1min'))
+
+
+def test_compiled_matches_loop():
+    rng = np.random.default_rng(11)
+    for _ in range(10):
+        data = random_signals(rng, int(rng.integers(2, 400)))
+        assert_same_results(run_engine(data, 'loop', 0.25), run_engine(data, 'compiled', 0.25))
+
+    data = make_signals(500)
+    assert_same_results(run_engine(data, 'loop'), run_engine(data, 'compiled'))
+
+
+@pytest.mark.skipif(kernels.numba is None, reason="numba is not installed")
+def test_kernels_identical_with_exits():
+    exits = {'stop_loss': 0.01, 'take_profit': 0.03, 'trailing_stop': 0.015,
+             'max_bars': 40, 'delta_stop': 150}
+    rng = np.random.default_rng(5)
+    for _ in range(5):
+        data = random_signals(rng, 1000)
+        results = []
+        for kernel in ['python', 'numba']:
+            backtest = VolumeCumulativeDeltaBacktest(initial_capital=10000)
+            backtest.backtest_kernel(data, position_size=0.5, kernel=kernel, **exits)
+            results.append(backtest)
+        python, compiled = results
+
+        assert python.capital == compiled.capital
+        assert python.positions == compiled.positions
+        assert python.trades == compiled.trades
+        assert python.equity_curve == compiled.equity_curve
+        assert {t['exit_reason'] for t in python.trades} > {'signal'}
+
+
+def test_kernel_exit_rules():
+    index = pd.date_range('2023-01-02', periods=6, freq='1h')
+
+    def exit_of(close, **exits):
+        data = pd.DataFrame({'close': close, 'signal': [0, 1, 1, 1, 1, 1]}, index=index)
+        backtest = VolumeCumulativeDeltaBacktest(initial_capital=10000)
+        backtest.backtest_kernel(data, position_size=1.0, kernel='python', **exits)
+        return [(t['exit_time'], t['exit_reason']) for t in backtest.trades]
+
+    close = [100.0, 100.0, 103.0, 101.0, 97.0, 120.0]
+    assert exit_of(close) == []
+    assert exit_of(close, stop_loss=0.02) == [(index[4], 'stop_loss')]
+    assert exit_of(close, take_profit=0.025) == [(index[2], 'take_profit')]
+    assert exit_of(close, trailing_stop=0.015) == [(index[3], 'trailing_stop')]
+    assert exit_of(close, max_bars=3) == [(index[4], 'max_bars')]
+
+
+def test_long_short_matches_loop():
+    rng = np.random.default_rng(13)
+    for _ in range(20):
+        data = random_signals(rng, int(rng.integers(2, 400)))
+        assert_same_results(run_engine(data, 'loop', 0.25, 'long_short'),
+                            run_engine(data, 'vectorized', 0.25, 'long_short'))
+
+    for threshold in [0, 500, 2000]:
+        data = make_signals(threshold)
+        assert_same_results(run_engine(data, 'loop', direction='long_short'),
+                            run_engine(data, 'vectorized', direction='long_short'))
+
+
+def test_long_short_flips():
+    data = pd.DataFrame({
+        'close': [100.0, 100.0, 110.0, 99.0, 99.0, 90.0, 95.0],
+        'signal': [0, 1, -1, -1, 0, 1, 0],
+    }, index=pd.date_range('2023-01-02', periods=7, freq='1h'))
+
+    for engine in ['loop', 'vectorized']:
+        backtest = run_engine(data, engine, position_size=1.0, direction='long_short')
+        assert [p['type'] for p in backtest.positions] == ['LONG', 'SHORT', 'LONG']
+        # Long 100 -> 110 (+10%), then short 110 -> 90 (+18.18%); the last long is open
+        assert [round(t['return'], 2) for t in backtest.trades] == [10.0, 18.18]
+        assert backtest.capital == pytest.approx(10000 * 1.1 * (1 + 20 / 110))
+        assert backtest.equity_curve[-1]['equity'] == pytest.approx(backtest.capital * 95 / 90)
+
+    # Long only ignores the short legs
+    long_only = run_engine(data, 'vectorized', position_size=1.0)
+    assert [p['type'] for p in long_only.positions] == ['LONG', 'LONG']
+    assert len(long_only.trades) == 1
+
+    with pytest.raises(ValueError):
+        run_engine(data, 'compiled', direction='long_short')
+
+
+if __name__ == "__main__":
+    test_vectorized_matches_loop_on_sample_data()
+    test_vectorized_matches_loop_on_random_signals()
+    test_open_position_is_not_closed()
+    test_matrix_backtest_matches_single_runs()
+    test_compiled_matches_loop()
+    if kernels.numba is not None:
+        test_kernels_identical_with_exits()
+    test_kernel_exit_rules()
+    test_long_short_matches_loop()
+    test_long_short_flips()
+    print("Backtest engine parity tests passed")
@@ -0,0 +1,111 @@
+"""
+Tests for the content-addressed bar cache
+"""
+
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+import bar_cache
+from bar_cache import BarCache, file_fingerprint, source_fingerprint
+from test_volume_calculator import make_trades
+from volume_calculator import VolumeCalculator
+
+
+def test_repeated_builds_hit_the_cache(tmp_path):
+    cache = BarCache(tmp_path)
+    trades = make_trades(5000, seed=1)
+    fingerprint = source_fingerprint(trades)
+    calls = []
+
+    def build():
+        calls.append(1)
+        return VolumeCalculator.process_trades_to_bars(trades, frequency='5min')
+
+    first = cache.get_or_build(fingerprint, build, frequency='5min')
+    second = cache.get_or_build(fingerprint, build, frequency='5min')
+
+    assert len(calls) == 1
+    pd.testing.assert_frame_equal(second, first)
+
+    # Other settings or other trades are other entries
+    cache.get_or_build(fingerprint, build, frequency='1min')
+    changed = trades.copy()
+    changed.iloc[0, changed.columns.get_loc('size')] += 1
+    cache.get_or_build(source_fingerprint(changed), build, frequency='5min')
+    assert len(calls) == 3
+    assert len(cache.entries()) == 3
+
+
+def test_file_fingerprint_changes_when_file_is_rewritten(tmp_path):
+    path = tmp_path / 'trades.csv'
+    make_trades(100, seed=2).to_csv(path)
+    before = file_fingerprint(str(path))
+
+    make_trades(101, seed=2).to_csv(path)
+    assert file_fingerprint(str(path)) != before
+
+
+def test_lru_eviction_under_budget(tmp_path):
+    bars = VolumeCalculator.process_trades_to_bars(make_trades(2000, seed=3), frequency='1min')
+    cache = BarCache(tmp_path)
+    cache.put('a', bars)
+    entry_bytes = cache.entries()['a']['bytes']
+
+    cache.max_bytes = int(entry_bytes * 2.5)
+    cache.put('b', bars)
+    cache.get('a')          # 'b' is now the least recently used
+    cache.put('c', bars)
+
+    assert set(cache.entries()) == {'a', 'c'}
+    assert not os.path.exists(cache.path('b'))
+    assert cache.total_bytes() <= cache.max_bytes
+
+
+def test_entries_from_old_calculator_versions_are_evicted(tmp_path, monkeypatch):
+    bars = VolumeCalculator.process_trades_to_bars(make_trades(1000, seed=4), frequency='1min')
+    cache = BarCache(tmp_path)
+    old_key = cache.key('source')
+    cache.put(old_key, bars)
+
+    monkeypatch.setattr(bar_cache, 'CALCULATOR_VERSION', bar_cache.CALCULATOR_VERSION + 1)
+    assert cache.key('source') != old_key
+    cache.put(cache.key('source'), bars)
+
+    assert old_key not in cache.entries()
+    assert not os.path.exists(cache.path(old_key))
+
+
+def _save_indexes(root, worker):
+    cache = BarCache(root)
+    for i in range(50):
+        cache._save_index({f"{worker}-{i}": {'bytes': 0, 'padding': 'x' * 2000}})
+
+
+def test_index_writers_in_several_processes_do_not_collide(tmp_path):
+    with ProcessPoolExecutor(max_workers=4) as pool:
+        list(pool.map(_save_indexes, [str(tmp_path)] * 4, range(4)))
+
+    # The index is one writer's complete JSON and no temp files are left
+    with open(tmp_path / BarCache.INDEX) as f:
+        assert len(json.load(f)) == 1
+    assert os.listdir(tmp_path) == [BarCache.INDEX]
+
+
+def test_load_bars_hit_skips_reading_trades(tmp_path, monkeypatch):
+    import run_backtest_with_data
+    from test_databento_fetcher import make_fetcher
+
+    fetcher = make_fetcher(tmp_path)
+    monkeypatch.setattr(run_backtest_with_data, 'DatabentoFetcher', lambda: fetcher)
+    reads = []
+    load_range = fetcher.load_range
+    monkeypatch.setattr(fetcher, 'load_range', lambda *args, **kwargs: reads.append(args) or load_range(*args, **kwargs))
+
+    first = run_backtest_with_data.load_bars(['GC.c.0'], days_back=3, frequency='5min')
+    second = run_backtest_with_data.load_bars(['GC.c.0'], days_back=3, frequency='5min')
+
+    assert len(reads) == 1
+    pd.testing.assert_frame_equal(second, first, check_freq=False)
@@ -0,0 +1,76 @@
+"""
+Tests for the multi-timeframe bar pyramid
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from bar_pyramid import BarPyramid, roll_up, stream_pyramid
+from test_volume_calculator import make_trades
+from volume_calculator import VolumeCalculator
+
+
+@pytest.mark.parametrize('tz', ['UTC', 'America/New_York', None])
+def test_roll_ups_match_direct_aggregation(tz):
+    trades = make_trades(20000, seed=3, tz=tz)
+    pyramid = BarPyramid.from_trades(trades).build()
+
+    for frequency in ('1min', '5min', '15min', '1h'):
+        direct = VolumeCalculator.process_trades_to_bars(trades, frequency=frequency)
+        pd.testing.assert_frame_equal(pyramid.bars(frequency), direct)
+
+
+def test_streamed_base_bars_match_batch():
+    trades = make_trades(20000, seed=4)
+    chunks = [trades.iloc[i:i + 3000] for i in range(0, len(trades), 3000)]
+
+    streamed = BarPyramid.from_chunks(chunks)
+    pd.testing.assert_frame_equal(streamed.bars('5min'),
+                                  BarPyramid.from_trades(trades).bars('5min'))
+
+
+@pytest.mark.parametrize('tz', ['UTC', 'America/New_York'])
+def test_streamed_pyramid_matches_batch(tz):
+    trades = make_trades(20000, seed=9, tz=tz)
+    chunks = [trades.iloc[i:i + 700] for i in range(0, len(trades), 700)]
+
+    streamed = {}
+    for frequency, bars in stream_pyramid(chunks, timeframes=('1min', '5min', '1h')):
+        streamed.setdefault(frequency, []).append(bars)
+
+    batch = BarPyramid.from_trades(trades)
+    for frequency in ('1s', '1min', '5min', '1h'):
+        pd.testing.assert_frame_equal(pd.concat(streamed[frequency]), batch.bars(frequency))
+
+
+def test_roll_up_ohlcv_candles():
+    index = pd.date_range('2023-01-02', periods=10, freq='1min', tz='UTC', name='ts_event')
+    candles = pd.DataFrame({
+        'open': np.arange(10.0),
+        'high': np.arange(10.0) + 2,
+        'low': np.arange(10.0) - 1,
+        'close': np.arange(10.0) + 1,
+        'volume': np.ones(10, dtype=np.int64),
+    }, index=index)
+
+    rolled = roll_up(candles, '5min')
+    assert list(rolled.index) == [index[0], index[5]]
+    assert rolled['open'].tolist() == [0.0, 5.0]
+    assert rolled['high'].tolist() == [6.0, 11.0]
+    assert rolled['low'].tolist() == [-1.0, 4.0]
+    assert rolled['close'].tolist() == [5.0, 10.0]
+    assert rolled['volume'].tolist() == [5, 5]
+
+
+def test_save_and_load(tmp_path):
+    pyramid = BarPyramid.from_trades(make_trades(5000, seed=5)).build()
+    pyramid.save(tmp_path)
+
+    assert BarPyramid.exists(tmp_path)
+    loaded = BarPyramid.load(tmp_path)
+    for frequency in ('1s', '1min', '1h'):
+        pd.testing.assert_frame_equal(loaded.bars(frequency), pyramid.bars(frequency))
+
+    with pytest.raises(ValueError):
+        pyramid.bars('500ms')
@@ -0,0 +1,62 @@
+"""
+Tests for the memory-mapped bar store
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from bar_store import BAR_STORE_COLUMNS, BarStore, BarStoreWriter, write_bar_store
+from test_volume_calculator import make_trades
+from volume_calculator import VolumeCalculator
+
+
+@pytest.mark.parametrize('tz', ['America/New_York', None])
+def test_round_trip(tmp_path, tz):
+    bars = VolumeCalculator.process_trades_to_bars(make_trades(5000, seed=6, tz=tz), frequency='1min')
+    store = write_bar_store(bars, str(tmp_path / 'bars'))
+
+    assert len(store) == len(bars)
+    pd.testing.assert_index_equal(store.index(), bars.index.as_unit('ns'), exact=False)
+
+    frame = store.to_frame()
+    for column in frame.columns:
+        np.testing.assert_array_equal(frame[column].to_numpy(), bars[column].to_numpy(dtype=float))
+
+
+def test_columns_are_read_only_memory_maps(tmp_path):
+    bars = VolumeCalculator.process_trades_to_bars(make_trades(1000, seed=7), frequency='1min')
+    write_bar_store(bars, str(tmp_path / 'bars'))
+
+    store = BarStore(str(tmp_path / 'bars'))
+    for name, dtype in BAR_STORE_COLUMNS.items():
+        column = store.column(name)
+        assert isinstance(column, np.memmap)
+        assert column.dtype == dtype
+        assert not column.flags.writeable
+
+    with pytest.raises(KeyError):
+        store.column('signal')
+
+
+def test_rewrite_replaces_store(tmp_path):
+    directory = str(tmp_path / 'bars')
+    trades = make_trades(2000, seed=8)
+    write_bar_store(VolumeCalculator.process_trades_to_bars(trades, frequency='1min'), directory)
+    hourly = VolumeCalculator.process_trades_to_bars(trades, frequency='1h')
+
+    assert len(write_bar_store(hourly, directory)) == len(hourly)
+    assert len(BarStore(directory)) == len(hourly)
+
+
+def test_writer_appends_batches(tmp_path):
+    bars = VolumeCalculator.process_trades_to_bars(make_trades(5000, seed=9, tz='America/New_York'), frequency='1min')
+    writer = BarStoreWriter(str(tmp_path / 'bars'))
+    for start in range(0, len(bars), 17):
+        writer.append(bars.iloc[start:start + 17])
+    store = writer.close()
+
+    whole = write_bar_store(bars, str(tmp_path / 'whole'))
+    assert len(store) == len(bars)
+    assert store.meta == whole.meta
+    pd.testing.assert_frame_equal(store.to_frame(), whole.to_frame())
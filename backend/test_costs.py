@@ -0,0 +1,61 @@
+"""
+Tests for the transaction cost model
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from costs import CostModel
+from main import VolumeCumulativeDeltaBacktest
+
+
+def run(close, signal, direction='long'):
+    data = pd.DataFrame({'close': close, 'signal': signal},
+                        index=pd.date_range('2023-01-02', periods=len(close), freq='1h'))
+    backtest = VolumeCumulativeDeltaBacktest(initial_capital=100000)
+    backtest.backtest(data, position_size=1.0, engine='vectorized', direction=direction)
+    return backtest
+
+
+def test_costs_per_trade():
+    # Long 2000.04 -> 2010.02, then short 2010.02 -> 2005.00 (GC: $100 per point, 0.10 tick)
+    backtest = run([2000.0, 2000.04, 2010.02, 2005.0], [0, 1, -1, 1], direction='long_short')
+    model = CostModel.for_symbol('GC.c.0', commission=2.5, slippage_ticks=1)
+    trades = model.apply(backtest.trades, backtest.positions)
+
+    contracts = [p['size'] / 100 for p in backtest.positions][:2]
+    np.testing.assert_allclose(trades.column('contracts'), contracts)
+    np.testing.assert_allclose(trades.column('entry_price'), [2000.1, 2009.9])
+    np.testing.assert_allclose(trades.column('exit_price'), [2009.9, 2005.1])
+    np.testing.assert_allclose(trades.column('gross_pnl'), np.multiply([10.0, 5.0], contracts) * 100)
+    np.testing.assert_allclose(trades.column('commission'), np.multiply(contracts, 5.0))
+    np.testing.assert_allclose(trades.column('slippage'), np.multiply(contracts, 0.2 * 100))
+    np.testing.assert_allclose(trades.column('pnl'), np.multiply([9.8, 4.8], contracts) * 100 - np.multiply(contracts, 5.0))
+
+    whole = CostModel.for_symbol('GCZ3', whole_contracts=True).apply(backtest.trades, backtest.positions)
+    np.testing.assert_array_equal(whole.column('contracts'), np.floor(contracts))
+
+
+def test_metrics_net_of_costs():
+    rng = np.random.default_rng(3)
+    n = 5000
+    backtest = run(2000 + rng.normal(0, 1, n).cumsum(), rng.choice([-1, 0, 1], n, p=[0.1, 0.6, 0.3]))
+
+    assert backtest.get_performance_metrics(CostModel()) == {
+        **backtest.get_performance_metrics(), 'total_costs': 0.0}
+
+    model = CostModel(commission=1.0, slippage_ticks=2, tick_size=0.1, multiplier=100)
+    trades = backtest.cost_trades(model)
+    metrics = backtest.get_performance_metrics(model)
+    costs = trades.column('commission').sum() + trades.column('slippage').sum()
+    assert metrics['total_costs'] == pytest.approx(costs, abs=0.01)
+    assert metrics['final_capital'] == pytest.approx(100000 + trades.column('pnl').sum(), abs=0.01)
+    assert metrics['final_capital'] < backtest.get_performance_metrics()['final_capital']
+
+
+def test_unknown_symbol():
+    with pytest.raises(ValueError):
+        CostModel.for_symbol('ZZZ.FUT')
+    assert CostModel.for_symbol('MESZ3').multiplier == 5
+    assert CostModel.for_symbol('ES.FUT').multiplier == 50
@@ -0,0 +1,191 @@
+"""
+Tests for incremental and chunked fetching into the partitioned data store
+Uses a local stub in place of db.Historical, so no API key is needed
+"""
+
+import threading
+
+import numpy as np
+import pandas as pd
+
+from databento_fetcher import DatabentoFetcher
+
+
+class StubStore:
+    """Stands in for the DBNStore returned by timeseries.get_range"""
+
+    def __init__(self, df):
+        self.df = df
+
+    def to_df(self):
+        return self.df
+
+
+class StubTimeseries:
+    def __init__(self, failures=None, empty=False):
+        """
+        Args:
+            failures: Optional {start date: number of failing attempts} to
+                      simulate transient or permanent request errors
+            empty: Return no records (a weekend or holiday)
+        """
+        self.calls = []
+        self.failures = dict(failures or {})
+        self.empty = empty
+        self.lock = threading.Lock()
+
+    def get_range(self, dataset, symbols, schema, start, end, stype_in):
+        with self.lock:
+            key = pd.Timestamp(start).strftime('%Y-%m-%d')
+            if self.failures.get(key, 0) > 0:
+                self.failures[key] -= 1
+                raise ConnectionError(f"simulated failure for {key}")
+            self.calls.append((pd.Timestamp(start, tz='UTC'), pd.Timestamp(end, tz='UTC')))
+
+        # One trade every 30 minutes, priced from the timestamp so that
+        # overlapping requests return identical records
+        index = pd.date_range(pd.Timestamp(start, tz='UTC'), pd.Timestamp(end, tz='UTC'),
+                              freq='30min', inclusive='left', name='ts_recv')
+        if self.empty:
+            index = index[:0]
+        minutes = index.as_unit('ns').asi8 // 60_000_000_000
+        return StubStore(pd.DataFrame({
+            'price': 1900 + (minutes % 97) * 0.1,
+            'size': (minutes % 5 + 1).astype(np.int64),
+            'side': np.where(minutes % 2 == 0, 'B', 'A'),
+        }, index=index))
+
+
+class StubHistorical:
+    def __init__(self, failures=None, empty=False):
+        self.timeseries = StubTimeseries(failures, empty)
+
+
+def make_fetcher(tmp_path, failures=None, empty=False):
+    return DatabentoFetcher(client=StubHistorical(failures, empty), data_dir=str(tmp_path))
+
+
+def test_fetches_only_missing_days(tmp_path):
+    fetcher = make_fetcher(tmp_path)
+    calls = fetcher.client.timeseries.calls
+
+    first = fetcher.fetch_missing(['GC.c.0'], '2023-01-02', '2023-01-09')
+    assert calls == [(pd.Timestamp('2023-01-02', tz='UTC'), pd.Timestamp('2023-01-09', tz='UTC'))]
+    assert len(first) == 7 * 48
+
+    # Window shifted by one day: only the new day is downloaded
+    shifted = fetcher.fetch_missing(['GC.c.0'], '2023-01-03', '2023-01-10')
+    assert calls[1:] == [(pd.Timestamp('2023-01-09', tz='UTC'), pd.Timestamp('2023-01-10', tz='UTC'))]
+    assert len(shifted) == 7 * 48
+    assert shifted.index.min() == pd.Timestamp('2023-01-03', tz='UTC')
+
+    # Fully held window: no request at all
+    fetcher.fetch_missing(['GC.c.0'], '2023-01-04', '2023-01-06')
+    assert len(calls) == 2
+
+
+def test_fills_gaps_between_held_ranges(tmp_path):
+    fetcher = make_fetcher(tmp_path)
+    calls = fetcher.client.timeseries.calls
+
+    fetcher.fetch_missing(['GC.c.0'], '2023-01-02', '2023-01-04')
+    fetcher.fetch_missing(['GC.c.0'], '2023-01-06', '2023-01-08')
+    calls.clear()
+
+    df = fetcher.fetch_missing(['GC.c.0'], '2023-01-01', '2023-01-09')
+
+    assert sorted(calls) == [
+        (pd.Timestamp('2023-01-01', tz='UTC'), pd.Timestamp('2023-01-02', tz='UTC')),
+        (pd.Timestamp('2023-01-04', tz='UTC'), pd.Timestamp('2023-01-06', tz='UTC')),
+        (pd.Timestamp('2023-01-08', tz='UTC'), pd.Timestamp('2023-01-09', tz='UTC')),
+    ]
+    assert fetcher.lake.held_ranges('GC.c.0', 'trades') == [
+        (pd.Timestamp('2023-01-01', tz='UTC'), pd.Timestamp('2023-01-09', tz='UTC'))
+    ]
+    assert len(df) == 8 * 48
+    assert df.index.is_monotonic_increasing
+
+
+def test_partial_day_is_merged_into_partition(tmp_path):
+    fetcher = make_fetcher(tmp_path)
+
+    fetcher.fetch_missing(['GC.c.0'], '2023-01-02', '2023-01-02 12:00')
+    assert not fetcher.lake.covers('GC.c.0', 'trades', '2023-01-02', '2023-01-03')
+
+    df = fetcher.fetch_missing(['GC.c.0'], '2023-01-02', '2023-01-03')
+
+    assert fetcher.client.timeseries.calls[-1][0] == pd.Timestamp('2023-01-02 12:00', tz='UTC')
+    assert len(df) == 48
+    assert not df.index.duplicated().any()
+
+
+def test_download_splits_range_into_chunks(tmp_path):
+    fetcher = make_fetcher(tmp_path)
+
+    summary = fetcher.download(['GC.c.0'], '2023-01-15', '2023-04-10', chunk='month', max_workers=3)
+
+    assert sorted(fetcher.client.timeseries.calls) == [
+        (pd.Timestamp('2023-01-15', tz='UTC'), pd.Timestamp('2023-02-01', tz='UTC')),
+        (pd.Timestamp('2023-02-01', tz='UTC'), pd.Timestamp('2023-03-01', tz='UTC')),
+        (pd.Timestamp('2023-03-01', tz='UTC'), pd.Timestamp('2023-04-01', tz='UTC')),
+        (pd.Timestamp('2023-04-01', tz='UTC'), pd.Timestamp('2023-04-10', tz='UTC')),
+    ]
+    assert summary == {'chunks': 4, 'records': 85 * 48}
+    assert fetcher.lake.covers('GC.c.0', 'trades', '2023-01-15', '2023-04-10')
+
+
+def test_download_retries_failed_chunks(tmp_path):
+    fetcher = make_fetcher(tmp_path, failures={'2023-01-03': 2})
+
+    fetcher.download(['GC.c.0'], '2023-01-02', '2023-01-05', chunk='day', retries=3, backoff=0)
+
+    assert len(fetcher.client.timeseries.calls) == 3
+    assert fetcher.lake.covers('GC.c.0', 'trades', '2023-01-02', '2023-01-05')
+
+
+def test_download_resumes_after_failure(tmp_path):
+    fetcher = make_fetcher(tmp_path, failures={'2023-01-03': 5})
+
+    try:
+        fetcher.download(['GC.c.0'], '2023-01-02', '2023-01-06', chunk='day', retries=2, backoff=0)
+    except RuntimeError:
+        pass
+    else:
+        raise AssertionError("Expected RuntimeError for the failing chunk")
+
+    # Every other chunk was saved, only the failed day is still missing
+    assert fetcher.lake.missing_ranges('GC.c.0', 'trades', '2023-01-02', '2023-01-06') == [
+        (pd.Timestamp('2023-01-03', tz='UTC'), pd.Timestamp('2023-01-04', tz='UTC'))
+    ]
+
+    resumed = make_fetcher(tmp_path)
+    df = resumed.fetch_missing(['GC.c.0'], '2023-01-02', '2023-01-06', chunk='day')
+
+    assert resumed.client.timeseries.calls == [
+        (pd.Timestamp('2023-01-03', tz='UTC'), pd.Timestamp('2023-01-04', tz='UTC'))
+    ]
+    assert len(df) == 4 * 48
+
+
+if __name__ == "__main__":
+    import tempfile
+    from pathlib import Path
+
+    for test in [test_fetches_only_missing_days, test_fills_gaps_between_held_ranges,
+                 test_partial_day_is_merged_into_partition, test_download_splits_range_into_chunks,
+                 test_download_retries_failed_chunks, test_download_resumes_after_failure]:
+        with tempfile.TemporaryDirectory() as tmp:
+            test(Path(tmp))
+    print("Fetcher tests passed")
+
+
+def test_list_available_data_with_empty_range(tmp_path, capsys):
+    fetcher = make_fetcher(tmp_path, empty=True)
+    result = fetcher.download(['GC.c.0'], '2024-01-06', '2024-01-08', chunk='day')
+
+    assert result['records'] == 0
+    assert fetcher.lake.days('GC.c.0', 'trades') == []
+    assert fetcher.lake.covers('GC.c.0', 'trades', '2024-01-06', '2024-01-08')
+
+    assert fetcher.list_available_data() == []
+    assert 'trades/GC.c.0: no records, 2024-01-06 to 2024-01-08 fetched' in capsys.readouterr().out
@@ -0,0 +1,115 @@
+"""
+Tests for memory-mapped DBN trades reading
+Builds small DBN files with databento_dbn and compares against DBNStore.to_df
+"""
+
+import databento as db
+import databento_dbn as dbn
+import numpy as np
+import pandas as pd
+import pytest
+
+from databento_fetcher import DatabentoFetcher
+from dbn_reader import DbnTradesReader
+from volume_calculator import VolumeCalculator
+
+
+START_NS = pd.Timestamp('2023-01-02 17:03:05', tz='UTC').value
+
+
+def make_dbn(n=3000, seed=0):
+    rng = np.random.default_rng(seed)
+    ts = START_NS + np.sort(rng.integers(0, 86400 * 10**9, n))
+    prices = 1_900_000_000_000 + rng.integers(-50, 50, n).cumsum() * 100_000_000
+    sides = rng.choice([dbn.Side.ASK, dbn.Side.BID, dbn.Side.NONE], n)
+
+    metadata = dbn.Metadata(
+        dataset='GLBX.MDP3',
+        start=int(ts[0]),
+        end=int(ts[-1]) + 1,
+        stype_in=dbn.SType.CONTINUOUS,
+        stype_out=dbn.SType.INSTRUMENT_ID,
+        schema=dbn.Schema.TRADES,
+        symbols=['GC.c.0'],
+        partial=[],
+        not_found=[],
+        mappings=[],
+    )
+    records = b''.join(
+        bytes(dbn.TradeMsg(
+            publisher_id=1,
+            instrument_id=42,
+            ts_event=int(t) - 1000,
+            price=int(p),
+            size=int(rng.integers(1, 20)),
+            action=dbn.Action.TRADE,
+            side=s,
+            depth=0,
+            flags=0,
+            ts_recv=int(t),
+            ts_in_delta=10,
+            sequence=i,
+        ))
+        for i, (t, p, s) in enumerate(zip(ts, prices, sides))
+    )
+    return metadata.encode() + records
+
+
+@pytest.fixture
+def dbn_file(tmp_path):
+    path = tmp_path / 'trades.dbn'
+    path.write_bytes(make_dbn())
+    return str(path)
+
+
+def test_reader_matches_to_df(dbn_file):
+    reader = DbnTradesReader(dbn_file)
+    df = db.DBNStore.from_file(dbn_file).to_df()
+
+    assert len(reader) == len(df)
+    np.testing.assert_array_equal(reader.ts_recv.astype(np.int64), df.index.as_unit('ns').asi8)
+    np.testing.assert_array_equal(reader.price, df['price'].to_numpy())
+    np.testing.assert_array_equal(reader.size, df['size'].to_numpy())
+    np.testing.assert_array_equal(reader.side.astype(str), df['side'].astype(str).to_numpy())
+
+
+def test_dbn_to_bars_matches_dataframe_pipeline(dbn_file):
+    df = db.DBNStore.from_file(dbn_file).to_df()
+    expected = VolumeCalculator.process_trades_to_bars(df, '5min')
+
+    # Small slices so bars span slice boundaries
+    bars = VolumeCalculator.dbn_to_bars(dbn_file, '5min', chunksize=700)
+
+    pd.testing.assert_frame_equal(bars, expected, check_freq=False, check_dtype=False)
+
+
+def test_rejects_non_dbn(tmp_path):
+    path = tmp_path / 'trades.csv'
+    path.write_text('ts_recv,price\n')
+    with pytest.raises(ValueError):
+        DbnTradesReader(str(path))
+
+
+class DbnTimeseries:
+    def __init__(self, data):
+        self.data = data
+
+    def get_range(self, dataset, symbols, schema, start, end, stype_in):
+        return db.DBNStore.from_bytes(self.data)
+
+
+class DbnHistorical:
+    def __init__(self, data):
+        self.timeseries = DbnTimeseries(data)
+
+
+def test_fetcher_keeps_raw_dbn(tmp_path):
+    data = make_dbn()
+    fetcher = DatabentoFetcher(client=DbnHistorical(data), data_dir=str(tmp_path), raw_dbn=True)
+    fetcher.download(['GC.c.0'], '2023-01-02', '2023-01-04', chunk='day', max_workers=1)
+
+    files = fetcher.raw_dbn_files('GC.c.0')
+    assert len(files) == 2
+    reader = DbnTradesReader(files[0])
+    assert len(reader) == 3000
+    np.testing.assert_array_equal(reader.records, DbnTradesReader(files[1]).records)
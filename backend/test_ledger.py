@@ -0,0 +1,61 @@
+"""
+Tests for the array-backed ledgers
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ledger import EQUITY_FIELDS, TRADE_FIELDS, Ledger
+from main import VolumeCumulativeDeltaBacktest, generate_sample_data
+
+
+def test_rows_behave_like_dicts():
+    ledger = Ledger(TRADE_FIELDS, capacity=2)
+    times = pd.date_range('2023-01-02', periods=5, freq='1h', tz='UTC')
+    rows = [
+        {'entry_price': 100.0 + i, 'exit_price': 101.0 + i, 'pnl': 1.0, 'return': 1.0,
+         'exit_time': times[i], 'exit_reason': 'signal'}
+        for i in range(5)
+    ]
+    for row in rows:
+        ledger.append(row)
+
+    assert len(ledger) == 5
+    assert ledger == rows
+    assert ledger[1] == rows[1]
+    assert ledger[-1]['exit_time'] == times[-1]
+    assert ledger[:2] == rows[:2]
+    assert [row['entry_price'] for row in ledger] == [100.0, 101.0, 102.0, 103.0, 104.0]
+    with pytest.raises(IndexError):
+        ledger[5]
+
+
+def test_append_columns_and_views():
+    ledger = Ledger(EQUITY_FIELDS, capacity=3)
+    times = pd.date_range('2023-01-02', periods=10, freq='1min', tz='America/New_York')
+    ledger.append_columns({'time': times[:4], 'equity': np.arange(4.0)})
+    ledger.append_columns({'time': times[4:], 'equity': np.arange(4.0, 10.0)})
+
+    frame = ledger.to_frame()
+    assert list(frame.columns) == ['time', 'equity']
+    assert (frame['time'] == times).all()
+    np.testing.assert_array_equal(ledger.column('equity'), np.arange(10.0))
+
+    table = ledger.to_arrow()
+    assert table.num_rows == 10
+    assert table.column('time').type.tz == 'America/New_York'
+    assert table.column('equity').to_pylist() == list(np.arange(10.0))
+
+
+def test_backtest_ledgers_match_records():
+    backtest = VolumeCumulativeDeltaBacktest()
+    data = backtest.generate_signals(
+        backtest.calculate_cumulative_delta(generate_sample_data(days=30)), threshold=500
+    )
+    backtest.backtest(data, engine='vectorized')
+
+    trades = backtest.trades.to_frame()
+    assert len(trades) == len(backtest.trades) > 0
+    assert trades['pnl'].tolist() == [trade['pnl'] for trade in backtest.trades]
+    assert len(backtest.equity_curve) == len(data) - 1
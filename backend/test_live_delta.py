@@ -0,0 +1,60 @@
+"""
+Tests for the live cumulative delta engine
+Replays a saved trades file and compares with the batch pipeline
+"""
+
+import pytest
+
+from live_delta import LiveDeltaEngine
+from main import VolumeCumulativeDeltaBacktest
+from storage import ParquetStorage
+from test_volume_calculator import make_trades
+from volume_calculator import VolumeCalculator
+
+
+def batch_bars(trades, frequency, threshold):
+    bars = VolumeCalculator.process_trades_to_bars(trades, frequency)
+    return VolumeCumulativeDeltaBacktest().generate_signals(bars, threshold=threshold)
+
+
+def assert_same_bars(live, expected):
+    assert list(live.index) == list(expected.index)
+    for column in ['close', 'buy_volume', 'sell_volume', 'total_volume',
+                   'delta', 'cumulative_delta', 'signal']:
+        assert live[column].tolist() == expected[column].tolist(), column
+
+
+def test_replay_of_saved_file_matches_batch(tmp_path):
+    trades = make_trades(n=20000, seed=4)
+    path = str(tmp_path / 'trades.parquet')
+    storage = ParquetStorage()
+    storage.write(trades, path)
+
+    engine = LiveDeltaEngine('5min', threshold=200)
+    bars = LiveDeltaEngine.bars_to_frame(engine.replay(storage.iter_read(path, chunksize=3000)))
+
+    assert_same_bars(bars, batch_bars(trades, '5min', 200))
+    assert engine.trades_seen == len(trades)
+
+
+def test_trade_by_trade_emits_on_close():
+    trades = make_trades(n=3000, seed=9)
+    closed = []
+    engine = LiveDeltaEngine('1min', threshold=50, on_bar=closed.append)
+
+    emitted = 0
+    for time, row in zip(trades.index, trades.itertuples()):
+        bar = engine.on_trade(time, row.price, row.size, row.side)
+        emitted += bar is not None
+        # A bar is emitted only once a later bar has started
+        assert len(closed) == emitted
+    engine.flush()
+
+    assert_same_bars(LiveDeltaEngine.bars_to_frame(closed), batch_bars(trades, '1min', 50))
+
+
+def test_out_of_order_trade_rejected():
+    engine = LiveDeltaEngine('1min')
+    engine.on_trade(2_000_000_000_000, 100.0, 1, 'B')
+    with pytest.raises(ValueError):
+        engine.on_trade(1_000_000_000_000, 100.0, 1, 'A')
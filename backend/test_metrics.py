@@ -0,0 +1,99 @@
+"""
+Tests for the risk metrics
+Compares the array passes with loops and pandas rolling windows
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import metrics
+from main import VolumeCumulativeDeltaBacktest, generate_sample_data
+
+
+def make_equity(n=3000, runs=4, seed=0):
+    rng = np.random.default_rng(seed)
+    return 10000 * np.cumprod(1 + rng.normal(0.0002, 0.01, (n, runs)), axis=0)
+
+
+def loop_drawdown(equity):
+    peak, deepest, since_peak, longest = equity[0], 0.0, 0, 0
+    for value in equity:
+        if value >= peak:
+            peak, since_peak = value, 0
+        else:
+            since_peak += 1
+        deepest = min(deepest, value / peak - 1)
+        longest = max(longest, since_peak)
+    return deepest, longest
+
+
+def test_drawdown_matches_loop():
+    equity = make_equity()
+    for column in range(equity.shape[1]):
+        deepest, longest = loop_drawdown(equity[:, column])
+        assert metrics.max_drawdown(equity[:, column]) == pytest.approx(deepest)
+        assert metrics.drawdown_duration(equity[:, column]) == longest
+    assert metrics.drawdown_duration([1.0, 2.0, 3.0]) == 0
+    assert metrics.max_drawdown([100.0, 80.0, 120.0, 90.0]) == pytest.approx(-0.25)
+
+
+def test_ratios_match_pandas():
+    equity = make_equity(runs=1)[:, 0]
+    bar_returns = pd.Series(equity).pct_change().dropna()
+
+    assert metrics.sharpe(equity, 252) == pytest.approx(bar_returns.mean() / bar_returns.std() * np.sqrt(252))
+    downside = np.sqrt((bar_returns.clip(upper=0) ** 2).mean())
+    assert metrics.sortino(equity, 252) == pytest.approx(bar_returns.mean() / downside * np.sqrt(252))
+
+    years = (len(equity) - 1) / 252
+    cagr = (equity[-1] / equity[0]) ** (1 / years) - 1
+    assert metrics.calmar(equity, 252) == pytest.approx(cagr / -metrics.max_drawdown(equity))
+    assert metrics.sharpe(np.full(10, 100.0)) == 0
+
+
+def test_columns_score_like_single_runs():
+    equity = make_equity(runs=6, seed=1)
+    held = equity[1:] > equity[:-1]
+    notional = np.arange(6) * 1e5
+    batch = metrics.risk_metrics(equity, held, notional, 1000)
+    for column in range(6):
+        single = metrics.risk_metrics(equity[:, column], held[:, column], notional[column], 1000)
+        assert {name: values[column] for name, values in batch.items()} == single
+
+
+def test_rolling_metrics_match_pandas():
+    equity = make_equity(n=500, runs=3, seed=2)
+    frame = pd.DataFrame(equity)
+
+    for window in [1, 7, 50, 499, 500, 800]:
+        np.testing.assert_allclose(metrics.rolling_max(equity, window),
+                                   frame.rolling(window, min_periods=1).max())
+
+    window = 30
+    bar_returns = frame.pct_change().iloc[1:]
+    rolling = bar_returns.rolling(window)
+    np.testing.assert_allclose(metrics.rolling_sharpe(equity, window, 252),
+                               rolling.mean() / rolling.std() * np.sqrt(252), rtol=1e-6)
+    np.testing.assert_allclose(metrics.rolling_volatility(equity, window, 252),
+                               rolling.std() * np.sqrt(252), rtol=1e-6)
+    np.testing.assert_allclose(metrics.rolling_drawdown(equity, window),
+                               frame / frame.rolling(window, min_periods=1).max() - 1)
+
+
+def test_backtest_risk_metrics():
+    np.random.seed(4)
+    backtest = VolumeCumulativeDeltaBacktest(initial_capital=10000)
+    data = backtest.generate_signals(backtest.calculate_cumulative_delta(generate_sample_data(days=60)), 300)
+    backtest.backtest(data, position_size=0.5, engine='vectorized')
+    result = backtest.get_performance_metrics()
+
+    # Exposure from the ledgers equals the engine's own position state
+    signal = data['signal'].to_numpy()
+    held = [False]
+    for i in range(1, len(signal)):
+        entering = signal[i] == 1 and signal[i - 1] != 1
+        held.append(not (signal[i] == -1) and (held[-1] or entering))
+    assert result['exposure'] == round(np.mean(held[1:]) * 100, 2)
+    assert result['max_drawdown'] <= 0
+    assert result['turnover'] > 0
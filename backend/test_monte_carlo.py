@@ -0,0 +1,79 @@
+"""
+Tests for the Monte Carlo robustness engine
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import monte_carlo as monte_carlo_module
+from main import VolumeCumulativeDeltaBacktest
+from monte_carlo import (MONTE_CARLO_METHODS, bar_returns, bootstrap_paths, monte_carlo, path_metrics,
+                         trade_returns)
+
+
+@pytest.fixture(scope='module')
+def backtest():
+    rng = np.random.default_rng(6)
+    n = 5000
+    data = pd.DataFrame({
+        'close': 100 + rng.normal(0, 0.5, n).cumsum(),
+        'signal': rng.choice([-1, 0, 1], n, p=[0.05, 0.9, 0.05]),
+    }, index=pd.date_range('2023-01-02', periods=n, freq='1min'))
+    backtest = VolumeCumulativeDeltaBacktest(initial_capital=10000)
+    backtest.backtest(data, position_size=0.5, engine='vectorized')
+    return backtest
+
+
+def test_actual_sequence_reproduces_backtest(backtest):
+    trades = path_metrics(trade_returns(backtest)[:, None], backtest.initial_capital)
+    assert trades['final_capital'][0] == pytest.approx(backtest.capital)
+
+    bars = path_metrics(bar_returns(backtest)[:, None], backtest.initial_capital, method='bars')
+    assert bars['final_equity'][0] == pytest.approx(backtest.equity_curve[-1]['equity'])
+
+
+@pytest.mark.parametrize('method', MONTE_CARLO_METHODS)
+def test_observed_matches_shared_performance_metrics(backtest, method):
+    metrics = backtest.get_performance_metrics()
+    observed = monte_carlo(backtest, n_paths=10, method=method, seed=1, max_workers=1)['observed']
+
+    shared = set(observed) & set(metrics)
+    assert shared == {'trades': {'final_capital', 'total_return', 'profit_factor'},
+                      'bars': {'max_drawdown'}}[method]
+    for name in shared:
+        assert observed[name] == pytest.approx(metrics[name]), name
+
+
+def test_bootstrap_blocks():
+    returns = np.arange(10) / 100
+    paths = bootstrap_paths(returns, 50, block_size=4, rng=np.random.default_rng(0))
+    assert paths.shape == (10, 50)
+    # Within a block, returns follow each other as in the original (wrapping around)
+    steps = np.round(np.diff(paths[:4], axis=0) * 100) % 10
+    assert (steps == 1).all()
+
+    # Whole-sequence blocks are rotations, which compound to the same final capital
+    rotations = path_metrics(bootstrap_paths(returns, 20, block_size=10), 1000)
+    np.testing.assert_allclose(rotations['final_capital'], 1000 * np.prod(1 + returns))
+
+
+def test_monte_carlo_report(backtest, monkeypatch):
+    # Small batches, so the pool gets several
+    monkeypatch.setattr(monte_carlo_module, 'PATH_BLOCK_CELLS', 20000)
+    inline = monte_carlo(backtest, n_paths=3000, seed=3, max_workers=1)
+    pooled = monte_carlo(backtest, n_paths=3000, seed=3, max_workers=2)
+    pd.testing.assert_frame_equal(inline['paths'], pooled['paths'])
+
+    report = inline['percentiles']
+    assert list(report.index) == [5, 25, 50, 75, 95]
+    assert report['final_capital'].is_monotonic_increasing
+    assert report['trade_close_drawdown'].is_monotonic_increasing
+    assert inline['observed']['final_capital'] == round(backtest.capital, 2)
+
+    bars = monte_carlo(backtest, n_paths=500, method='bars', seed=3, max_workers=1)
+    assert len(bars['paths']) == 500
+    assert list(bars['paths'].columns) == ['final_equity', 'equity_return', 'max_drawdown', 'bar_profit_factor']
+
+    with pytest.raises(ValueError):
+        monte_carlo(backtest, method='ticks')
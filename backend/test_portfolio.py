@@ -0,0 +1,91 @@
+"""
+Tests for the multi-symbol portfolio backtest
+Each symbol's sleeve is compared with a single-symbol backtest of its bars
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from main import VolumeCumulativeDeltaBacktest, generate_sample_data
+from portfolio import PortfolioBacktest, align_bars
+
+
+def make_bars(days, seed, start=None, drop=0.0):
+    np.random.seed(seed)
+    bars = VolumeCumulativeDeltaBacktest().calculate_cumulative_delta(generate_sample_data(days=days))
+    if start is not None:
+        bars.index = pd.date_range(start, periods=len(bars), freq='1h')
+    if drop:
+        # Symbols do not trade on every bar
+        keep = np.random.default_rng(seed).random(len(bars)) >= drop
+        bars = bars[keep]
+        bars['cumulative_delta'] = bars['delta'].cumsum()
+    return bars
+
+
+def single_run(bars, capital, threshold, position_size):
+    backtest = VolumeCumulativeDeltaBacktest(initial_capital=capital)
+    data = backtest.generate_signals(bars.copy(), threshold=threshold)
+    backtest.backtest(data, position_size=position_size, engine='vectorized')
+    return backtest
+
+
+@pytest.fixture
+def universe():
+    return {
+        'GC': make_bars(60, seed=1),
+        'ES': make_bars(50, seed=2, start='2023-01-05', drop=0.2),
+        '6E': make_bars(40, seed=3, start='2023-01-10 07:00', drop=0.4),
+    }
+
+
+def test_sleeves_match_single_symbol_backtests(universe):
+    thresholds = {'GC': 500, 'ES': 800, '6E': 300}
+    weights = {'GC': 2, 'ES': 1, '6E': 1}
+    portfolio = PortfolioBacktest(initial_capital=40000, weights=weights)
+    results = portfolio.run(universe, threshold=thresholds, position_size=0.2)
+
+    for symbol, bars in universe.items():
+        capital = 40000 * weights[symbol] / 4
+        expected = single_run(bars, capital, thresholds[symbol], 0.2)
+        sleeve = portfolio.backtests[symbol]
+
+        assert sleeve.positions == expected.positions
+        assert sleeve.trades == expected.trades
+        assert results['metrics'].loc[symbol].to_dict() == expected.get_performance_metrics()
+
+        # Equity on the symbol's own bars (from its second bar) is the single-run curve
+        curve = results['equity_curve'][symbol].reindex(bars.index[1:])
+        np.testing.assert_array_equal(curve.to_numpy(), expected.equity_curve.column('equity'))
+
+
+def test_portfolio_totals(universe):
+    portfolio = PortfolioBacktest(initial_capital=30000)
+    results = portfolio.run(universe, threshold=500)
+
+    equity = results['equity_curve']
+    np.testing.assert_allclose(equity['total'], equity[list(universe)].sum(axis=1))
+    # A sleeve holds its capital until its symbol starts trading
+    assert (equity['6E'][equity.index <= universe['6E'].index[0]] == 10000).all()
+
+    metrics = results['metrics']
+    assert metrics.loc['portfolio', 'total_trades'] == len(results['trades'])
+    assert metrics.loc['portfolio', 'final_capital'] == pytest.approx(
+        sum(backtest.capital for backtest in portfolio.backtests.values()), abs=0.01)
+    assert results['trades']['exit_time'].is_monotonic_increasing
+
+
+def test_align_bars_carries_values_forward():
+    a = pd.DataFrame({'close': [1.0, 2.0, 3.0], 'cumulative_delta': [10, 20, 30]},
+                     index=pd.date_range('2023-01-02', periods=3, freq='1min'))
+    b = pd.DataFrame({'close': [5.0, 6.0], 'cumulative_delta': [-1, -2]},
+                     index=a.index[[1, 2]] + pd.Timedelta('30s'))
+
+    index, arrays = align_bars({'a': a, 'b': b})
+    assert len(index) == 5
+    np.testing.assert_array_equal(arrays['close'][:, 0], [1, 2, 2, 3, 3])
+    np.testing.assert_array_equal(arrays['close'][:, 1], [np.nan, np.nan, 5, 5, 6])
+
+    with pytest.raises(ValueError):
+        align_bars({'a': pd.concat([a, a])})
@@ -0,0 +1,83 @@
+"""
+Tests for the asyncio tick replay
+Checks that replayed strategies trade like batch backtests
+"""
+
+import numpy as np
+import pandas as pd
+
+from main import VolumeCumulativeDeltaBacktest
+from replay import LiveStrategy, make_strategies, run_replay
+from test_volume_calculator import make_trades
+from volume_calculator import VolumeCalculator
+
+
+def chunks(df, size):
+    for start in range(0, len(df), size):
+        yield df.iloc[start:start + size]
+
+
+def test_strategies_match_batch_backtests():
+    trades = make_trades(n=20000, seed=2)
+    thresholds = [50, 200, 800]
+    strategies = make_strategies(thresholds, position_size=0.2, frequency='5min')
+
+    report = run_replay(chunks(trades, 4000), strategies, batch_size=64)
+
+    assert report['ticks'] == len(trades)
+    assert len(report['strategies']) == len(thresholds)
+    assert (report['strategies']['latency_p50_us'] >= 0).all()
+
+    bars = VolumeCalculator.process_trades_to_bars(trades, '5min')
+    for strategy, threshold in zip(strategies, thresholds):
+        batch = VolumeCumulativeDeltaBacktest()
+        data = batch.generate_signals(bars.copy(), threshold=threshold)
+        batch.backtest(data, position_size=0.2, engine='loop')
+
+        live = strategy.backtest
+        assert live.get_performance_metrics() == batch.get_performance_metrics()
+        assert live.positions == batch.positions
+        assert live.trades == batch.trades
+        np.testing.assert_allclose(live.equity_curve.column('equity'), batch.equity_curve.column('equity'))
+
+
+def test_long_short_strategies_match_batch_backtests():
+    trades = make_trades(n=20000, seed=4)
+    strategies = make_strategies([50, 200], position_size=0.2, frequency='5min', direction='long_short')
+
+    run_replay(chunks(trades, 3000), strategies, batch_size=32)
+
+    bars = VolumeCalculator.process_trades_to_bars(trades, '5min')
+    for strategy in strategies:
+        batch = VolumeCumulativeDeltaBacktest()
+        data = batch.generate_signals(bars.copy(), threshold=strategy.threshold)
+        batch.backtest(data, position_size=0.2, engine='loop', direction='long_short')
+
+        live = strategy.backtest
+        assert 'SHORT' in list(live.positions.column('type'))
+        assert live.positions == batch.positions
+        assert live.trades == batch.trades
+        np.testing.assert_allclose(live.equity_curve.column('equity'), batch.equity_curve.column('equity'))
+
+
+def test_bars_take_the_timezone_of_the_feed():
+    trades = make_trades(n=5000, seed=1, tz='America/New_York')
+    strategy = LiveStrategy(200, frequency='15min')
+
+    run_replay([trades], [strategy])
+
+    bars = VolumeCalculator.process_trades_to_bars(trades, '15min')
+    times = strategy.backtest.equity_curve.column('time')
+    assert str(times[0].tz) == 'America/New_York'
+    assert list(times) == list(bars.index[1:])
+
+
+def test_scaled_speed_follows_market_time():
+    # 40 trades over 2 seconds of market time, replayed at 4x
+    index = pd.date_range('2023-01-02 14:30', periods=40, freq='50ms', tz='UTC', name='ts_recv')
+    trades = pd.DataFrame({'price': 1900.0, 'size': 1, 'side': 'B'}, index=index)
+
+    report = run_replay([trades], make_strategies([10]), speed=4.0)
+
+    assert report['ticks'] == 40
+    assert report['elapsed'] >= 1.95 / 4
@@ -0,0 +1,191 @@
+"""
+Tests for the storage backends
+Round trips through CSV, Parquet and Arrow IPC files
+"""
+
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from storage import STORAGE_FORMATS, PartitionedStore, get_storage, trading_days
+
+
+def make_records(n=1000, tz='UTC'):
+    rng = np.random.default_rng(0)
+    # Crosses the 2023-03-12 DST change in New York
+    index = pd.date_range('2023-03-11 20:00', periods=n, freq='37s', tz=tz, name='ts_recv').as_unit('ns')
+    return pd.DataFrame({
+        'price': np.round(1900 + rng.normal(0, 1, n).cumsum(), 1),
+        'size': rng.integers(1, 10, n),
+        'side': pd.Categorical(rng.choice(['A', 'B', 'N'], n)),
+    }, index=index)
+
+
+@pytest.fixture(params=list(STORAGE_FORMATS))
+def storage(request):
+    return get_storage(request.param)
+
+
+def read_back(storage, df, tmp_path, **kwargs):
+    path = str(tmp_path / f"records{storage.extension}")
+    storage.write(df, path)
+    return path, storage.read(path, **kwargs)
+
+
+@pytest.mark.parametrize('tz', ['UTC', 'America/New_York'])
+def test_round_trip_keeps_timezone_and_side(storage, tmp_path, tz):
+    df = make_records(tz=tz)
+    _, result = read_back(storage, df, tmp_path)
+
+    if storage.name == 'csv':
+        # CSV text keeps each timestamp's UTC offset, not the zone name or the categories
+        times = pd.to_datetime(result.index, utc=True)
+        assert (times == df.index).all()
+        np.testing.assert_array_equal(result['price'], df['price'])
+        np.testing.assert_array_equal(result['side'], df['side'].astype(str))
+    else:
+        pd.testing.assert_frame_equal(result, df, check_freq=False)
+        assert isinstance(result['side'].dtype, pd.CategoricalDtype)
+
+
+def test_naive_index_round_trip(storage, tmp_path):
+    df = make_records().tz_localize(None)
+    _, result = read_back(storage, df, tmp_path)
+    assert result.index.tz is None
+    assert (result.index == df.index).all()
+
+
+def test_column_projection(storage, tmp_path):
+    df = make_records()
+    path, result = read_back(storage, df, tmp_path, columns=['price'])
+    assert list(result.columns) == ['price']
+    assert (pd.DatetimeIndex(result.index) == df.index).all()
+    np.testing.assert_array_equal(result['price'], df['price'])
+
+
+def test_chunked_write_and_read(storage, tmp_path):
+    df = make_records(2500)
+    path = str(tmp_path / f"chunks{storage.extension}")
+    storage.write_chunks((df.iloc[i:i + 700] for i in range(0, len(df), 700)), path)
+
+    chunks = list(storage.iter_read(path, chunksize=400, columns=['price', 'side']))
+    assert all(len(chunk) <= 400 for chunk in chunks)
+    assert sum(len(chunk) for chunk in chunks) == len(df)
+
+    result = pd.concat(chunks)
+    assert list(result.columns) == ['price', 'side']
+    assert (pd.DatetimeIndex(result.index) == df.index).all()
+    np.testing.assert_array_equal(result['price'], df['price'])
+    np.testing.assert_array_equal(result['side'].astype(str), df['side'].astype(str))
+
+
+def test_unknown_format():
+    with pytest.raises(ValueError):
+        get_storage('hdf5')
+
+
+def make_days(days=10, per_day=48):
+    index = pd.date_range('2023-01-01', periods=days * per_day, freq=f'{24 * 60 // per_day}min', tz='UTC').as_unit('ns')
+    return pd.DataFrame({'price': np.arange(len(index), dtype=float), 'size': 1}, index=index)
+
+
+def count_reads(store, monkeypatch):
+    opened = []
+    read = store.storage.read
+
+    def counting_read(path, columns=None):
+        opened.append(path)
+        return read(path, columns=columns)
+
+    monkeypatch.setattr(store.storage, 'read', counting_read)
+    return opened
+
+
+def test_trading_days():
+    assert trading_days('2023-01-01', '2023-01-04') == ['2023-01-01', '2023-01-02', '2023-01-03']
+    assert trading_days('2023-01-01 23:00', '2023-01-02 00:00:01') == ['2023-01-01', '2023-01-02']
+    # New York 19:00 is already the next UTC day
+    assert trading_days(pd.Timestamp('2023-01-01 19:00', tz='America/New_York'), '2023-01-03') == ['2023-01-02']
+    assert trading_days('2023-01-02', '2023-01-02') == []
+
+
+def test_partitions_by_utc_day(tmp_path):
+    store = PartitionedStore(str(tmp_path), storage_format='parquet')
+    records = make_days(10).tz_convert('America/New_York')
+    assert store.write(records, 'GC.c.0', 'trades') == 10
+    assert store.days('GC.c.0', 'trades') == [f'2023-01-{day:02d}' for day in range(1, 11)]
+
+    # Each file holds exactly the records of its UTC day
+    day = store.storage.read(store.partition_path('GC.c.0', 'trades', '2023-01-04'))
+    assert (pd.DatetimeIndex(day.index).tz_convert('UTC').normalize() == pd.Timestamp('2023-01-04', tz='UTC')).all()
+    assert len(day) == 48
+
+
+def test_window_opens_only_overlapping_partitions(tmp_path, monkeypatch):
+    store = PartitionedStore(str(tmp_path), storage_format='parquet')
+    records = make_days(30)
+    store.write(records, 'GC.c.0', 'trades')
+
+    opened = count_reads(store, monkeypatch)
+    start, end = pd.Timestamp('2023-01-10 12:00', tz='UTC'), pd.Timestamp('2023-01-16 12:00', tz='UTC')
+    chunks = list(store.iter_read('GC.c.0', 'trades', start, end, columns=['price']))
+
+    assert len(opened) == 7
+    assert [path.split('/')[-1] for path in opened] == [f'2023-01-{day}.parquet' for day in range(10, 17)]
+    assert len(chunks) == 7
+
+    # Edge days are trimmed to the window
+    result = pd.concat(chunks)
+    expected = records[(records.index >= start) & (records.index < end)]
+    assert (pd.DatetimeIndex(result.index) == expected.index).all()
+    assert list(result.columns) == ['price']
+    assert len(chunks[0]) == 24 and len(chunks[-1]) == 24
+
+
+def test_write_chunks_buffers_by_day(tmp_path, monkeypatch):
+    store = PartitionedStore(str(tmp_path), storage_format='arrow')
+    records = make_days(5)
+
+    written = []
+    write = store.storage.write
+    monkeypatch.setattr(store.storage, 'write', lambda df, path: (written.append(path), write(df, path)))
+
+    # Chunks cut across day boundaries
+    chunks = (records.iloc[i:i + 31] for i in range(0, len(records), 31))
+    assert store.write_chunks(chunks, 'GC.c.0', 'trades') == 5
+
+    # Every day is written once, complete
+    assert sorted(written) == sorted(set(written)) and len(written) == 5
+    for day in store.days('GC.c.0', 'trades'):
+        assert len(store.storage.read(store.partition_path('GC.c.0', 'trades', day))) == 48
+    assert store.covers('GC.c.0', 'trades', '2023-01-01', '2023-01-06')
+    pd.testing.assert_frame_equal(store.read('GC.c.0', 'trades', '2023-01-01', '2023-01-06'),
+                                  records, check_freq=False, check_dtype=False)
+
+
+def test_concurrent_writes_to_one_day_keep_all_records(tmp_path, monkeypatch):
+    store = PartitionedStore(str(tmp_path), storage_format='parquet')
+    records = make_days(1)
+
+    # Slow reads widen the window between a writer's read and its write
+    read = store.storage.read
+    monkeypatch.setattr(store.storage, 'read', lambda path, columns=None: (time.sleep(0.02), read(path, columns=columns))[1])
+
+    # Eight three-hour windows of the same day, written at once
+    windows = [(records.index[0] + pd.Timedelta(hours=3 * i), records.index[0] + pd.Timedelta(hours=3 * (i + 1)))
+               for i in range(8)]
+    threads = [
+        threading.Thread(target=store.write, args=(records[(records.index >= start) & (records.index < end)],
+                                                   'GC.c.0', 'trades', start, end))
+        for start, end in windows
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(store.read('GC.c.0', 'trades', '2023-01-01', '2023-01-02')) == len(records)
+    assert store.covers('GC.c.0', 'trades', '2023-01-01', '2023-01-02')
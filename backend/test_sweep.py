@@ -0,0 +1,66 @@
+"""
+Tests for the parallel parameter sweep
+Compares each combination with a plain single backtest
+"""
+
+import pytest
+
+from bar_store import write_bar_store
+from main import VolumeCumulativeDeltaBacktest, generate_sample_data
+from sweep import parameter_grid, random_parameters, run_sweep
+
+
+def make_bars(days=60):
+    backtest = VolumeCumulativeDeltaBacktest()
+    return backtest.calculate_cumulative_delta(generate_sample_data(days=days))
+
+
+def single_run(bars, threshold, position_size):
+    backtest = VolumeCumulativeDeltaBacktest(initial_capital=10000)
+    data = backtest.generate_signals(bars.copy(), threshold=threshold)
+    backtest.backtest(data, position_size=position_size)
+    return backtest.get_performance_metrics()
+
+
+def test_grid_sweep_matches_single_runs():
+    bars = make_bars()
+    grid = {'threshold': [200, 500, 1000, 2000], 'position_size': [0.05, 0.2]}
+
+    results = run_sweep(bars, param_grid=grid, max_workers=2)
+
+    assert len(results) == 8
+    for row in results.to_dict('records'):
+        expected = single_run(bars, row['threshold'], row['position_size'])
+        assert {key: row[key] for key in expected} == expected
+
+
+def test_results_sorted_by_metric():
+    results = run_sweep(make_bars(), param_grid={'threshold': [200, 500, 1000, 2000]},
+                        max_workers=2, sort_by='total_return')
+    assert results['total_return'].is_monotonic_decreasing
+
+
+def test_random_parameters_within_space():
+    combos = random_parameters({'threshold': (100, 3000), 'position_size': [0.05, 0.1]},
+                               n_samples=50, seed=3)
+    assert len(combos) == 50
+    assert all(100 <= c['threshold'] <= 3000 and isinstance(c['threshold'], int) for c in combos)
+    assert {c['position_size'] for c in combos} <= {0.05, 0.1}
+    assert combos == random_parameters({'threshold': (100, 3000), 'position_size': [0.05, 0.1]},
+                                       n_samples=50, seed=3)
+
+
+def test_unknown_parameter_rejected():
+    assert len(parameter_grid({'threshold': [1, 2], 'position_size': [0.1]})) == 2
+    with pytest.raises(ValueError):
+        parameter_grid({'frequency': ['1min']})
+
+
+def test_sweep_over_memory_mapped_store(tmp_path):
+    bars = make_bars()
+    store = write_bar_store(bars, str(tmp_path / 'bars'))
+    grid = {'threshold': [200, 1000], 'position_size': [0.1]}
+
+    from_store = run_sweep(store.directory, param_grid=grid, max_workers=2)
+    from_frame = run_sweep(bars, param_grid=grid, max_workers=2)
+    assert from_store.to_dict('records') == from_frame.to_dict('records')
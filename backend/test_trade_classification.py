@@ -0,0 +1,88 @@
+"""
+Tests for tick-rule and Lee-Ready trade classification
+"""
+
+import numpy as np
+import pandas as pd
+
+from test_volume_calculator import make_trades
+from trade_classification import TradeClassifier, lee_ready, tick_rule
+from volume_calculator import StreamingBarAggregator, VolumeCalculator
+
+
+def loop_tick_rule(prices):
+    codes, last_price, last_code = [], np.nan, 0
+    for price in prices:
+        if price > last_price:
+            last_code = 1
+        elif price < last_price:
+            last_code = -1
+        codes.append(last_code)
+        last_price = price
+    return np.array(codes, dtype=np.int8)
+
+
+def loop_lee_ready(prices, bids, asks):
+    ticks = loop_tick_rule(prices)
+    codes = []
+    for price, bid, ask, tick in zip(prices, bids, asks, ticks):
+        mid = (bid + ask) / 2
+        if 0 < bid <= ask and price > mid:
+            codes.append(1)
+        elif 0 < bid <= ask and price < mid:
+            codes.append(-1)
+        else:
+            codes.append(tick)
+    return np.array(codes, dtype=np.int8)
+
+
+def make_quotes(n=20000, seed=0):
+    rng = np.random.default_rng(seed)
+    # Prices on a coarse grid so zero ticks and trades at the mid are common
+    prices = 1.1 + np.round(rng.normal(0, 1, n).cumsum()) * 0.0001
+    spread = rng.choice([1, 2], n) * 0.0001
+    bids = prices - rng.choice([0, 0.5, 1], n) * spread
+    asks = bids + spread
+    return prices, bids, asks
+
+
+def test_tick_rule_matches_loop():
+    prices, _, _ = make_quotes()
+    np.testing.assert_array_equal(tick_rule(prices), loop_tick_rule(prices))
+    assert tick_rule(np.array([5.0, 5.0, 4.0, 4.0])).tolist() == [0, 0, -1, -1]
+
+
+def test_lee_ready_matches_loop():
+    prices, bids, asks = make_quotes(seed=1)
+    np.testing.assert_array_equal(lee_ready(prices, bids, asks), loop_lee_ready(prices, bids, asks))
+    assert lee_ready([1.0, 1.5, 1.5], [1.0, 1.0, 1.4], [2.0, 2.0, 1.8]).tolist() == [-1, 1, -1]
+
+
+def test_chunked_classifier_matches_whole_stream():
+    prices, bids, asks = make_quotes(seed=2)
+    classifier = TradeClassifier()
+    chunks = [classifier.classify(prices[i:i + 777], bids[i:i + 777], asks[i:i + 777])
+              for i in range(0, len(prices), 777)]
+    np.testing.assert_array_equal(np.concatenate(chunks), lee_ready(prices, bids, asks))
+
+
+def test_pipeline_classifies_trades_without_side():
+    trades = make_trades(20000, seed=9).drop(columns='side')
+    bars = VolumeCalculator.process_trades_to_bars(trades, frequency='5min')
+
+    codes = tick_rule(trades['price'].to_numpy())
+    assert bars['buy_volume'].sum() == trades['size'][codes == 1].sum()
+    assert bars['sell_volume'].sum() == trades['size'][codes == -1].sum()
+
+    # The side carried across chunks gives the same bars as one batch
+    aggregator = StreamingBarAggregator('5min')
+    streamed = [aggregator.update(trades.iloc[i:i + 3000]) for i in range(0, len(trades), 3000)]
+    streamed = pd.concat(streamed + [aggregator.flush()])
+    pd.testing.assert_frame_equal(streamed, bars, check_freq=False)
+
+
+def test_quote_columns_use_lee_ready():
+    prices, bids, asks = make_quotes(1000, seed=3)
+    trades = pd.DataFrame({'price': prices, 'size': 1, 'bid_px_00': bids, 'ask_px_00': asks},
+                          index=pd.date_range('2023-01-02', periods=1000, freq='1s', tz='UTC'))
+    np.testing.assert_array_equal(VolumeCalculator.side_codes(trades), lee_ready(prices, bids, asks))
@@ -0,0 +1,207 @@
+"""
+Tests for the vectorized trades-to-bars aggregation
+Compares against a plain DataFrame.resample reference
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from kernels import compiled_delta_bar_kernel, delta_bar_kernel
+from volume_calculator import (StreamingBarAggregator, VolumeCalculator, _delta_bar_ends,
+                               _delta_bar_ends_segmented)
+
+
+def make_trades(n=5000, seed=0, tz='UTC'):
+    rng = np.random.default_rng(seed)
+    offsets = np.sort(rng.integers(0, 2 * 86400 * 10**9, n))
+    index = pd.DatetimeIndex(
+        pd.Timestamp('2023-01-02 17:03:05') + pd.to_timedelta(offsets, unit='ns'),
+        name='ts_recv'
+    )
+    if tz:
+        index = index.tz_localize(tz)
+    return pd.DataFrame({
+        'price': 1900 + rng.normal(0, 1, n).cumsum() * 0.1,
+        'size': rng.integers(1, 20, n),
+        'side': rng.choice(['A', 'B', 'N'], n),
+    }, index=index)
+
+
+def resample_reference(trades, frequency):
+    side = trades['side'].astype(str)
+    df = pd.DataFrame({
+        'price': trades['price'],
+        'buy_volume': trades['size'].where(side == 'B', 0),
+        'sell_volume': trades['size'].where(side == 'A', 0),
+    })
+    bars = df.resample(frequency).agg({
+        'price': 'last',
+        'buy_volume': 'sum',
+        'sell_volume': 'sum',
+    }).dropna(subset=['price'])
+    bars['total_volume'] = bars['buy_volume'] + bars['sell_volume']
+    return bars.rename(columns={'price': 'close'})
+
+
+def test_aggregate_matches_resample():
+    for tz in [None, 'UTC', 'America/Chicago']:
+        trades = make_trades(tz=tz)
+        for frequency in ['1min', '7min', '1h', 'W']:
+            pd.testing.assert_frame_equal(
+                VolumeCalculator.aggregate_to_bars(trades, frequency),
+                resample_reference(trades, frequency),
+                check_freq=False
+            )
+
+
+def test_categorical_and_unsorted_trades():
+    trades = make_trades(seed=1)
+    expected = resample_reference(trades, '5min')
+
+    shuffled = trades.sample(frac=1, random_state=3)
+    shuffled['side'] = shuffled['side'].astype('category')
+
+    pd.testing.assert_frame_equal(
+        VolumeCalculator.aggregate_to_bars(shuffled, '5min'),
+        expected,
+        check_freq=False
+    )
+
+
+def test_calculate_trade_side_leaves_input_untouched():
+    trades = make_trades(n=10)
+
+    df = VolumeCalculator.calculate_trade_side(trades)
+
+    assert 'trade_side' not in trades.columns
+    expected = trades['side'].map({'A': 'sell', 'B': 'buy', 'N': 'unknown'})
+    assert df['trade_side'].tolist() == expected.tolist()
+
+
+def test_streaming_matches_batch():
+    trades = make_trades(n=20000, seed=2)
+    expected = VolumeCalculator.process_trades_to_bars(trades, '7min')
+
+    # Uneven chunks, so bars are split across chunk boundaries
+    bounds = [0, 1, 2500, 2501, 9000, 15555, len(trades)]
+    chunks = [trades.iloc[a:b] for a, b in zip(bounds[:-1], bounds[1:])]
+    streamed = pd.concat(VolumeCalculator.stream_trades_to_bars(chunks, '7min'))
+
+    pd.testing.assert_frame_equal(streamed, expected, check_freq=False)
+
+
+def test_streaming_rejects_out_of_order_chunks():
+    trades = make_trades(n=1000, seed=3)
+    aggregator = StreamingBarAggregator('1min')
+    aggregator.update(trades.iloc[500:])
+
+    try:
+        aggregator.update(trades.iloc[:500])
+    except ValueError:
+        return
+    raise AssertionError("Expected ValueError for a chunk before the open bar")
+
+
+def loop_information_bars(trades, bar_type, bar_size):
+    """Reference: walk the trades and close a bar on the trade that fills it"""
+    rows, bar, volume = [], None, 0
+    for time, row in zip(trades.index, trades.itertuples()):
+        sign = {'B': 1, 'A': -1}.get(row.side, 0)
+        if bar is None:
+            bar = {'buy_volume': 0, 'sell_volume': 0, 'trades': 0, 'delta': 0}
+        bar['close'] = row.price
+        bar['time'] = time
+        bar['buy_volume'] += row.size if sign == 1 else 0
+        bar['sell_volume'] += row.size if sign == -1 else 0
+        bar['trades'] += 1
+        bar['delta'] += sign * row.size
+
+        # Volume bars close when the running total reaches or crosses a
+        # multiple of bar_size, delta bars when their own |delta| reaches it
+        before = volume
+        volume += row.size
+        full = {
+            'tick': bar['trades'] == bar_size,
+            'volume': volume // bar_size != before // bar_size,
+            'delta': abs(bar['delta']) >= bar_size,
+        }[bar_type]
+        if full:
+            rows.append(bar)
+            bar = None
+    if bar is not None:
+        rows.append(bar)
+
+    expected = pd.DataFrame(rows).set_index('time')[['close', 'buy_volume', 'sell_volume']]
+    expected['total_volume'] = expected['buy_volume'] + expected['sell_volume']
+    return expected
+
+
+def test_information_bars_match_loop_reference():
+    trades = make_trades(n=4000, seed=6)
+    for bar_type, bar_size in [('tick', 50), ('volume', 400), ('delta', 60)]:
+        bars = VolumeCalculator.aggregate_to_bars(trades, bar_type=bar_type, bar_size=bar_size)
+        expected = loop_information_bars(trades, bar_type, bar_size)
+        pd.testing.assert_frame_equal(bars, expected, check_dtype=False, check_names=False)
+
+
+def test_delta_bars_close_on_their_own_delta():
+    # Delta oscillating around 100 must not close a bar on every crossing
+    index = pd.date_range('2023-01-02 14:30', periods=8, freq='s', tz='UTC', name='ts_recv')
+    trades = pd.DataFrame({'price': 1900.0, 'size': [90, 20, 20, 20, 20, 100, 100, 5],
+                           'side': ['B', 'B', 'A', 'B', 'A', 'A', 'A', 'B']}, index=index)
+    bars = VolumeCalculator.aggregate_to_bars(trades, bar_type='delta', bar_size=100)
+
+    delta = bars['buy_volume'] - bars['sell_volume']
+    assert list(delta) == [110, -120, -100, 5]
+    assert (delta.abs().iloc[:-1] >= 100).all()
+
+
+def test_delta_bar_ends_agree_for_tiny_bars():
+    rng = np.random.default_rng(11)
+    delta = rng.choice([-1, 1], 20000) * rng.integers(1, 4, 20000)
+    for bar_size in (1, 2, 5, 40):
+        expected = delta_bar_kernel(delta, bar_size)
+        np.testing.assert_array_equal(_delta_bar_ends_segmented(delta, bar_size), expected)
+        np.testing.assert_array_equal(_delta_bar_ends(delta, bar_size), expected)
+
+
+@pytest.mark.skipif(compiled_delta_bar_kernel is None, reason="numba is not installed")
+def test_tiny_delta_bars_cost_one_pass():
+    # About one bar per trade: 2M trades must not cost a Python step per bar
+    rng = np.random.default_rng(12)
+    delta = rng.choice([-1, 1], 2_000_000) * rng.integers(1, 4, 2_000_000)
+    _delta_bar_ends(delta[:10], 2)  # compile
+
+    started = time.perf_counter()
+    ends = _delta_bar_ends(delta, 2)
+    assert len(ends) > 1_000_000
+    assert time.perf_counter() - started < 0.5
+
+
+def test_information_bars_pipeline_columns():
+    trades = make_trades(n=2000, seed=8)
+    time_bars = VolumeCalculator.process_trades_to_bars(trades, '1min')
+    volume_bars = VolumeCalculator.process_trades_to_bars(trades, bar_type='volume', bar_size=500)
+
+    assert list(volume_bars.columns) == list(time_bars.columns)
+    assert volume_bars['total_volume'].sum() == time_bars['total_volume'].sum()
+    assert volume_bars['cumulative_delta'].iloc[-1] == time_bars['cumulative_delta'].iloc[-1]
+    assert len(VolumeCalculator.aggregate_to_bars(trades, bar_type='tick', bar_size=300)) == 7
+
+
+if __name__ == "__main__":
+    test_aggregate_matches_resample()
+    test_categorical_and_unsorted_trades()
+    test_calculate_trade_side_leaves_input_untouched()
+    test_streaming_matches_batch()
+    test_streaming_rejects_out_of_order_chunks()
+    test_information_bars_match_loop_reference()
+    test_delta_bars_close_on_their_own_delta()
+    test_delta_bar_ends_agree_for_tiny_bars()
+    if compiled_delta_bar_kernel is not None:
+        test_tiny_delta_bars_cost_one_pass()
+    test_information_bars_pipeline_columns()
+    print("Volume calculator tests passed")
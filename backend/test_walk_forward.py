@@ -0,0 +1,80 @@
+"""
+Tests for walk-forward optimization
+Checks folds against recomputing cumulative delta on each window
+"""
+
+import pandas as pd
+
+from main import VolumeCumulativeDeltaBacktest, generate_sample_data
+from walk_forward import walk_forward, walk_forward_windows
+
+
+THRESHOLDS = [100, 250, 500, 1000, 2000]
+
+
+def make_bars(days=90):
+    backtest = VolumeCumulativeDeltaBacktest()
+    return backtest.calculate_cumulative_delta(generate_sample_data(days=days))
+
+
+def recomputed_best(bars, position_size=0.1):
+    """Best threshold on a window, recomputing its cumulative delta from scratch"""
+    best_threshold, best_score = None, None
+    for threshold in THRESHOLDS:
+        backtest = VolumeCumulativeDeltaBacktest(initial_capital=10000)
+        data = backtest.calculate_cumulative_delta(bars.copy())
+        data = backtest.generate_signals(data, threshold=threshold)
+        backtest.backtest(data, position_size=position_size)
+        score = backtest.get_performance_metrics()['total_return']
+        if best_score is None or score > best_score:
+            best_threshold, best_score = threshold, score
+    return best_threshold, best_score
+
+
+def test_rolling_windows_in_bars():
+    index = pd.date_range('2023-01-01', periods=100, freq='h')
+    assert walk_forward_windows(index, 40, 20) == [(0, 40, 60), (20, 60, 80), (40, 80, 100)]
+    assert walk_forward_windows(index, 40, 20, anchored=True) == [(0, 40, 60), (0, 60, 80), (0, 80, 100)]
+
+
+def test_rolling_windows_in_time():
+    index = pd.date_range('2023-01-01', periods=10 * 24, freq='h')
+    windows = walk_forward_windows(index, '4D', '2D')
+    assert windows == [(0, 96, 144), (48, 144, 192), (96, 192, 240)]
+
+
+def test_folds_match_recomputed_windows():
+    bars = make_bars()
+    result = walk_forward(bars, THRESHOLDS, in_sample='20D', out_of_sample='10D')
+    windows = walk_forward_windows(bars.index, '20D', '10D')
+
+    assert len(result['folds']) == len(windows)
+    for fold, (is_start, is_end, _) in zip(result['folds'].to_dict('records'), windows):
+        threshold, score = recomputed_best(bars.iloc[is_start:is_end])
+        assert fold['threshold'] == threshold
+        assert fold['is_total_return'] == score
+
+
+def test_out_of_sample_chains_into_one_run():
+    bars = make_bars()
+    result = walk_forward(bars, THRESHOLDS, in_sample=480, out_of_sample=240)
+    folds = result['folds']
+
+    # Every position is closed within its fold
+    assert len(result['positions']) == len(result['trades'])
+    assert folds['oos_trades'].sum() == result['metrics']['total_trades']
+    assert result['metrics']['final_capital'] == folds['oos_capital'].iloc[-1]
+
+    # The equity curve covers the out-of-sample bars exactly once
+    times = [point['time'] for point in result['equity_curve']]
+    assert times == list(bars.index[480:])
+
+
+def test_out_of_sample_windows_tile_in_time():
+    bars = make_bars()
+    result = walk_forward(bars, THRESHOLDS, in_sample='20D', out_of_sample='10D', anchored=True)
+    is_end = walk_forward_windows(bars.index, '20D', '10D')[0][1]
+
+    # No out-of-sample bar is traded twice or skipped
+    times = [point['time'] for point in result['equity_curve']]
+    assert times == list(bars.index[is_end:])
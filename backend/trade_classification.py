@@ -0,0 +1,166 @@
+"""
+Trade Classification
+Infers the aggressor side of trades from prices (tick rule) or from the
+prevailing quotes (Lee-Ready) for feeds without an aggressor flag
+"""
+
+import numpy as np
+
+
+# Bid/ask column pairs recognised in trade frames (Databento TBBO / MBP-1 first)
+QUOTE_COLUMNS = [
+    ('bid_px_00', 'ask_px_00'),
+    ('bid', 'ask'),
+    ('bid_price', 'ask_price'),
+]
+
+
+def tick_rule(prices, prev_price=np.nan, prev_code=0):
+    """
+    Classify trades by price change
+
+    An uptick is a buy (1) and a downtick a sell (-1); a trade at the same
+    price as the one before takes the side of the last price change (zero
+    tick). Runs as a few array passes: the last non-zero tick is found
+    with np.maximum.accumulate over its positions.
+
+    Args:
+        prices: Trade prices in time order
+        prev_price: Price of the trade before the first one (NaN if none)
+        prev_code: Side of the trade before the first one (0 if none)
+
+    Returns:
+        int8 array of side codes (0 until the first price change)
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    n = len(prices)
+    if n == 0:
+        return np.zeros(0, dtype=np.int8)
+
+    previous = np.empty(n)
+    previous[0] = prev_price
+    previous[1:] = prices[:-1]
+
+    # Comparisons with NaN are False, so an unknown previous price is a zero tick
+    ticks = (prices > previous).astype(np.int8) - (prices < previous).astype(np.int8)
+
+    last_change = np.where(ticks != 0, np.arange(n), -1)
+    np.maximum.accumulate(last_change, out=last_change)
+
+    codes = ticks[np.maximum(last_change, 0)]
+    codes[last_change < 0] = prev_code
+    return codes
+
+
+def quote_rule(prices, bids, asks):
+    """
+    Classify trades against the quote midpoint
+
+    Returns:
+        int8 array: 1 above the mid, -1 below, 0 at the mid or when the
+        quote is missing or crossed
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    bids = np.asarray(bids, dtype=np.float64)
+    asks = np.asarray(asks, dtype=np.float64)
+
+    valid = (bids > 0) & (asks >= bids)
+    mid = (bids + asks) / 2
+    codes = (prices > mid).astype(np.int8) - (prices < mid).astype(np.int8)
+    codes[~valid] = 0
+    return codes
+
+
+def lee_ready(prices, bids, asks, prev_price=np.nan, prev_code=0):
+    """
+    Lee-Ready classification
+
+    Trades above the quote midpoint are buys and below it sells; trades
+    at the midpoint (or without a usable quote) fall back to the tick rule.
+    The quotes should be the ones prevailing before each trade, as in
+    Databento's TBBO schema.
+
+    Args:
+        prices: Trade prices in time order
+        bids: Best bid before each trade
+        asks: Best ask before each trade
+        prev_price: Price of the trade before the first one (NaN if none)
+        prev_code: Tick-rule side of the trade before the first one
+
+    Returns:
+        int8 array of side codes
+    """
+    codes = quote_rule(prices, bids, asks)
+    at_mid = codes == 0
+    if at_mid.any():
+        codes[at_mid] = tick_rule(prices, prev_price, prev_code)[at_mid]
+    return codes
+
+
+class TradeClassifier:
+    """
+    Tick-rule / Lee-Ready classification over consecutive chunks of trades
+
+    Keeps the last price and the last tick-rule side, so a stream split
+    into chunks is classified exactly like the whole stream at once.
+    """
+
+    def __init__(self):
+        self.last_price = np.nan
+        self.last_tick = 0
+        self.trades_classified = 0
+
+    def classify(self, prices, bids=None, asks=None):
+        """
+        Side codes of the next chunk of trades
+
+        Args:
+            prices: Trade prices in time order
+            bids, asks: Optional quotes before each trade (Lee-Ready when given)
+
+        Returns:
+            int8 array of side codes
+        """
+        prices = np.asarray(prices, dtype=np.float64)
+        if len(prices) == 0:
+            return np.zeros(0, dtype=np.int8)
+
+        ticks = tick_rule(prices, self.last_price, self.last_tick)
+        if bids is None or asks is None:
+            codes = ticks
+        else:
+            codes = quote_rule(prices, bids, asks)
+            at_mid = codes == 0
+            codes[at_mid] = ticks[at_mid]
+
+        self.last_price = prices[-1]
+        self.last_tick = ticks[-1]
+        self.trades_classified += len(prices)
+        return codes
+
+    def classify_frame(self, trades_df):
+        """Side codes of a trades DataFrame, with Lee-Ready if it has bid/ask columns"""
+        prices = trades_df['price'].to_numpy()
+        quotes = find_quote_columns(trades_df)
+        bids = asks = None
+        if quotes is not None:
+            bids, asks = (trades_df[column].to_numpy() for column in quotes)
+
+        if trades_df.index.is_monotonic_increasing:
+            return self.classify(prices, bids, asks)
+
+        # Classify in time order, then return the codes in row order
+        order = np.argsort(trades_df.index.to_numpy(), kind='stable')
+        codes = np.empty(len(order), dtype=np.int8)
+        codes[order] = self.classify(prices[order],
+                                     None if bids is None else bids[order],
+                                     None if asks is None else asks[order])
+        return codes
+
+
+def find_quote_columns(trades_df):
+    """(bid, ask) column names of a trades frame, or None"""
+    for bid, ask in QUOTE_COLUMNS:
+        if bid in trades_df.columns and ask in trades_df.columns:
+            return bid, ask
+    return None
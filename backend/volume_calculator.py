@@ -6,95 +6,403 @@ Calculates buy/sell volume and cumulative delta from trade-level data
 import pandas as pd
 import numpy as np
 
+from dbn_reader import DbnTradesReader, trade_arrays
+from kernels import compiled_delta_bar_kernel
+from trade_classification import TradeClassifier, find_quote_columns
+
+
+# Aggressor side codes used by the vectorized aggregation:
+# 1 = buyer initiated, -1 = seller initiated, 0 = unknown
+SIDE_CODES = {'B': 1, 'A': -1}
+TRADE_SIDE_CODES = {'buy': 1, 'sell': -1}
+
+# Indexed by side code, so SIDE_LABELS[-1] is 'sell'
+SIDE_LABELS = np.array(['unknown', 'buy', 'sell'], dtype=object)
+
+SIZE_COLUMNS = ['size', 'quantity', 'qty', 'volume']
+
+NS_PER_DAY = 24 * 60 * 60 * 1_000_000_000
+
+# 'time' bars close on the clock; the others every bar_size trades,
+# contracts or units of net delta
+BAR_TYPES = ('time', 'tick', 'volume', 'delta')
+
+# Bump when bar aggregation changes, so cached bars are rebuilt
+# 2: trades without an aggressor side are classified; delta bars close on
+#    their own net delta
+CALCULATOR_VERSION = 2
+
+
+def _codes_from_labels(values, mapping):
+    """Map a Series of side labels to int8 side codes without a Python loop"""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        # One lookup per category, then a take over the integer codes
+        # (code -1 means missing and lands on the trailing 0)
+        lookup = np.array(
+            [mapping.get(c, 0) for c in values.cat.categories] + [0],
+            dtype=np.int8
+        )
+        return lookup[values.cat.codes.to_numpy()]
+
+    values = values.to_numpy()
+    codes = np.zeros(len(values), dtype=np.int8)
+    for label, code in mapping.items():
+        codes[values == label] = code
+    return codes
+
+
+def _delta_bar_ends(delta, bar_size):
+    """
+    End positions (exclusive) of delta bars: each bar closes on the first
+    trade where |delta since the bar opened| >= bar_size
+
+    Bars are path dependent (each starts where the last one closed), so
+    they cannot be bucketed from one cumulative sum. With numba the trades
+    are walked once by kernels.delta_bar_kernel; without it, each bar
+    searches the cumulative delta with a doubling window, so each trade is
+    scanned about twice and the Python work is per bar, not per trade.
+    """
+    if compiled_delta_bar_kernel is not None:
+        return compiled_delta_bar_kernel(np.asarray(delta, dtype=np.float64), float(bar_size))
+    return _delta_bar_ends_segmented(delta, bar_size)
+
+
+def _delta_bar_ends_segmented(delta, bar_size):
+    """NumPy fallback of _delta_bar_ends: one windowed search per bar"""
+    cumulative = np.cumsum(delta)
+    n = len(cumulative)
+    ends = []
+    start, base, window = 0, 0, 64
+
+    while start < n:
+        lo, end = start, n
+        while lo < n:
+            hi = min(lo + window, n)
+            hit = np.abs(cumulative[lo:hi] - base) >= bar_size
+            if hit.any():
+                end = lo + int(hit.argmax()) + 1
+                break
+            lo = hi
+            window *= 2
+        ends.append(end)
+        # Next search window about twice this bar's length
+        window = max(64, 2 * (end - start))
+        base = cumulative[end - 1]
+        start = end
+
+    return np.asarray(ends, dtype=np.int64)
+
 
 class VolumeCalculator:
     """Processes trade data to calculate buy/sell volume and cumulative delta"""
 
     @staticmethod
-    def calculate_trade_side(trades_df):
+    def side_codes(trades_df, classifier=None):
         """
-        Determine if each trade is a buy or sell based on aggressor side
+        Aggressor side of each trade as an int8 array
+
+        Feeds without an aggressor flag (e.g., FX) are classified with
+        Lee-Ready when the frame has bid/ask columns and with the tick rule
+        otherwise (see trade_classification).
 
         Args:
             trades_df: DataFrame with trade data from Databento
+            classifier: TradeClassifier carrying state from earlier chunks
+                        of the same stream (a fresh one if None)
 
         Returns:
-            DataFrame with 'side' column added ('buy' or 'sell')
+            NumPy array with 1 for buys, -1 for sells and 0 for unknown
         """
-        df = trades_df.copy()
-
         # Databento trades schema includes 'side' field:
         # 'A' = ask (sell), 'B' = bid (buy)
         # Or use 'action' field if available
-        if 'side' in df.columns:
-            df['trade_side'] = df['side'].map({'A': 'sell', 'B': 'buy'})
-        elif 'action' in df.columns:
+        if 'trade_side' in trades_df.columns:
+            return _codes_from_labels(trades_df['trade_side'], TRADE_SIDE_CODES)
+        if 'side' in trades_df.columns:
+            return _codes_from_labels(trades_df['side'], SIDE_CODES)
+        if 'action' in trades_df.columns:
             # 'A' = Ask side (seller initiated), 'B' = Bid side (buyer initiated)
-            df['trade_side'] = df['action'].map({'A': 'sell', 'B': 'buy'})
-        else:
-            # Fallback: use tick rule (compare to mid price if available)
-            print("Warning: No side/action field found. Using tick rule approximation")
-            df['trade_side'] = 'unknown'
+            return _codes_from_labels(trades_df['action'], SIDE_CODES)
 
-        return df
+        # Fallback: infer the side from quotes (Lee-Ready) or price changes (tick rule)
+        if classifier is None:
+            classifier = TradeClassifier()
+        if classifier.trades_classified == 0:
+            method = 'Lee-Ready' if find_quote_columns(trades_df) else 'tick rule'
+            print(f"Warning: No side/action field found. Classifying trades with the {method}")
+        return classifier.classify_frame(trades_df)
 
     @staticmethod
-    def aggregate_to_bars(trades_df, frequency='1min'):
+    def side_code(side):
+        """Side code of a single trade: 'B'/'buy' -> 1, 'A'/'sell' -> -1, else 0"""
+        return SIDE_CODES.get(side, TRADE_SIDE_CODES.get(side, 0))
+
+    @staticmethod
+    def calculate_trade_side(trades_df):
         """
-        Aggregate tick trades into time bars with buy/sell volume
+        Determine if each trade is a buy or sell based on aggressor side
 
         Args:
-            trades_df: DataFrame with trade data
-            frequency: Pandas frequency string (e.g., '1min', '5min', '1h')
+            trades_df: DataFrame with trade data from Databento
 
         Returns:
-            DataFrame with columns: timestamp, close, buy_volume, sell_volume, total_volume
+            DataFrame with 'side' column added ('buy' or 'sell')
         """
-        df = trades_df.copy()
+        codes = VolumeCalculator.side_codes(trades_df)
 
-        # Ensure we have trade side
-        if 'trade_side' not in df.columns:
-            df = VolumeCalculator.calculate_trade_side(df)
+        # Shallow copy: the new column is not added to the caller's frame,
+        # but the trade data itself is not duplicated
+        df = trades_df.copy(deep=False)
+        df['trade_side'] = SIDE_LABELS[codes]
 
-        # Group by time frequency
-        df.index = pd.to_datetime(df.index)
+        return df
 
-        # Aggregate data
-        agg_dict = {
-            'price': 'last',  # Last price in the bar (close)
-        }
+    @staticmethod
+    def find_size_column(trades_df):
+        """Name of the size/quantity column in the trades data"""
+        for col in SIZE_COLUMNS:
+            if col in trades_df.columns:
+                return col
 
-        # If size/quantity column exists
-        size_col = None
-        for col in ['size', 'quantity', 'qty', 'volume']:
-            if col in df.columns:
-                size_col = col
-                break
+        raise ValueError("No size/volume column found in trades data")
 
-        if size_col is None:
-            raise ValueError("No size/volume column found in trades data")
+    @staticmethod
+    def aggregate_arrays(timestamps, prices, sizes, side_codes, frequency='1min', tz=None, origin=None):
+        """
+        Aggregate tick arrays into time bars with buy/sell volume
 
-        # Create separate columns for buy and sell volume
-        df['buy_volume'] = df.apply(
-            lambda row: row[size_col] if row['trade_side'] == 'buy' else 0,
-            axis=1
-        )
-        df['sell_volume'] = df.apply(
-            lambda row: row[size_col] if row['trade_side'] == 'sell' else 0,
-            axis=1
+        Trades are assigned to integer bar bins counted from midnight of the
+        first trading day (the same bins DataFrame.resample uses) and each
+        bin is reduced with np.add.reduceat, so no per-row Python work is done.
+
+        Args:
+            timestamps: int64 nanoseconds since epoch (UTC for tz-aware data)
+            prices: Trade prices
+            sizes: Trade sizes
+            side_codes: 1 for buys, -1 for sells, 0 for unknown
+            frequency: Fixed pandas frequency string (e.g., '1min', '5min', '1h')
+            tz: Timezone of the timestamps, or None for naive timestamps
+            origin: Start of bin 0 in nanoseconds (default: midnight of the
+                    first trading day)
+
+        Returns:
+            DataFrame with columns: close, buy_volume, sell_volume, total_volume
+        """
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        prices = np.asarray(prices)
+        sizes = np.asarray(sizes)
+        side_codes = np.asarray(side_codes)
+
+        freq_ns = pd.tseries.frequencies.to_offset(frequency).nanos
+
+        if len(timestamps) == 0:
+            bars = pd.DataFrame(
+                {
+                    'close': prices[:0],
+                    'buy_volume': sizes[:0],
+                    'sell_volume': sizes[:0],
+                },
+                index=pd.DatetimeIndex([], tz=tz)
+            )
+            bars['total_volume'] = bars['buy_volume'] + bars['sell_volume']
+            return bars
+
+        # Sort by time only when needed (stable, like resample)
+        if np.any(timestamps[1:] < timestamps[:-1]):
+            order = np.argsort(timestamps, kind='stable')
+            timestamps = timestamps[order]
+            prices = prices[order]
+            sizes = sizes[order]
+            side_codes = side_codes[order]
+
+        if origin is None:
+            origin = VolumeCalculator._day_origin(timestamps[0], tz)
+        bins = (timestamps - origin) // freq_ns
+
+        starts = np.flatnonzero(np.r_[True, bins[1:] != bins[:-1]])
+        ends = np.r_[starts[1:], len(bins)]
+
+        buy_volume = np.add.reduceat(np.where(side_codes == 1, sizes, 0), starts)
+        sell_volume = np.add.reduceat(np.where(side_codes == -1, sizes, 0), starts)
+
+        bars = pd.DataFrame(
+            {
+                'close': prices[ends - 1],
+                'buy_volume': buy_volume,
+                'sell_volume': sell_volume,
+            },
+            index=VolumeCalculator._to_index(origin + bins[starts] * freq_ns, tz)
         )
+        bars['total_volume'] = bars['buy_volume'] + bars['sell_volume']
 
-        # Resample to desired frequency
-        bars = df.resample(frequency).agg({
-            'price': 'last',
-            'buy_volume': 'sum',
-            'sell_volume': 'sum',
-        })
+        return bars
+
+    @staticmethod
+    def aggregate_information_bars(timestamps, prices, sizes, side_codes, bar_type, bar_size, tz=None):
+        """
+        Aggregate tick arrays into tick, volume or delta bars
+
+        Each trade gets a bar id from a cumulative sum, then bars are reduced
+        with np.add.reduceat like time bars:
+        - tick: a bar every bar_size trades
+        - volume: a bar closes on the trade where cumulative volume (all
+          trades, including unknown side) reaches or crosses a multiple of
+          bar_size, so overshoot is absorbed by the next bar
+        - delta: a bar closes on the trade where the bar's own net delta
+          (buy minus sell volume since it opened) reaches bar_size in either
+          direction; bar ends depend on the previous one, so they are found
+          with a segmented search (see _delta_bar_ends)
+        Trades are never split across bars.
 
-        # Clean up
-        bars = bars.dropna(subset=['price'])
+        Args:
+            timestamps: int64 nanoseconds since epoch (UTC for tz-aware data)
+            prices: Trade prices
+            sizes: Trade sizes
+            side_codes: 1 for buys, -1 for sells, 0 for unknown
+            bar_type: 'tick', 'volume' or 'delta'
+            bar_size: Trades, contracts or delta units per bar
+            tz: Timezone of the timestamps, or None for naive timestamps
+
+        Returns:
+            DataFrame with columns: close, buy_volume, sell_volume, total_volume,
+            indexed by the time of each bar's last trade
+        """
+        if bar_type not in BAR_TYPES[1:]:
+            raise ValueError(f"Unknown bar type: {bar_type}. Use one of {BAR_TYPES}")
+        if not bar_size or bar_size <= 0:
+            raise ValueError(f"{bar_type} bars need a positive bar_size")
+
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        prices = np.asarray(prices)
+        sizes = np.asarray(sizes)
+        side_codes = np.asarray(side_codes)
+
+        if len(timestamps) == 0:
+            return VolumeCalculator.aggregate_arrays(timestamps, prices, sizes, side_codes, tz=tz)
+
+        if np.any(timestamps[1:] < timestamps[:-1]):
+            order = np.argsort(timestamps, kind='stable')
+            timestamps = timestamps[order]
+            prices = prices[order]
+            sizes = sizes[order]
+            side_codes = side_codes[order]
+
+        buy_sizes = np.where(side_codes == 1, sizes, 0)
+        sell_sizes = np.where(side_codes == -1, sizes, 0)
+
+        if bar_type == 'tick':
+            bar_ids = np.arange(len(timestamps)) // bar_size
+        elif bar_type == 'volume':
+            # Volume traded before each trade decides its bar
+            volume_before = np.cumsum(sizes) - sizes
+            bar_ids = volume_before // bar_size
+        else:
+            ends = _delta_bar_ends(buy_sizes - sell_sizes, bar_size)
+            # The closing trade ends its bar; the next trade opens a new one
+            opened = np.zeros(len(timestamps), dtype=np.int64)
+            opened[ends[:-1]] = 1
+            bar_ids = np.cumsum(opened)
+
+        starts = np.flatnonzero(np.r_[True, bar_ids[1:] != bar_ids[:-1]])
+        ends = np.r_[starts[1:], len(timestamps)]
+
+        bars = pd.DataFrame(
+            {
+                'close': prices[ends - 1],
+                'buy_volume': np.add.reduceat(buy_sizes, starts),
+                'sell_volume': np.add.reduceat(sell_sizes, starts),
+            },
+            index=VolumeCalculator._to_index(timestamps[ends - 1], tz)
+        )
         bars['total_volume'] = bars['buy_volume'] + bars['sell_volume']
-        bars.rename(columns={'price': 'close'}, inplace=True)
+
+        return bars
+
+    @staticmethod
+    def _day_origin(first_ns, tz):
+        """Midnight of the first trading day, in nanoseconds"""
+        if tz is None:
+            return first_ns - first_ns % NS_PER_DAY
+        return pd.Timestamp(first_ns, tz='UTC').tz_convert(tz).normalize().value
+
+    @staticmethod
+    def _to_index(values_ns, tz):
+        """DatetimeIndex from int64 nanoseconds"""
+        index = pd.DatetimeIndex(np.asarray(values_ns, dtype=np.int64).view('M8[ns]'))
+        if tz is not None:
+            index = index.tz_localize('UTC').tz_convert(tz)
+        return index
+
+    @staticmethod
+    def _trade_arrays(trades_df, classifier=None):
+        """Timestamps (int64 ns), prices, sizes and side codes of a trades frame"""
+        index = pd.DatetimeIndex(pd.to_datetime(trades_df.index))
+        size_col = VolumeCalculator.find_size_column(trades_df)
+        sizes = trades_df[size_col].to_numpy()
+        if sizes.dtype.kind == 'u':
+            # Databento sizes are uint32; signed so sell volume can be subtracted
+            sizes = sizes.astype(np.int64)
+        return (
+            index,
+            index.as_unit('ns').asi8,
+            trades_df['price'].to_numpy(),
+            sizes,
+            VolumeCalculator.side_codes(trades_df, classifier),
+        )
+
+    @staticmethod
+    def aggregate_to_bars(trades_df, frequency='1min', bar_type='time', bar_size=None):
+        """
+        Aggregate tick trades into bars with buy/sell volume
+
+        Args:
+            trades_df: DataFrame with trade data
+            frequency: Pandas frequency string for time bars (e.g., '1min', '5min', '1h')
+            bar_type: 'time', or 'tick', 'volume', 'delta' (see aggregate_information_bars)
+            bar_size: Trades, contracts or delta units per bar for non-time bars
+
+        Returns:
+            DataFrame with columns: timestamp, close, buy_volume, sell_volume, total_volume
+        """
+        # Split volume by aggressor side with side codes instead of
+        # materializing a trade_side label per row
+        index, timestamps, prices, sizes, codes = VolumeCalculator._trade_arrays(trades_df)
+
+        if bar_type != 'time':
+            bars = VolumeCalculator.aggregate_information_bars(
+                timestamps, prices, sizes, codes, bar_type, bar_size, tz=index.tz
+            )
+            bars.index = bars.index.as_unit(index.unit)
+            bars.index.name = index.name
+            return bars
+
+        offset = pd.tseries.frequencies.to_offset(frequency)
+        if not isinstance(offset, pd.offsets.Tick):
+            # Calendar frequencies (e.g., 'W', 'MS') have no fixed width,
+            # so resample a frame holding only the columns needed
+            bars = pd.DataFrame({
+                'price': prices,
+                'buy_volume': np.where(codes == 1, sizes, 0),
+                'sell_volume': np.where(codes == -1, sizes, 0),
+            }, index=index).resample(frequency).agg({
+                'price': 'last',
+                'buy_volume': 'sum',
+                'sell_volume': 'sum',
+            })
+
+            # Clean up
+            bars = bars.dropna(subset=['price'])
+            bars['total_volume'] = bars['buy_volume'] + bars['sell_volume']
+            bars.rename(columns={'price': 'close'}, inplace=True)
+            return bars
+
+        bars = VolumeCalculator.aggregate_arrays(
+            timestamps, prices, sizes, codes,
+            frequency=frequency,
+            tz=index.tz
+        )
+        bars.index = bars.index.as_unit(index.unit)
+        bars.index.name = index.name
 
         return bars
 
@@ -120,26 +428,26 @@ class VolumeCalculator:
         return df
 
     @staticmethod
-    def process_trades_to_bars(trades_df, frequency='1min'):
+    def process_trades_to_bars(trades_df, frequency='1min', bar_type='time', bar_size=None):
         """
         Full pipeline: trades -> bars with buy/sell volume -> cumulative delta
 
         Args:
             trades_df: Raw trade data from Databento
             frequency: Time bar frequency
+            bar_type: 'time', 'tick', 'volume' or 'delta'
+            bar_size: Trades, contracts or delta units per bar for non-time bars
 
         Returns:
             DataFrame ready for backtesting with cumulative delta
         """
-        print(f"Processing {len(trades_df)} trades into {frequency} bars...")
-
-        # Step 1: Determine trade side
-        df = VolumeCalculator.calculate_trade_side(trades_df)
+        label = frequency if bar_type == 'time' else f"{bar_size} {bar_type}"
+        print(f"Processing {len(trades_df)} trades into {label} bars...")
 
-        # Step 2: Aggregate to time bars
-        bars = VolumeCalculator.aggregate_to_bars(df, frequency)
+        # Step 1: Determine trade side and aggregate to bars
+        bars = VolumeCalculator.aggregate_to_bars(trades_df, frequency, bar_type, bar_size)
 
-        # Step 3: Calculate cumulative delta
+        # Step 2: Calculate cumulative delta
         bars = VolumeCalculator.calculate_cumulative_delta(bars)
 
         print(f"Created {len(bars)} bars with cumulative delta")
@@ -148,6 +456,194 @@ class VolumeCalculator:
         return bars
 
 
+    @staticmethod
+    def stream_trades_to_bars(trade_chunks, frequency='1min'):
+        """
+        Streaming pipeline: chunks of trades -> finished bars with cumulative delta
+
+        Only one chunk of trades and one open bar are held in memory, so
+        files larger than RAM can be processed. Chunks must arrive in
+        time order (as read from a Databento file).
+
+        Args:
+            trade_chunks: Iterable of trade DataFrames (e.g., DatabentoFetcher.iter_csv)
+            frequency: Fixed time bar frequency (e.g., '1min', '5min', '1h')
+
+        Yields:
+            DataFrames of finished bars, same columns as process_trades_to_bars
+        """
+        aggregator = StreamingBarAggregator(frequency)
+
+        for chunk in trade_chunks:
+            bars = aggregator.update(chunk)
+            if len(bars):
+                yield bars
+
+        bars = aggregator.flush()
+        if len(bars):
+            yield bars
+
+    @staticmethod
+    def dbn_to_bars(filepaths, frequency='1min', time_field='ts_recv', chunksize=5_000_000):
+        """
+        Aggregate raw DBN trades files into bars without building trade DataFrames
+
+        Files are memory-mapped and fed to the streaming aggregator in slices,
+        so only one slice of derived arrays is in memory at a time.
+
+        Args:
+            filepaths: Path or list of paths of uncompressed .dbn trades files, in time order
+            frequency: Fixed time bar frequency (e.g., '1min', '5min', '1h')
+            time_field: Timestamp used for binning ('ts_recv' like to_df's index, or 'ts_event')
+            chunksize: Number of records per slice
+
+        Returns:
+            DataFrame ready for backtesting with cumulative delta
+        """
+        if isinstance(filepaths, str):
+            filepaths = [filepaths]
+
+        aggregator = StreamingBarAggregator(frequency)
+        frames = []
+
+        for filepath in filepaths:
+            reader = DbnTradesReader(filepath)
+            print(f"Aggregating {len(reader):,} DBN trades from {filepath}")
+            for records in reader.iter_slices(chunksize):
+                frames.append(aggregator.update_arrays(*trade_arrays(records, time_field),
+                                                       tz='UTC', index_name=time_field))
+
+        frames.append(aggregator.flush())
+        bars = pd.concat(frames)
+
+        print(f"Created {len(bars)} bars with cumulative delta")
+        return bars
+
+
+class StreamingBarAggregator:
+    """
+    Incrementally aggregates chunks of trades into time bars
+
+    The last bar of each chunk may still receive trades from the next
+    chunk, so it is held back as the pending bar. The running cumulative
+    delta is carried across chunks so emitted bars match the batch pipeline.
+    """
+
+    def __init__(self, frequency='1min'):
+        """
+        Args:
+            frequency: Fixed time bar frequency (e.g., '1min', '5min', '1h')
+        """
+        offset = pd.tseries.frequencies.to_offset(frequency)
+        if not isinstance(offset, pd.offsets.Tick):
+            raise ValueError(f"Streaming requires a fixed bar frequency, got: {frequency}")
+
+        self.frequency = frequency
+        self.origin = None
+        self.pending = None
+        self.cumulative_delta = 0
+        self.bars_emitted = 0
+        # Side inference state for feeds without an aggressor flag
+        self.classifier = TradeClassifier()
+
+    def update(self, trades_df):
+        """
+        Add a chunk of trades
+
+        Args:
+            trades_df: DataFrame with trade data, later than any previous chunk
+
+        Returns:
+            DataFrame of bars finished by this chunk (may be empty)
+        """
+        if trades_df.empty:
+            return self._finish(self._empty_like_pending())
+
+        index, timestamps, prices, sizes, codes = VolumeCalculator._trade_arrays(trades_df, self.classifier)
+        return self.update_arrays(timestamps, prices, sizes, codes,
+                                  tz=index.tz, unit=index.unit, index_name=index.name)
+
+    def update_arrays(self, timestamps, prices, sizes, side_codes, tz='UTC', unit='ns', index_name=None):
+        """
+        Add a chunk of trades given as arrays (e.g., straight from a DBN file)
+
+        Args:
+            timestamps: int64 nanoseconds since epoch
+            prices: Trade prices
+            sizes: Trade sizes
+            side_codes: 1 for buys, -1 for sells, 0 for unknown
+            tz: Timezone of the bar index
+            unit: Resolution of the bar index
+            index_name: Name of the bar index
+
+        Returns:
+            DataFrame of bars finished by this chunk (may be empty)
+        """
+        if len(timestamps) == 0:
+            return self._finish(self._empty_like_pending())
+
+        # Bins are counted from the first trade of the whole stream
+        if self.origin is None:
+            self.origin = VolumeCalculator._day_origin(np.min(timestamps), tz)
+
+        bars = VolumeCalculator.aggregate_arrays(
+            timestamps, prices, sizes, side_codes,
+            frequency=self.frequency,
+            tz=tz,
+            origin=self.origin
+        )
+        bars.index = bars.index.as_unit(unit)
+        bars.index.name = index_name
+
+        if self.pending is not None:
+            pending_time = self.pending.index[0]
+            first_time = bars.index[0]
+
+            if first_time < pending_time:
+                raise ValueError(
+                    f"Trades chunk starts at {first_time}, before the open bar at {pending_time}"
+                )
+
+            if first_time == pending_time:
+                # The open bar continues into this chunk: sum volumes,
+                # keep the chunk's close (it holds the later trades)
+                for col in ['buy_volume', 'sell_volume', 'total_volume']:
+                    bars.iloc[0, bars.columns.get_loc(col)] += self.pending[col].iloc[0]
+            else:
+                bars = pd.concat([self.pending, bars])
+
+        self.pending = bars.iloc[-1:]
+        return self._finish(bars.iloc[:-1])
+
+    def flush(self):
+        """
+        Close the open bar at the end of the stream
+
+        Returns:
+            DataFrame with the last bar (empty if no trades were seen)
+        """
+        bars = self.pending if self.pending is not None else self._empty_like_pending()
+        self.pending = None
+        return self._finish(bars)
+
+    def _empty_like_pending(self):
+        if self.pending is not None:
+            return self.pending.iloc[:0]
+        return pd.DataFrame(columns=['close', 'buy_volume', 'sell_volume', 'total_volume'])
+
+    def _finish(self, bars):
+        """Add delta and running cumulative delta to finished bars"""
+        bars = bars.copy()
+        bars['delta'] = bars['buy_volume'] - bars['sell_volume']
+        bars['cumulative_delta'] = bars['delta'].cumsum() + self.cumulative_delta
+
+        if len(bars):
+            self.cumulative_delta = bars['cumulative_delta'].iloc[-1]
+            self.bars_emitted += len(bars)
+
+        return bars
+
+
 def example_usage():
     """Example of processing trade data"""
 
@@ -0,0 +1,154 @@
+"""
+Walk-Forward Optimization
+Optimizes the signal threshold on rolling in-sample windows and trades it
+on the following out-of-sample window
+"""
+
+import numpy as np
+import pandas as pd
+
+from main import VolumeCumulativeDeltaBacktest, delta_signal_matrix, delta_signals
+
+
+def walk_forward_windows(index, in_sample, out_of_sample, step=None, anchored=False):
+    """
+    Bar positions of the walk-forward folds
+
+    Args:
+        index: DatetimeIndex of the bars
+        in_sample: In-sample length, as a number of bars (int) or a
+                   duration ('180D', pd.Timedelta)
+        out_of_sample: Out-of-sample length, same units as in_sample
+        step: Distance between fold starts (default: out_of_sample). Out-of-sample
+              windows overlap when it is shorter than out_of_sample and leave
+              bars out when it is longer
+        anchored: If True, every in-sample window starts at the first bar
+                  (expanding window) instead of rolling forward
+
+    Returns:
+        List of (is_start, is_end, oos_end) bar positions; the in-sample
+        window is [is_start, is_end) and the out-of-sample one [is_end, oos_end)
+    """
+    step = out_of_sample if step is None else step
+    n = len(index)
+    windows = []
+
+    if isinstance(in_sample, (int, np.integer)):
+        start = 0
+        while start + in_sample < n:
+            is_end = start + in_sample
+            windows.append((0 if anchored else start, is_end, min(is_end + out_of_sample, n)))
+            start += step
+        return windows
+
+    in_sample, out_of_sample, step = (pd.Timedelta(v) for v in (in_sample, out_of_sample, step))
+    times = pd.DatetimeIndex(index)
+    start_time = times[0]
+    while True:
+        is_start, is_end, oos_end = times.searchsorted(
+            [start_time, start_time + in_sample, start_time + in_sample + out_of_sample]
+        )
+        if is_end >= n:
+            break
+        windows.append((0 if anchored else is_start, is_end, oos_end))
+        start_time += step
+    return windows
+
+
+def walk_forward(bars, thresholds, in_sample, out_of_sample, anchored=False,
+                 position_size=0.1, initial_capital=10000, objective='total_return'):
+    """
+    Walk-forward optimization of the cumulative delta threshold
+
+    Delta is summed once over all bars. Each fold slices that array and
+    rebases it at the start of its in-sample window, which gives the same
+    cumulative delta as recomputing it on the window, so no bars or deltas
+    are rebuilt per fold. The out-of-sample window continues from the
+    in-sample cumulative delta and its positions are closed on its last
+    bar, so folds chain into one out-of-sample equity curve. Folds advance
+    by out_of_sample, so the out-of-sample windows cover every bar after
+    the first in-sample window exactly once.
+
+    Args:
+        bars: DataFrame with close and delta (or buy_volume/sell_volume)
+        thresholds: Candidate thresholds to optimize over
+        in_sample, out_of_sample, anchored: Fold layout (see walk_forward_windows)
+        position_size: Fraction of capital per trade
+        initial_capital: Starting capital of the out-of-sample run
+        objective: get_performance_metrics key to maximize in-sample
+
+    Returns:
+        Dictionary with:
+        - folds: DataFrame with the windows, chosen threshold, in-sample
+          objective and out-of-sample metrics of each fold
+        - trades, positions, equity_curve: Chained out-of-sample results
+        - metrics: get_performance_metrics of the chained out-of-sample run
+    """
+    close = bars['close'].to_numpy(dtype=float)
+    if 'delta' in bars:
+        delta = bars['delta'].to_numpy(dtype=float)
+    else:
+        delta = (bars['buy_volume'] - bars['sell_volume']).to_numpy(dtype=float)
+    index = bars.index
+
+    # Prefix sums: cumulative delta of bars [a, b) is cum_delta[a+1:b+1] - cum_delta[a]
+    cum_delta = np.concatenate(([0.0], np.cumsum(delta)))
+
+    windows = walk_forward_windows(index, in_sample, out_of_sample, anchored=anchored)
+    if not windows:
+        raise ValueError("Not enough bars for one in-sample and out-of-sample window")
+
+    print(f"Walk-forward: {len(windows)} folds, {len(thresholds)} thresholds each")
+
+    oos = VolumeCumulativeDeltaBacktest(initial_capital=initial_capital)
+    folds = []
+
+    for fold, (is_start, is_end, oos_end) in enumerate(windows):
+        window_delta = cum_delta[is_start + 1:oos_end + 1] - cum_delta[is_start]
+        is_delta = window_delta[:is_end - is_start]
+
+        # In-sample: all thresholds in one matrix pass, keep the best objective
+        scores = VolumeCumulativeDeltaBacktest(initial_capital=initial_capital).backtest_matrix(
+            close[is_start:is_end], delta_signal_matrix(is_delta, thresholds),
+            position_size=position_size, index=index[is_start:is_end]
+        )[objective].to_numpy()
+        best = int(np.argmax(scores))
+        best_threshold, best_score = thresholds[best], scores[best]
+
+        # Out-of-sample: start one bar early so the first bar can see the
+        # previous signal, and flatten on the last bar
+        signal = delta_signals(window_delta[is_end - is_start - 1:], best_threshold)
+        signal[-1] = -1
+
+        trades_before = len(oos.trades)
+        capital_before = oos.capital
+        oos.backtest_arrays(close[is_end - 1:oos_end], signal, index[is_end - 1:oos_end],
+                            position_size=position_size)
+        fold_pnl = oos.trades.column('pnl')[trades_before:]
+
+        folds.append({
+            'fold': fold,
+            'is_start': index[is_start],
+            'is_end': index[is_end - 1],
+            'oos_start': index[is_end],
+            'oos_end': index[oos_end - 1],
+            'threshold': best_threshold,
+            f'is_{objective}': best_score,
+            'oos_trades': len(fold_pnl),
+            'oos_pnl': round(float(fold_pnl.sum()), 2),
+            'oos_return': round((oos.capital - capital_before) / capital_before * 100, 2),
+            'oos_capital': round(oos.capital, 2),
+        })
+
+    folds = pd.DataFrame(folds)
+    metrics = oos.get_performance_metrics()
+    print(f"Out-of-sample: {metrics['total_trades']} trades, "
+          f"{metrics['total_return']:.2f}% total return")
+
+    return {
+        'folds': folds,
+        'trades': oos.trades,
+        'positions': oos.positions,
+        'equity_curve': oos.equity_curve,
+        'metrics': metrics,
+    }
@@ -0,0 +1,112 @@
+import fs from 'fs';
+import path from 'path';
+
+// Reads bar stores written by backend/bar_store.py: one 1-D .npy file per column
+// plus meta.json. Node has no memory mapping in its standard library, so unlike
+// the Python readers this does not share the OS page-cache copy: each column is
+// read with positional reads of only the rows asked for, straight into a typed
+// array without parsing text. Opened stores (meta, file descriptors, header
+// offsets) are cached per process and reopened when the store is rewritten.
+
+const TYPED_ARRAYS = {
+  '<f8': Float64Array,
+  '<i8': BigInt64Array,
+};
+
+const stores = new Map();
+
+function readExactly(fd, buffer, position) {
+  const bytes = new Uint8Array(buffer);
+  let done = 0;
+  while (done < bytes.length) {
+    const read = fs.readSync(fd, bytes, done, bytes.length - done, position + done);
+    if (read === 0) {
+      throw new Error(`Unexpected end of file at byte ${position + done}`);
+    }
+    done += read;
+  }
+}
+
+function openNpy(filePath) {
+  const fd = fs.openSync(filePath, 'r');
+  try {
+    const prefix = Buffer.alloc(12);
+    fs.readSync(fd, prefix, 0, 12, 0);
+    if (prefix.toString('latin1', 1, 6) !== 'NUMPY') {
+      throw new Error(`Not a .npy file: ${filePath}`);
+    }
+
+    const major = prefix[6];
+    const headerLength = major === 1 ? prefix.readUInt16LE(8) : prefix.readUInt32LE(8);
+    const headerStart = major === 1 ? 10 : 12;
+    const header = Buffer.alloc(headerLength);
+    fs.readSync(fd, header, 0, headerLength, headerStart);
+    const text = header.toString('latin1');
+
+    const descr = /'descr':\s*'([^']+)'/.exec(text)[1];
+    const length = parseInt(/'shape':\s*\((\d+),?\)/.exec(text)[1], 10);
+    const ArrayType = TYPED_ARRAYS[descr];
+    if (!ArrayType) {
+      throw new Error(`Unsupported dtype ${descr} in ${filePath}`);
+    }
+    return { fd, ArrayType, length, dataOffset: headerStart + headerLength };
+  } catch (error) {
+    fs.closeSync(fd);
+    throw error;
+  }
+}
+
+function closeStore(store) {
+  for (const column of store.columns.values()) {
+    fs.closeSync(column.fd);
+  }
+  store.columns.clear();
+}
+
+export function openBarStore(directory) {
+  const metaPath = path.join(directory, 'meta.json');
+  const version = fs.statSync(metaPath).mtimeMs;
+
+  let store = stores.get(directory);
+  if (store && store.version === version) {
+    return store;
+  }
+  if (store) {
+    closeStore(store);
+  }
+
+  const meta = JSON.parse(fs.readFileSync(metaPath, 'utf-8'));
+  store = { directory, version, meta, length: meta.rows, columns: new Map() };
+  stores.set(directory, store);
+  return store;
+}
+
+export function readColumn(store, name, start = 0, end = store.length) {
+  let column = store.columns.get(name);
+  if (!column) {
+    column = openNpy(path.join(store.directory, `${name}.npy`));
+    store.columns.set(name, column);
+  }
+
+  start = Math.max(0, Math.min(start, column.length));
+  end = Math.max(start, Math.min(end, column.length));
+  const size = column.ArrayType.BYTES_PER_ELEMENT;
+
+  // A fresh ArrayBuffer is always aligned for the typed array
+  const buffer = new ArrayBuffer((end - start) * size);
+  readExactly(column.fd, buffer, column.dataOffset + start * size);
+  return new column.ArrayType(buffer);
+}
+
+export function readBarStore(directory, columns, start = 0, end = undefined) {
+  const store = openBarStore(directory);
+  const result = { meta: store.meta };
+  for (const name of columns) {
+    result[name] = readColumn(store, name, start, end ?? store.length);
+  }
+  return result;
+}
+
+export function hasBarStore(directory) {
+  return fs.existsSync(path.join(directory, 'meta.json'));
+}
@@ -1,65 +1,153 @@
 import fs from 'fs';
 import path from 'path';
+import { hasBarStore, readBarStore } from '@/lib/barStore';
+
+// Timeframes written by backend/process_gold_trades.py (the bar pyramid)
+const TIMEFRAMES = ['1min', '5min', '15min', '1h'];
+
+const dataDir = path.join(process.cwd(), '../backend/Data');
+const pyramidDir = path.join(dataDir, 'bars', 'GC.c.0');
+
+// Parsed responses per timeframe, reused until the source files change
+const cache = new Map();
+
+function parseCsv(filePath) {
+  const lines = fs.readFileSync(filePath, 'utf-8').trim().split('\n');
+  const headers = lines[0].split(',');
+  return { headers, rows: lines.slice(1).map((line) => line.split(',')) };
+}
+
+function sourceFiles(timeframe) {
+  // Candles at every timeframe, rolled up from the ohlcv-1m partitions by process_gold_trades.py
+  const ohlcv = path.join(pyramidDir, 'ohlcv', `${timeframe}.csv`);
+
+  // Bar store written by process_gold_trades.py: the delta series is read from
+  // its binary columns instead of CSV text (candles still come from CSV)
+  const store = path.join(pyramidDir, 'store', timeframe);
+  if (hasBarStore(store)) {
+    return { ohlcv, delta: path.join(store, 'meta.json') };
+  }
+  if (timeframe === '1min') {
+    const pyramidDelta = path.join(pyramidDir, '1min.csv');
+    return {
+      ohlcv,
+      delta: fs.existsSync(pyramidDelta) ? pyramidDelta : path.join(dataDir, 'processed-data.csv'),
+    };
+  }
+  return { ohlcv, delta: path.join(pyramidDir, `${timeframe}.csv`) };
+}
+
+function loadChartData(files) {
+  // Parse OHLCV CSV
+  const ohlcv = parseCsv(files.ohlcv);
+  const col = (name) => ohlcv.headers.indexOf(name);
+  const [openCol, highCol, lowCol, closeCol, volumeCol] =
+    ['open', 'high', 'low', 'close', 'volume'].map(col);
+
+  const candlestickData = [];
+  const volumeData = [];
+
+  for (const values of ohlcv.rows) {
+    const timestamp = new Date(values[0]).getTime() / 1000; // Convert to seconds
+
+    candlestickData.push({
+      time: timestamp,
+      open: parseFloat(values[openCol]),
+      high: parseFloat(values[highCol]),
+      low: parseFloat(values[lowCol]),
+      close: parseFloat(values[closeCol]),
+    });
+
+    volumeData.push({
+      time: timestamp,
+      value: parseFloat(values[volumeCol]),
+      color: parseFloat(values[closeCol]) >= parseFloat(values[openCol]) ? '#26a69a' : '#ef5350',
+    });
+  }
+
+  return {
+    candlestickData: candlestickData,
+    volumeData: volumeData,
+    deltaData: path.basename(files.delta) === 'meta.json'
+      ? storeDeltaData(path.dirname(files.delta))
+      : csvDeltaData(files.delta),
+  };
+}
+
+function storeDeltaData(directory) {
+  const store = readBarStore(directory, ['timestamps', 'delta', 'cumulative_delta']);
+  const deltaData = new Array(store.delta.length);
+
+  for (let i = 0; i < deltaData.length; i++) {
+    const delta = store.delta[i];
+    deltaData[i] = {
+      time: Number(store.timestamps[i] / 1000000000n),
+      value: delta,
+      color: delta >= 0 ? '#26a69a' : '#ef5350',
+      cumulativeDelta: store.cumulative_delta[i],
+    };
+  }
+  return deltaData;
+}
+
+function csvDeltaData(filePath) {
+  // Parse processed bars for delta
+  const processed = parseCsv(filePath);
+  const deltaCol = processed.headers.indexOf('delta');
+  const cumulativeDeltaCol = processed.headers.indexOf('cumulative_delta');
+  const deltaData = [];
+
+  for (const values of processed.rows) {
+    const timestamp = new Date(values[0]).getTime() / 1000;
+    const delta = parseFloat(values[deltaCol]);
+    const cumulativeDelta = parseFloat(values[cumulativeDeltaCol]);
+
+    deltaData.push({
+      time: timestamp,
+      value: delta,
+      color: delta >= 0 ? '#26a69a' : '#ef5350',
+      cumulativeDelta: cumulativeDelta,
+    });
+  }
+
+  return deltaData;
+}
 
 export default function handler(req, res) {
-  try {
-    // Read the OHLCV data
-    const ohlcvPath = path.join(process.cwd(), '../backend/Data/ohlcv_1m_GC.c.0_2020-01-01_2023-12-31.csv');
-    const processedPath = path.join(process.cwd(), '../backend/Data/processed-data.csv');
-
-    const ohlcvData = fs.readFileSync(ohlcvPath, 'utf-8');
-    const processedData = fs.readFileSync(processedPath, 'utf-8');
-
-    // Parse OHLCV CSV
-    const ohlcvLines = ohlcvData.trim().split('\n');
-    const ohlcvHeaders = ohlcvLines[0].split(',');
-
-    const candlestickData = [];
-    const volumeData = [];
-
-    for (let i = 1; i < ohlcvLines.length; i++) {
-      const values = ohlcvLines[i].split(',');
-      const timestamp = new Date(values[0]).getTime() / 1000; // Convert to seconds
-
-      candlestickData.push({
-        time: timestamp,
-        open: parseFloat(values[4]),
-        high: parseFloat(values[5]),
-        low: parseFloat(values[6]),
-        close: parseFloat(values[7]),
-      });
+  const timeframe = req.query.timeframe || '1min';
+  if (!TIMEFRAMES.includes(timeframe)) {
+    return res.status(400).json({
+      error: `Unknown timeframe: ${timeframe}`,
+      timeframes: TIMEFRAMES,
+    });
+  }
 
-      volumeData.push({
-        time: timestamp,
-        value: parseFloat(values[8]),
-        color: parseFloat(values[7]) >= parseFloat(values[4]) ? '#26a69a' : '#ef5350',
+  try {
+    const files = sourceFiles(timeframe);
+    const missing = Object.values(files).filter((file) => !fs.existsSync(file));
+    if (missing.length) {
+      return res.status(404).json({
+        error: `No ${timeframe} bars found`,
+        message: `Run backend/process_gold_trades.py to build the bar pyramid (missing: ${missing.join(', ')})`,
       });
     }
 
-    // Parse processed data for delta
-    const processedLines = processedData.trim().split('\n');
-    const deltaData = [];
-
-    for (let i = 1; i < processedLines.length; i++) {
-      const values = processedLines[i].split(',');
-      const timestamp = new Date(values[0]).getTime() / 1000;
-      const delta = parseFloat(values[5]); // Use pre-calculated delta from column 5
-      const cumulativeDelta = parseFloat(values[6]);
-
-      deltaData.push({
-        time: timestamp,
-        value: delta,
-        color: delta >= 0 ? '#26a69a' : '#ef5350',
-        cumulativeDelta: cumulativeDelta,
-      });
+    const version = Object.values(files).map((file) => fs.statSync(file).mtimeMs).join(':');
+    let cached = cache.get(timeframe);
+    if (!cached || cached.version !== version) {
+      cached = { version, data: loadChartData(files) };
+      cache.set(timeframe, cached);
     }
 
+    const { candlestickData, volumeData, deltaData } = cached.data;
+
     // Return the data
     res.status(200).json({
       candlestickData: candlestickData,
       volumeData: volumeData,
       deltaData: deltaData,
       stats: {
+        timeframe: timeframe,
         totalBars: candlestickData.length,
         startDate: candlestickData[0]?.time,
         endDate: candlestickData[candlestickData.length - 1]?.time,
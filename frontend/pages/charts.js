@@ -7,22 +7,30 @@ const PriceChart = dynamic(() => import('@/components/PriceChart'), {
   ssr: false,
 });
 
+const TIMEFRAMES = [
+  { value: '1min', label: '1-Minute' },
+  { value: '5min', label: '5-Minute' },
+  { value: '15min', label: '15-Minute' },
+  { value: '1h', label: '1-Hour' },
+];
+
 export default function Charts() {
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
   const [priceData, setPriceData] = useState(null);
   const [deltaData, setDeltaData] = useState(null);
+  const [timeframe, setTimeframe] = useState('1min');
 
   useEffect(() => {
     loadChartData();
-  }, []);
+  }, [timeframe]);
 
   const loadChartData = async () => {
     setLoading(true);
     setError(null);
 
     try {
-      const response = await fetch('/api/chart-data');
+      const response = await fetch(`/api/chart-data?timeframe=${timeframe}`);
 
       if (!response.ok) {
         throw new Error('Failed to fetch chart data');
@@ -90,7 +98,14 @@ export default function Charts() {
             </div>
 
             <div className="chart-section">
-              <h2>📊 Gold Futures (GC) - 1-Minute Chart with Cumulative Delta</h2>
+              <h2>
+                📊 Gold Futures (GC) - {TIMEFRAMES.find((tf) => tf.value === timeframe)?.label} Chart with Cumulative Delta
+              </h2>
+              <select value={timeframe} onChange={(e) => setTimeframe(e.target.value)}>
+                {TIMEFRAMES.map((tf) => (
+                  <option key={tf.value} value={tf.value}>{tf.label}</option>
+                ))}
+              </select>
               <PriceChart data={priceData} deltaData={deltaData} />
             </div>
           </>